@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+符号回归运行检查点
+
+检查点为单个压缩 .npz 文件：数组部分保存种群（ops/args/consts/lengths）、
+逐个体误差与训练数据，其余状态（随机数生成器状态、已完成代数、进化历史、
+运行参数）以 JSON 编码后作为字节数组保存在 meta 字段中。
+写入先落到临时文件再原子替换，进程中途退出不会留下损坏的检查点。
+"""
+
+import json
+import os
+import numpy as np
+from pathlib import Path
+from typing import Dict, Any, Tuple
+
+# 检查点格式版本，格式变化时递增
+CHECKPOINT_VERSION = 1
+
+_ARRAY_KEYS = ('ops', 'args', 'consts', 'lengths', 'errors', 'X', 'y')
+# 仅在对应功能启用时存在的数组（如连续减半评估的精确误差标记）
+_OPTIONAL_ARRAY_KEYS = ('exact',)
+
+
+def save_checkpoint(path: Path, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+    """写入检查点（arrays 需包含种群、误差与数据数组，meta 为可 JSON 序列化的状态）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = dict(meta, version=CHECKPOINT_VERSION)
+    encoded = np.frombuffer(json.dumps(payload, ensure_ascii=False).encode('utf-8'), dtype=np.uint8)
+    temp_path = path.with_name(path.name + '.tmp')
+    with open(temp_path, 'wb') as f:
+        optional = {key: arrays[key] for key in _OPTIONAL_ARRAY_KEYS if arrays.get(key) is not None}
+        np.savez_compressed(f, meta=encoded, **{key: arrays[key] for key in _ARRAY_KEYS}, **optional)
+    os.replace(temp_path, path)
+
+
+def load_checkpoint(path: Path) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """读取检查点，返回 (数组字典, 状态字典)"""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"检查点不存在: {path.name}")
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+        arrays = {key: data[key] for key in _ARRAY_KEYS}
+        arrays.update({key: data[key] for key in _OPTIONAL_ARRAY_KEYS if key in data.files})
+    if meta.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"不支持的检查点版本: {meta.get('version')}")
+    return arrays, meta
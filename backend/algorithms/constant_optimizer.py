@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表达式常数优化（Levenberg–Marquardt）
+
+待优化参数为程序中全部叶子的数值：OP_CONST 的常数与 OP_VAR 的变量权重，
+按后缀顺序编号。雅可比矩阵通过对后缀程序做前向模式自动微分得到：
+求值栈上的每个元素同时携带其对各参数的偏导（切向量），
+与 BatchEvaluator 一样在 (个体 × 样本) 上锁步执行，多个个体批量求解。
+启用线性缩放时，每步先按当前参数求闭式 a、b，再对 a + b·f 的残差做 LM（变量投影）。
+单个大程序（如表达式树页面的优化操作）使用 optimize_program：雅可比由一次前向求值
+加一次反向传播得到（program_tape / tape_jacobian），代价与叶子数无关。
+"""
+
+import numpy as np
+from typing import Optional, Tuple
+
+from .gp_engine import (Population, OP_PAD, OP_CONST, OP_VAR, OP_ADD, OP_SUB, OP_MUL, OP_DIV,
+                        scaled_mean_squared_errors, linear_scaling_coefficients)
+from .gp_evaluator import stack_pointers, DEFAULT_MAX_CHUNK_BYTES
+from .metrics import mean_squared_errors
+
+
+def parameter_slots(ops: np.ndarray) -> Tuple[np.ndarray, int]:
+    """叶子节点在参数向量中的编号（非叶子为 -1）及最大参数个数"""
+    leaf = (ops == OP_CONST) | (ops == OP_VAR)
+    slots = np.where(leaf, np.cumsum(leaf, axis=1) - 1, -1)
+    return slots, int(leaf.sum(axis=1).max()) if len(ops) else 0
+
+
+_BINARY_UFUNCS = {OP_ADD: np.add, OP_SUB: np.subtract, OP_MUL: np.multiply, OP_DIV: np.divide}
+
+
+def program_tape(ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                 XT: np.ndarray) -> Tuple[list, list]:
+    """单个后缀程序的前向求值，保留各位置的输出与子节点位置（供 tape_jacobian 反向传播）"""
+    n_samples = XT.shape[1]
+    values: list = []
+    children: list = []
+    stack = []
+    with np.errstate(all='ignore'):
+        for pos, (op, arg, const) in enumerate(zip(ops.tolist(), args.tolist(), consts.tolist())):
+            if op == OP_VAR:
+                values.append(const * XT[arg])
+                children.append(None)
+            elif op == OP_CONST:
+                values.append(np.full(n_samples, const))
+                children.append(None)
+            else:
+                right = stack.pop()
+                left = stack.pop()
+                values.append(_BINARY_UFUNCS[op](values[left], values[right]))
+                children.append((left, right))
+            stack.append(pos)
+    return values, children
+
+
+def tape_jacobian(ops: np.ndarray, args: np.ndarray, values: list, children: list,
+                  XT: np.ndarray) -> np.ndarray:
+    """
+    由前向记录反向传播得到对全部叶子数值的雅可比矩阵（叶子 × 样本，叶子按后缀顺序编号）
+
+    后缀序列中父节点总在子节点之后，逆序遍历即可把伴随量从根传到叶子
+    """
+    ops_list = ops.tolist()
+    adjoints: list = [None] * len(ops_list)
+    adjoints[-1] = np.ones(XT.shape[1])
+    rows = []
+    with np.errstate(all='ignore'):
+        for pos in range(len(ops_list) - 1, -1, -1):
+            grad = adjoints[pos]
+            op = ops_list[pos]
+            if children[pos] is None:
+                rows.append(grad * XT[args[pos]] if op == OP_VAR else grad)
+                continue
+            left, right = children[pos]
+            if op == OP_ADD:
+                adjoints[left] = adjoints[right] = grad
+            elif op == OP_SUB:
+                adjoints[left], adjoints[right] = grad, -grad
+            elif op == OP_MUL:
+                adjoints[left], adjoints[right] = grad * values[right], grad * values[left]
+            else:
+                # d(a/b) = da / b - (a/b) db / b
+                adjoints[left] = grad / values[right]
+                adjoints[right] = -adjoints[left] * values[pos]
+    return np.array(rows[::-1]).reshape(len(rows), XT.shape[1])
+
+
+def program_jacobian(ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                     XT: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    单个后缀程序的预测与对全部叶子数值的雅可比矩阵（反向模式：一次前向求值 + 一次反向传播）
+
+    Returns:
+        (预测向量, 雅可比矩阵 叶子 × 样本)
+    """
+    values, children = program_tape(ops, args, consts, XT)
+    return values[-1], tape_jacobian(ops, args, values, children, XT)
+
+
+class ConstantOptimizer:
+    """批量 Levenberg–Marquardt 常数优化器"""
+
+    def __init__(self, XT: np.ndarray, y: np.ndarray, iterations: int = 10,
+                 tolerance: float = 1e-6, max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+                 linear_scaling: bool = False):
+        self.XT = XT
+        self.y = y
+        self.linear_scaling = bool(linear_scaling)
+        self.iterations = int(iterations)
+        self.tolerance = float(tolerance)
+        self.max_chunk_bytes = int(max_chunk_bytes)
+
+    def forward(self, ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                jacobian: bool = True, n_params: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        前向模式求值（n_params 可指定参数维度，便于与整块个体的参数矩阵对齐）
+
+        Returns:
+            (预测矩阵 个体 × 样本, 雅可比张量 个体 × 参数 × 样本；jacobian=False 时为 None)
+        """
+        n, width = ops.shape
+        n_samples = self.XT.shape[1]
+        slots, used_params = parameter_slots(ops)
+        n_params = used_params if n_params is None else n_params
+        max_stack = width // 2 + 1
+        sp = stack_pointers(ops)
+        values = np.empty((n, max_stack, n_samples))
+        tangents = np.zeros((n, max_stack, n_params, n_samples)) if jacobian else None
+        used = np.flatnonzero(np.any(ops != OP_PAD, axis=0))
+
+        with np.errstate(all='ignore'):
+            for pos in range(int(used[-1]) + 1 if len(used) else 0):
+                op = ops[:, pos]
+                depth = sp[:, pos]
+
+                rows = np.flatnonzero(op == OP_VAR)
+                if len(rows):
+                    x = self.XT[args[rows, pos]]
+                    values[rows, depth[rows]] = consts[rows, pos, None] * x
+                    if jacobian:
+                        tangents[rows, depth[rows]] = 0.0
+                        tangents[rows, depth[rows], slots[rows, pos]] = x
+
+                rows = np.flatnonzero(op == OP_CONST)
+                if len(rows):
+                    values[rows, depth[rows]] = consts[rows, pos, None]
+                    if jacobian:
+                        tangents[rows, depth[rows]] = 0.0
+                        tangents[rows, depth[rows], slots[rows, pos]] = 1.0
+
+                rows = np.flatnonzero(op >= OP_ADD)
+                if not len(rows):
+                    continue
+                top = depth[rows]
+                a, b = values[rows, top - 2], values[rows, top - 1]
+                kind = op[rows]
+                result = np.empty_like(a)
+                for opcode, func in ((OP_ADD, np.add), (OP_SUB, np.subtract),
+                                     (OP_MUL, np.multiply), (OP_DIV, np.divide)):
+                    mask = kind == opcode
+                    if mask.any():
+                        result[mask] = func(a[mask], b[mask])
+                values[rows, top - 2] = result
+                if not jacobian:
+                    continue
+                da, db = tangents[rows, top - 2], tangents[rows, top - 1]
+                d = np.empty_like(da)
+                for opcode in (OP_ADD, OP_SUB, OP_MUL, OP_DIV):
+                    mask = kind == opcode
+                    if not mask.any():
+                        continue
+                    if opcode == OP_ADD:
+                        d[mask] = da[mask] + db[mask]
+                    elif opcode == OP_SUB:
+                        d[mask] = da[mask] - db[mask]
+                    elif opcode == OP_MUL:
+                        d[mask] = da[mask] * b[mask, None] + a[mask, None] * db[mask]
+                    else:
+                        # d(a/b) = (da - (a/b) db) / b
+                        d[mask] = (da[mask] - result[mask, None] * db[mask]) / b[mask, None]
+                tangents[rows, top - 2] = d
+
+        return values[:, 0], (tangents[:, 0] if jacobian else None)
+
+    def _chunk_size(self, width: int, n_params: int) -> int:
+        """按切向量栈的内存上限计算每块的个体数"""
+        row_bytes = (width // 2 + 1) * (n_params + 1) * self.XT.shape[1] * 8
+        return max(1, self.max_chunk_bytes // max(row_bytes, 1))
+
+    def optimize(self, population: Population, errors: np.ndarray) -> Tuple[Population, np.ndarray]:
+        """
+        优化种群中各个体的叶子数值，只接受使训练 MSE 下降的结果
+
+        Returns:
+            (优化后的种群副本, 对应 MSE)
+        """
+        population = population.take(slice(None))
+        errors = np.array(errors, dtype=np.float64)
+        if len(population) == 0 or self.iterations <= 0:
+            return population, errors
+        _, n_params = parameter_slots(population.ops)
+        chunk = self._chunk_size(population.width, n_params)
+        for start in range(0, len(population), chunk):
+            part = slice(start, min(start + chunk, len(population)))
+            population.consts[part], errors[part] = self._optimize_chunk(
+                population.ops[part], population.args[part], population.consts[part], errors[part])
+        return population, errors
+
+    def optimize_program(self, ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                         error: float) -> Tuple[np.ndarray, float]:
+        """
+        优化单个程序的叶子数值（阻尼调整与接受规则同 optimize），雅可比由 program_jacobian 计算
+
+        Returns:
+            (优化后的常数数组副本, 对应 MSE)
+        """
+        consts = np.array(consts, dtype=np.float64)
+        error = float(error)
+        leaf = np.flatnonzero((ops == OP_CONST) | (ops == OP_VAR))
+        if not len(leaf) or self.iterations <= 0 or not np.isfinite(error):
+            return consts, error
+        identity = np.eye(len(leaf))
+        damping = 1e-3
+        # 被接受的试探点的前向记录直接用于下一次雅可比
+        tape = program_tape(ops, args, consts, self.XT)
+        stale = True
+        for _ in range(self.iterations):
+            if stale:
+                predictions, jac = tape[0][-1], tape_jacobian(ops, args, *tape, self.XT)
+                if self.linear_scaling:
+                    a, b = linear_scaling_coefficients(predictions[None, :], self.y)
+                    predictions = a[0] + b[0] * predictions
+                    jac = jac * b[0]
+                with np.errstate(all='ignore'):
+                    jtj = jac @ jac.T
+                    jtr = jac @ (self.y - predictions)
+                if not (np.isfinite(jtj).all() and np.isfinite(jtr).all()):
+                    break
+                stale = False
+            system = jtj + damping * np.diag(np.diag(jtj)) + 1e-12 * identity
+            try:
+                step = np.linalg.solve(system, jtr)
+            except np.linalg.LinAlgError:
+                break
+            trial = consts.copy()
+            trial[leaf] += step
+            trial_tape = program_tape(ops, args, trial, self.XT)
+            trial_predictions = trial_tape[0][-1][None, :]
+            if self.linear_scaling:
+                trial_error = float(scaled_mean_squared_errors(trial_predictions, self.y)[0])
+            else:
+                trial_error = float(mean_squared_errors(trial_predictions, self.y)[0])
+            if trial_error < error:
+                # 相对下降量很小时视为收敛
+                converged = trial_error > error * (1 - self.tolerance)
+                consts, error, tape = trial, trial_error, trial_tape
+                damping = max(damping / 10.0, 1e-12)
+                stale = True
+                if converged:
+                    break
+            else:
+                damping *= 10.0
+                # 阻尼过大说明已处于局部极小，停止迭代
+                if damping > 1e8:
+                    break
+        return consts, error
+
+    def _optimize_chunk(self, ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                        errors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """对一块个体执行固定迭代次数的 LM，阻尼系数按个体独立调整"""
+        n = len(ops)
+        slots, n_params = parameter_slots(ops)
+        leaf = slots >= 0
+        rows, cols = np.nonzero(leaf)
+        params = np.zeros((n, n_params))
+        params[rows, slots[rows, cols]] = consts[rows, cols]
+        damping = np.full(n, 1e-3)
+        active = np.isfinite(errors)
+        identity = np.eye(n_params)
+        # 正规方程只在参数被接受后重算；步长被拒绝时沿用并加大阻尼
+        jtj = np.zeros((n, n_params, n_params))
+        jtr = np.zeros((n, n_params))
+        stale = active.copy()
+
+        for _ in range(self.iterations):
+            idx = np.flatnonzero(active & stale)
+            if len(idx):
+                predictions, jac = self.forward(ops[idx], args[idx], consts[idx], n_params=n_params)
+                if self.linear_scaling:
+                    a, b = linear_scaling_coefficients(predictions, self.y)
+                    predictions = a[:, None] + b[:, None] * predictions
+                    jac *= b[:, None, None]
+                with np.errstate(all='ignore'):
+                    jtj[idx] = np.einsum('npm,nqm->npq', jac, jac)
+                    jtr[idx] = np.einsum('npm,nm->np', jac, self.y - predictions)
+                usable = np.isfinite(jtj[idx]).all(axis=(1, 2)) & np.isfinite(jtr[idx]).all(axis=1)
+                active[idx[~usable]] = False
+                stale[idx] = False
+            idx = np.flatnonzero(active)
+            if not len(idx):
+                break
+            # Marquardt 缩放：在 J^T J 对角线上加阻尼，额外的小单位阵保证未使用参数槽可解
+            diagonal = np.einsum('npp->np', jtj[idx])
+            system = jtj[idx] + (damping[idx, None] * diagonal)[:, :, None] * identity + 1e-12 * identity
+            try:
+                step = np.linalg.solve(system, jtr[idx, :, None])[:, :, 0]
+            except np.linalg.LinAlgError:
+                break
+
+            trial_params = params[idx] + step
+            trial = consts[idx].copy()
+            r, c = np.nonzero(leaf[idx])
+            trial[r, c] = trial_params[r, slots[idx][r, c]]
+            trial_predictions, _ = self.forward(ops[idx], args[idx], trial, jacobian=False)
+            if self.linear_scaling:
+                trial_errors = scaled_mean_squared_errors(trial_predictions, self.y)
+            else:
+                trial_errors = mean_squared_errors(trial_predictions, self.y)
+
+            improved = trial_errors < errors[idx]
+            better = idx[improved]
+            # 相对下降量很小时视为收敛
+            converged = better[trial_errors[improved] > errors[better] * (1 - self.tolerance)]
+            consts[better] = trial[improved]
+            params[better] = trial_params[improved]
+            errors[better] = trial_errors[improved]
+            damping[better] = np.maximum(damping[better] / 10.0, 1e-12)
+            stale[better] = True
+            active[converged] = False
+            worse = idx[~improved]
+            damping[worse] *= 10.0
+            # 阻尼过大说明已处于局部极小，停止迭代
+            active[worse[damping[worse] > 1e8]] = False
+
+        return consts, errors
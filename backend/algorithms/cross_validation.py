@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+训练 / 测试划分与交叉验证
+
+支持四种划分方式：
+- holdout：按训练集占比留出（不打乱时为前 n_train 行，与 analyze 的默认划分一致）
+- kfold：k 折（可打乱）
+- repeated_kfold：重复 k 折，每次重复用独立的随机数子流重新打乱
+- stratified_kfold：按目标值分层的 k 折：行按目标值排序后每连续 k 行随机分到 k 个不同的折，
+  各折的目标值分布一致（可与 n_repeats 组合为重复分层 k 折）
+
+折下标按 (数据集哈希, 划分参数) 缓存，重复运行不再重新计算。
+交叉验证时每折在独立进程中训练一个 GP 引擎（训练数据经共享内存提供），
+第 i 折的随机数流只由 (种子, i) 决定，结果与工作进程数无关。
+"""
+
+import hashlib
+import json
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from loguru import logger
+
+from .parallel import dataset_pool, dataset_state
+from .symbolic_regression import SymbolicRegression, train_and_score
+from utils.rng import child_generator, spawn_sequences
+
+SPLIT_METHODS = ('holdout', 'kfold', 'repeated_kfold', 'stratified_kfold')
+DEFAULT_SPLIT_SPEC = {
+    'method': 'holdout',
+    'train_ratio': 80,
+    'n_splits': 5,
+    'n_repeats': 1,
+    'shuffle': False,
+    'seed': 42,
+}
+# repeated_kfold 未指定 n_repeats 时的默认重复次数
+DEFAULT_CV_REPEATS = 3
+
+
+def normalize_split_spec(spec: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """补全并校验划分参数（不合法时抛出 ValueError）"""
+    spec = dict(spec or {})
+    method = str(spec.get('method', DEFAULT_SPLIT_SPEC['method']))
+    if method not in SPLIT_METHODS:
+        raise ValueError(f"不支持的划分方式: {method}（可选 {', '.join(SPLIT_METHODS)}）")
+    normalized = {'method': method, 'seed': int(spec.get('seed', DEFAULT_SPLIT_SPEC['seed']))}
+    if method == 'holdout':
+        train_ratio = float(spec.get('train_ratio', DEFAULT_SPLIT_SPEC['train_ratio']))
+        if not 0 < train_ratio <= 100:
+            raise ValueError("训练集占比必须在 (0, 100] 之间")
+        normalized.update(train_ratio=train_ratio,
+                          shuffle=bool(spec.get('shuffle', DEFAULT_SPLIT_SPEC['shuffle'])))
+        return normalized
+    n_splits = int(spec.get('n_splits', DEFAULT_SPLIT_SPEC['n_splits']))
+    if n_splits < 2:
+        raise ValueError("折数 n_splits 必须不小于 2")
+    default_repeats = DEFAULT_CV_REPEATS if method == 'repeated_kfold' else DEFAULT_SPLIT_SPEC['n_repeats']
+    n_repeats = int(spec.get('n_repeats', default_repeats))
+    if n_repeats < 1:
+        raise ValueError("重复次数 n_repeats 必须不小于 1")
+    # 多次重复不打乱时各次完全相同，因此重复划分总是打乱
+    shuffle = bool(spec.get('shuffle', method != 'kfold')) or n_repeats > 1
+    normalized.update(n_splits=n_splits, n_repeats=n_repeats, shuffle=shuffle)
+    return normalized
+
+
+def dataset_hash(*arrays: np.ndarray) -> str:
+    """数据集内容哈希（形状、类型与数据）"""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.shape}{array.dtype.str}".encode())
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+def make_folds(y: np.ndarray, spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    按划分参数生成各折的行下标
+
+    Args:
+        y: 目标值（分层划分按它排序；其余方式只用到行数）
+        spec: normalize_split_spec 返回的划分参数
+
+    Returns:
+        [{'repeat', 'fold', 'train', 'test'}]，train / test 为升序的行下标数组
+    """
+    n = len(y)
+    if n < 2:
+        raise ValueError("数据至少需要 2 行才能划分训练集与测试集")
+    seed = spec['seed']
+    if spec['method'] == 'holdout':
+        n_train = SymbolicRegression._train_size(n, spec['train_ratio'])
+        order = child_generator(seed, 0).permutation(n) if spec['shuffle'] else np.arange(n)
+        return [{'repeat': 0, 'fold': 0, 'train': np.sort(order[:n_train]),
+                 'test': np.sort(order[n_train:])}]
+
+    k = spec['n_splits']
+    if k > n:
+        raise ValueError(f"折数 {k} 超过数据行数 {n}")
+    folds = []
+    for repeat in range(spec['n_repeats']):
+        rng = child_generator(seed, repeat) if spec['shuffle'] else None
+        if spec['method'] == 'stratified_kfold':
+            # 按目标值排序（同值随机），每连续 k 行分到 k 个不同的折
+            rows = rng.permutation(n) if rng is not None else np.arange(n)
+            order = rows[np.argsort(y[rows], kind='stable')]
+            assignment = np.empty(n, dtype=np.int64)
+            blocks = -(-n // k)
+            offsets = (np.argsort(rng.random((blocks, k)), axis=1) if rng is not None
+                       else np.broadcast_to(np.arange(k), (blocks, k)))
+            assignment[order] = offsets.reshape(-1)[:n]
+        else:
+            order = rng.permutation(n) if rng is not None else np.arange(n)
+            assignment = np.empty(n, dtype=np.int64)
+            for fold, rows in enumerate(np.array_split(order, k)):
+                assignment[rows] = fold
+        for fold in range(k):
+            mask = assignment == fold
+            folds.append({'repeat': repeat, 'fold': fold,
+                          'train': np.flatnonzero(~mask), 'test': np.flatnonzero(mask)})
+    return folds
+
+
+class SplitCache:
+    """按 (数据集哈希, 划分参数) 缓存折下标的 LRU（线程安全，缓存的下标数组只读）"""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = int(max_entries)
+        self._entries: 'OrderedDict[Tuple[str, str], List[Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, y: np.ndarray, spec: Dict[str, Any],
+            data_hash: Optional[str] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """返回 (各折下标, 是否命中缓存)；spec 须已经 normalize_split_spec 处理"""
+        key = (data_hash or dataset_hash(y), json.dumps(spec, sort_keys=True))
+        with self._lock:
+            folds = self._entries.get(key)
+            if folds is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return folds, True
+        folds = make_folds(np.asarray(y), spec)
+        for fold in folds:
+            fold['train'].flags.writeable = False
+            fold['test'].flags.writeable = False
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = folds
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return folds, False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 进程内共享的折下标缓存
+split_cache = SplitCache()
+
+
+def _train_fold(X: np.ndarray, y: np.ndarray, train: np.ndarray, test: np.ndarray,
+                engine_params: Dict[str, Any], seed_sequence: np.random.SeedSequence,
+                feature_names: List[str]) -> Dict[str, Any]:
+    """在一折的训练行上进化并在训练 / 测试行上评估最优模型"""
+    start_time = time.time()
+    rows = np.concatenate([train, test])
+    _, _, scores = train_and_score(X[rows], y[rows], len(train), feature_names, engine_params,
+                                   np.random.default_rng(seed_sequence))
+    return {
+        **scores,
+        'n_train': int(len(train)),
+        'n_test': int(len(test)),
+        'elapsed': round(time.time() - start_time, 3),
+    }
+
+
+def _fold_task(train: np.ndarray, test: np.ndarray, engine_params: Dict[str, Any],
+               seed_sequence: np.random.SeedSequence, feature_names: List[str]) -> Dict[str, Any]:
+    """在工作进程中训练一折（数据集由 dataset_pool 挂载）"""
+    return _train_fold(dataset_state['X'], dataset_state['y'], train, test,
+                       engine_params, seed_sequence, feature_names)
+
+
+def aggregate_fold_metrics(fold_metrics: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """各折指标的均值、标准差、最小值与最大值"""
+    aggregate = {}
+    for key in fold_metrics[0] if fold_metrics else []:
+        values = np.array([metrics[key] for metrics in fold_metrics], dtype=np.float64)
+        aggregate[key] = {
+            'mean': float(np.mean(values)),
+            'std': float(np.std(values, ddof=1)) if len(values) > 1 else 0.0,
+            'min': float(np.min(values)),
+            'max': float(np.max(values)),
+        }
+    return aggregate
+
+
+def cross_validate(X: np.ndarray, y: np.ndarray, feature_names: List[str],
+                   split_spec: Optional[Dict[str, Any]], engine_params: Dict[str, Any],
+                   seed: Any = None, workers: int = 1) -> Dict[str, Any]:
+    """
+    交叉验证符号回归
+
+    Args:
+        X: (样本 × 特征) 矩阵
+        y: 目标值
+        feature_names: 特征名
+        split_spec: 划分参数（见 normalize_split_spec）
+        engine_params: GPEngine 参数（每折引擎单进程评估）
+        seed: 根种子，第 i 折使用其第 i 个子流
+        workers: 并行训练各折的进程数
+
+    Returns:
+        各折结果与按折汇总的指标
+    """
+    start_time = time.time()
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    spec = normalize_split_spec(split_spec)
+    folds, cached = split_cache.get(y, spec, dataset_hash(X, y))
+    sequences = spawn_sequences(seed, len(folds))
+    workers = max(1, min(int(workers), len(folds)))
+    logger.info(f"交叉验证开始: {spec['method']}，{len(folds)} 折，{workers} 个进程"
+                f"{'（折下标来自缓存）' if cached else ''}")
+
+    if workers > 1:
+        with dataset_pool(X, y, workers) as pool:
+            futures = [pool.submit(_fold_task, fold['train'], fold['test'], engine_params,
+                                   sequences[i], list(feature_names))
+                       for i, fold in enumerate(folds)]
+            results = [future.result() for future in futures]
+    else:
+        results = [_train_fold(X, y, fold['train'], fold['test'], engine_params,
+                               sequences[i], list(feature_names))
+                   for i, fold in enumerate(folds)]
+
+    for fold, result in zip(folds, results):
+        result.update(repeat=fold['repeat'], fold=fold['fold'])
+    return {
+        'split': spec,
+        'n_folds': len(folds),
+        'n_samples': int(len(y)),
+        'folds': results,
+        'metrics': aggregate_fold_metrics([result['detailed_metrics'] for result in results]),
+        'workers': workers,
+        'split_cached': cached,
+        'elapsed': round(time.time() - start_time, 3),
+    }
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+符号回归表达式编译器
+
+把已保存模型的中缀表达式（expression / expression_text）或 impact_tree 解析一次，
+经常数折叠与“常数 × 变量”合并后，生成按寄存器分配的 NumPy 指令序列：
+每条指令是一次带 out= 参数的 ufunc 调用，标量操作数不展开为数组，
+按行分块执行以复用预分配的寄存器缓冲区。
+
+编译结果按 (model_id, 内容哈希) 缓存，模型内容被修改（如表达式树编辑）后自动重新编译。
+"""
+
+import hashlib
+import json
+import re
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+# 指令操作码（以 == 比较，序列化到工作进程后仍然有效）
+_VAR = 'var'
+_BINARY = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.divide,
+}
+
+# impact_tree 节点名称到运算符的映射
+_TREE_OPERATORS = {
+    'Addition': '+',
+    'Subtraction': '-',
+    'Multiplication': '*',
+    'Division': '/',
+}
+
+# 单块求值的行数
+DEFAULT_CHUNK_ROWS = 1 << 15
+# impact_tree 往返校验使用的最大行数与相对容差（编译时的常数折叠只带来舍入差异）
+IMPACT_TREE_CHECK_ROWS = 1000
+IMPACT_TREE_RTOL = 1e-9
+
+_NUMBER = re.compile(r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|inf|nan')
+
+# 表达式语法树节点：('const', 值) | ('var', 特征下标, 权重) | ('bin', 运算符, 左, 右)
+Node = Tuple
+
+
+def _const(value: float) -> Node:
+    return ('const', float(value))
+
+
+def _binary(op: str, left: Node, right: Node) -> Node:
+    """构造二元节点，同时做常数折叠与“常数 × 变量”合并"""
+    if left[0] == 'const' and right[0] == 'const':
+        with np.errstate(all='ignore'):
+            return _const(_BINARY[op](np.float64(left[1]), np.float64(right[1])))
+    if op == '*':
+        if left[0] == 'const' and right[0] == 'var':
+            return ('var', right[1], left[1] * right[2])
+        if left[0] == 'var' and right[0] == 'const':
+            return ('var', left[1], left[2] * right[1])
+    if op == '/' and left[0] == 'var' and right[0] == 'const' and right[1] != 0:
+        return ('var', left[1], left[2] / right[1])
+    return ('bin', op, left, right)
+
+
+class _Parser:
+    """
+    中缀表达式递归下降解析器（变量名按已知特征名最长匹配）
+
+    fold=False 时保留原始树结构（供表达式树编辑使用）：不做常数折叠，
+    只把 “w * X” 读作一个加权变量叶子、把负号直接作用于数字
+    """
+
+    def __init__(self, text: str, feature_names: List[str], fold: bool = True):
+        self.text = text
+        self.pos = 0
+        self.fold = fold
+        self.index = {name: i for i, name in enumerate(feature_names)}
+        self.names = sorted(feature_names, key=len, reverse=True)
+
+    def parse(self) -> Node:
+        node = self._expression()
+        self._skip()
+        if self.pos != len(self.text):
+            raise ValueError(f"表达式在位置 {self.pos} 处无法解析: {self.text[self.pos:self.pos + 20]!r}")
+        return node
+
+    def _combine(self, op: str, left: Node, right: Node) -> Node:
+        if self.fold:
+            return _binary(op, left, right)
+        if op == '*' and left[0] == 'const' and right[0] == 'var' and right[2] == 1.0:
+            return ('var', right[1], left[1])
+        return ('bin', op, left, right)
+
+    def _skip(self):
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def _peek(self) -> str:
+        self._skip()
+        return self.text[self.pos] if self.pos < len(self.text) else ''
+
+    def _expression(self) -> Node:
+        node = self._term()
+        while self._peek() in ('+', '-'):
+            op = self.text[self.pos]
+            self.pos += 1
+            node = self._combine(op, node, self._term())
+        return node
+
+    def _term(self) -> Node:
+        node = self._unary()
+        while self._peek() in ('*', '/'):
+            op = self.text[self.pos]
+            self.pos += 1
+            node = self._combine(op, node, self._unary())
+        return node
+
+    def _unary(self) -> Node:
+        if self._peek() == '-':
+            self.pos += 1
+            operand = self._unary()
+            if not self.fold and operand[0] == 'const':
+                return _const(-operand[1])
+            return self._combine('*', _const(-1.0), operand)
+        if self._peek() == '+':
+            self.pos += 1
+            return self._unary()
+        return self._primary()
+
+    def _primary(self) -> Node:
+        char = self._peek()
+        if char == '(':
+            self.pos += 1
+            node = self._expression()
+            if self._peek() != ')':
+                raise ValueError(f"表达式缺少右括号（位置 {self.pos}）")
+            self.pos += 1
+            return node
+        for name in self.names:
+            if self.text.startswith(name, self.pos):
+                end = self.pos + len(name)
+                # 避免把更长的未知标识符的前缀当作特征名
+                if end == len(self.text) or not (self.text[end].isalnum() or self.text[end] == '_'):
+                    self.pos = end
+                    return ('var', self.index[name], 1.0)
+        match = _NUMBER.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            return _const(float(match.group()))
+        raise ValueError(f"表达式中存在未知变量或符号（位置 {self.pos}）: {self.text[self.pos:self.pos + 20]!r}")
+
+
+def _parse_tree(tree: Dict[str, Any], feature_names: List[str], fold: bool = True) -> Node:
+    """
+    解析 impact_tree：{'op', 'children'} / {'label', 'impact'} 节点，
+    或旧版以节点名为键的嵌套字典（同名兄弟节点在旧格式中无法区分）
+    """
+    if 'op' in tree or 'label' in tree:
+        return _parse_impact_node(tree, feature_names, fold)
+    if len(tree) != 1:
+        raise ValueError("impact_tree 根节点必须唯一")
+    key, value = next(iter(tree.items()))
+    return _parse_tree_node(key, value, feature_names, fold)
+
+
+def _parse_impact_node(node: Dict[str, Any], feature_names: List[str], fold: bool = True) -> Node:
+    if 'op' in node:
+        key = node['op']
+        children = node.get('children')
+        if key not in _TREE_OPERATORS:
+            raise ValueError(f"impact_tree 中存在未知运算符: {key}")
+        if not isinstance(children, list) or len(children) != 2:
+            raise ValueError(f"impact_tree 节点 {key} 必须恰好有两个子节点")
+        left = _parse_impact_node(children[0], feature_names, fold)
+        right = _parse_impact_node(children[1], feature_names, fold)
+        return _binary(_TREE_OPERATORS[key], left, right) if fold else ('bin', _TREE_OPERATORS[key], left, right)
+    return _Parser(str(node['label']), feature_names, fold).parse()
+
+
+def _parse_tree_node(key: str, value: Any, feature_names: List[str], fold: bool = True) -> Node:
+    if key in _TREE_OPERATORS:
+        if not isinstance(value, dict) or len(value) != 2:
+            raise ValueError(f"impact_tree 节点 {key} 必须恰好有两个子节点")
+        (left_key, left_value), (right_key, right_value) = value.items()
+        left = _parse_tree_node(left_key, left_value, feature_names, fold)
+        right = _parse_tree_node(right_key, right_value, feature_names, fold)
+        return _binary(_TREE_OPERATORS[key], left, right) if fold else ('bin', _TREE_OPERATORS[key], left, right)
+    return _Parser(key, feature_names, fold).parse()
+
+
+class CompiledExpression:
+    """编译后的表达式求值计划"""
+
+    def __init__(self, root: Node, features: List[str], chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.features = list(features)
+        self.chunk_rows = int(chunk_rows)
+        self.constant: Optional[float] = root[1] if root[0] == 'const' else None
+        self.instructions: List[Tuple] = []
+        self.n_registers = 0
+        self._free: List[int] = []
+        if self.constant is None:
+            self.result = self._emit(root)
+        self.n_nodes = self._count(root)
+        # 只读取表达式中出现的特征列，变量指令改为引用压缩后的列号
+        self.used_columns = sorted({ins[2] for ins in self.instructions if ins[0] == _VAR})
+        position = {column: i for i, column in enumerate(self.used_columns)}
+        self.instructions = [(ins[0], ins[1], position[ins[2]], ins[3]) if ins[0] == _VAR else ins
+                             for ins in self.instructions]
+
+    @staticmethod
+    def _count(node: Node) -> int:
+        if node[0] == 'bin':
+            return 1 + CompiledExpression._count(node[2]) + CompiledExpression._count(node[3])
+        return 1
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        self.n_registers += 1
+        return self.n_registers - 1
+
+    def _emit(self, node: Node) -> Union[int, float]:
+        """后序生成指令，返回结果所在寄存器（常数返回标量）"""
+        kind = node[0]
+        if kind == 'const':
+            return node[1]
+        if kind == 'var':
+            register = self._allocate()
+            self.instructions.append((_VAR, register, node[1], node[2]))
+            return register
+        _, op, left, right = node
+        a = self._emit(left)
+        b = self._emit(right)
+        if isinstance(a, int):
+            target = a
+            if isinstance(b, int):
+                self._free.append(b)
+        else:
+            target = b
+        self.instructions.append((_BINARY[op], target, a, b))
+        return target
+
+    def evaluate(self, X: np.ndarray, dtype=np.float64) -> np.ndarray:
+        """在 (样本 × 特征) 矩阵上求值，列顺序与 self.features 一致；dtype 为求值精度"""
+        X = np.asarray(X, dtype=dtype)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"输入矩阵应为 (样本 × {len(self.features)}) ，实际为 {X.shape}")
+        used = self.used_columns
+        return self._run(X.shape[0], lambda start, stop: X[start:stop].T[used], dtype)
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], dtype=np.float64) -> np.ndarray:
+        """按特征名提供各列数据求值（缺失的特征视为错误）；dtype 为求值精度"""
+        missing = [name for name in self.features if name not in columns]
+        if missing:
+            raise ValueError(f"缺少特征列: {missing}")
+        n_rows = len(columns[self.features[0]]) if self.features else 0
+        arrays = [np.asarray(columns[self.features[i]], dtype=dtype) for i in self.used_columns]
+        return self._run(n_rows, lambda start, stop: [array[start:stop] for array in arrays], dtype)
+
+    def evaluate_generated(self, n_rows: int, columns, dtype=np.float64) -> np.ndarray:
+        """
+        在按需生成的输入上求值：columns(start, stop) 返回该行块上 used_columns 各列的数据，
+        用于不必整体物化的大输入（如置换重要性的堆叠副本）
+        """
+        return self._run(n_rows, columns, dtype)
+
+    def _run(self, n_rows: int, columns, dtype=np.float64) -> np.ndarray:
+        if self.constant is not None:
+            return np.full(n_rows, self.constant, dtype=dtype)
+        output = np.empty(n_rows, dtype=dtype)
+        registers = np.empty((self.n_registers, min(self.chunk_rows, max(n_rows, 1))), dtype=dtype)
+        with np.errstate(all='ignore'):
+            for start in range(0, n_rows, self.chunk_rows):
+                stop = min(start + self.chunk_rows, n_rows)
+                size = stop - start
+                data = columns(start, stop)
+                regs = registers[:, :size]
+                for instruction in self.instructions:
+                    func, target, a, b = instruction
+                    if func == _VAR:
+                        np.multiply(data[a], b, out=regs[target])
+                    else:
+                        func(regs[a] if isinstance(a, int) else a,
+                             regs[b] if isinstance(b, int) else b, out=regs[target])
+                output[start:stop] = regs[self.result]
+        return output
+
+
+def compile_expression(expression: str, feature_names: List[str]) -> CompiledExpression:
+    """编译中缀表达式"""
+    return CompiledExpression(_Parser(expression, feature_names).parse(), feature_names)
+
+
+def compile_impact_tree(tree: Dict[str, Any], feature_names: List[str]) -> CompiledExpression:
+    """编译 impact_tree（旧版嵌套字典的叶子常数为保存时的有效数字精度）"""
+    return CompiledExpression(_parse_tree(tree, feature_names), feature_names)
+
+
+def check_impact_tree(tree: Dict[str, Any], feature_names: List[str], XT: np.ndarray,
+                      expected: np.ndarray) -> None:
+    """
+    往返校验：编译 impact_tree 在前 IMPACT_TREE_CHECK_ROWS 行 (特征 × 样本) 上的预测应与原程序一致，
+    否则抛出 ValueError
+    """
+    rows = min(XT.shape[1], IMPACT_TREE_CHECK_ROWS)
+    predicted = compile_impact_tree(tree, feature_names).evaluate(XT[:, :rows].T)
+    expected = np.asarray(expected, dtype=np.float64)[:rows]
+    finite = np.isfinite(expected)
+    scale = float(np.max(np.abs(expected[finite]))) if finite.any() else 0.0
+    if not np.allclose(predicted, expected, rtol=IMPACT_TREE_RTOL, atol=IMPACT_TREE_RTOL * scale,
+                       equal_nan=True):
+        raise ValueError("impact_tree 与表达式程序的预测不一致")
+
+
+def model_feature_names(model: Dict[str, Any]) -> List[str]:
+    """模型的特征列顺序：优先 feature_columns，旧模型退回 feature_importance 中的名称"""
+    names = model.get('feature_columns')
+    if not names:
+        names = [item['feature'] for item in model.get('feature_importance', [])]
+    return list(names)
+
+
+def _model_source(model: Dict[str, Any]) -> Tuple[str, Any]:
+    """选择编译来源：中缀表达式优先（LaTeX 公式不可编译），其次 impact_tree"""
+    for key in ('expression_text', 'expression'):
+        text = model.get(key)
+        if isinstance(text, str) and text and '\\' not in text:
+            return 'expression', text
+    if model.get('impact_tree'):
+        return 'impact_tree', model['impact_tree']
+    raise ValueError("模型中没有可编译的表达式或 impact_tree")
+
+
+def parse_model(model: Dict[str, Any], fold: bool = True) -> Node:
+    """解析模型字典为语法树（fold=False 保留原始结构）"""
+    kind, source = _model_source(model)
+    features = model_feature_names(model)
+    if kind == 'expression':
+        return _Parser(source, features, fold).parse()
+    return _parse_tree(source, features, fold)
+
+
+def compile_model(model: Dict[str, Any]) -> CompiledExpression:
+    """编译模型字典"""
+    return CompiledExpression(parse_model(model), model_feature_names(model))
+
+
+def model_content_hash(model: Dict[str, Any]) -> str:
+    """参与编译的模型内容哈希"""
+    kind, source = _model_source(model)
+    payload = json.dumps([kind, source, model_feature_names(model)], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ExpressionCache:
+    """按 (model_id, 内容哈希) 缓存编译结果的 LRU（线程安全，供并发请求共享）"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = int(max_entries)
+        self._entries: 'OrderedDict[Tuple[str, str], CompiledExpression]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_id: str, model: Dict[str, Any]) -> CompiledExpression:
+        key = (str(model_id), model_content_hash(model))
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                return compiled
+        # 编译在锁外进行，并发请求同一模型时最多重复编译一次
+        compiled = compile_model(model)
+        with self._lock:
+            self._entries[key] = compiled
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 进程内共享的编译缓存
+expression_cache = ExpressionCache()
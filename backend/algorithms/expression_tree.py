@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表达式树编辑引擎（表达式树页面的删除 / 化简 / 优化 / 撤销）
+
+已保存模型的表达式解析为不可变节点树，每个节点缓存其子树在模型 CSV 全部行上的输出向量。
+删除与化简只为被修改位置到根的路径上的节点创建新节点并重新求值（每个节点一次 ufunc），
+未改动的子树连同输出向量原样共享；撤销直接切回上一版本的根节点，无需重新计算。
+节点影响力由全部子树的批量消融得到，同样复用各节点的缓存输出（见 node_impact）。
+优化对全部叶子数值做 Levenberg–Marquardt 拟合，之后整树重新求值。
+"""
+
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+from .gp_engine import (OP_CONST, OP_VAR, OP_ADD, OP_SUB, OP_MUL, OP_DIV,
+                        program_to_infix, program_to_latex, program_to_impact_tree)
+from .constant_optimizer import ConstantOptimizer
+from .node_impact import ablation_impacts, feature_totals
+from .metrics import detailed_metrics
+from .expression_compiler import Node, check_impact_tree, parse_model, model_feature_names
+from .symbolic_regression import SymbolicRegression
+
+EXPR_TREE_ACTIONS = ('delete', 'simplify', 'optimize', 'undo')
+
+# 优化操作的 LM 迭代次数与参与拟合的最大训练行数（雅可比张量随行数线性增长）
+OPTIMIZE_ITERATIONS = 15
+OPTIMIZE_MAX_ROWS = 500
+
+_UFUNCS = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide}
+_OPCODES = {'+': OP_ADD, '-': OP_SUB, '*': OP_MUL, '/': OP_DIV}
+_SYMBOLS = {code: symbol for symbol, code in _OPCODES.items()}
+
+
+class TreeNode:
+    """
+    不可变表达式树节点
+
+    kind 为 'const'（value 为常数）、'var'（feature 为特征下标，value 为权重）或 'bin'（op 与左右子节点）；
+    output 为该子树在全部数据行上的输出（常数节点为广播视图）
+    """
+
+    __slots__ = ('kind', 'op', 'feature', 'value', 'children', 'output', 'size', 'depth')
+
+    def __init__(self, kind: str, output: np.ndarray, op: Optional[str] = None,
+                 feature: int = -1, value: float = 0.0, children: Tuple['TreeNode', ...] = ()):
+        self.kind = kind
+        self.op = op
+        self.feature = feature
+        self.value = value
+        self.children = children
+        self.output = output
+        self.size = 1 + sum(child.size for child in children)
+        self.depth = 1 + max((child.depth for child in children), default=0)
+
+    def is_const(self, value: Optional[float] = None) -> bool:
+        return self.kind == 'const' and (value is None or self.value == value)
+
+
+class ExpressionTree:
+    """
+    在固定数据集上可编辑的表达式树
+
+    前 n_train 行为训练集（与模型训练时的划分一致），影响力与优化只使用训练集；
+    history 为之前各版本的根节点，进程重启后从持久化的中缀表达式恢复时为字符串，撤销时再解析
+    """
+
+    def __init__(self, root: Node, feature_names: List[str], X: np.ndarray, y: np.ndarray,
+                 n_train: int, history: Optional[List[Union[TreeNode, str]]] = None):
+        self.feature_names = list(feature_names)
+        self.XT = np.ascontiguousarray(np.asarray(X, dtype=np.float64).T)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.n_train = int(n_train)
+        self.n_rows = len(self.y)
+        self.history: List[Union[TreeNode, str]] = list(history or [])
+        self.root = self._build(root)
+
+    @classmethod
+    def from_model(cls, model: Dict[str, Any], X: np.ndarray, y: np.ndarray, n_train: int,
+                   history: Optional[List[str]] = None) -> 'ExpressionTree':
+        """由已保存的模型字典创建（保留原始树结构，不做常数折叠）"""
+        return cls(parse_model(model, fold=False), model_feature_names(model), X, y, n_train, history)
+
+    # ---------- 节点构造（构造即求值） ----------
+
+    def const(self, value: float) -> TreeNode:
+        value = float(value)
+        return TreeNode('const', np.broadcast_to(np.float64(value), (self.n_rows,)), value=value)
+
+    def var(self, feature: int, weight: float) -> TreeNode:
+        weight = float(weight)
+        return TreeNode('var', self.XT[feature] * weight, feature=int(feature), value=weight)
+
+    def binary(self, op: str, left: TreeNode, right: TreeNode) -> TreeNode:
+        with np.errstate(all='ignore'):
+            output = _UFUNCS[op](left.output, right.output)
+        return TreeNode('bin', output, op=op, children=(left, right))
+
+    def _build(self, node: Node) -> TreeNode:
+        if node[0] == 'const':
+            return self.const(node[1])
+        if node[0] == 'var':
+            return self.var(node[1], node[2])
+        return self.binary(node[1], self._build(node[2]), self._build(node[3]))
+
+    # ---------- 局部化简规则 ----------
+
+    def negate(self, node: TreeNode) -> TreeNode:
+        if node.kind == 'const':
+            return self.const(-node.value)
+        if node.kind == 'var':
+            return self.var(node.feature, -node.value)
+        return self.binary('*', self.const(-1.0), node)
+
+    def combine(self, op: str, a: TreeNode, b: TreeNode,
+                original: Optional[TreeNode] = None) -> TreeNode:
+        """
+        组合两个子节点并应用局部化简规则（常数折叠、单位元/零元、常数并入变量权重）；
+        无规则可用且子节点未变时返回 original 本身，复用其缓存输出
+        """
+        if a.kind == 'const' and b.kind == 'const':
+            with np.errstate(all='ignore'):
+                return self.const(_UFUNCS[op](np.float64(a.value), np.float64(b.value)))
+        if op == '+':
+            if a.is_const(0.0):
+                return b
+            if b.is_const(0.0):
+                return a
+        elif op == '-':
+            if b.is_const(0.0):
+                return a
+            if a.is_const(0.0):
+                return self.negate(b)
+        elif op == '*':
+            if a.is_const(0.0) or b.is_const(0.0):
+                return self.const(0.0)
+            if a.is_const(1.0):
+                return b
+            if b.is_const(1.0):
+                return a
+            if a.kind == 'const' and b.kind == 'var':
+                return self.var(b.feature, a.value * b.value)
+            if a.kind == 'var' and b.kind == 'const':
+                return self.var(a.feature, a.value * b.value)
+        elif op == '/':
+            if a.is_const(0.0):
+                return self.const(0.0)
+            if b.is_const(1.0):
+                return a
+            if a.kind == 'var' and b.kind == 'const' and b.value != 0:
+                return self.var(a.feature, a.value / b.value)
+        if original is not None and original.children[0] is a and original.children[1] is b:
+            return original
+        return self.binary(op, a, b)
+
+    # ---------- 编辑操作 ----------
+
+    def _path_nodes(self, path: List[int]) -> List[TreeNode]:
+        """根到目标节点路径上的节点（含两端）"""
+        nodes = [self.root]
+        for step in path:
+            node = nodes[-1]
+            if node.kind != 'bin' or step not in (0, 1):
+                raise ValueError(f"节点路径无效: {list(path)}")
+            nodes.append(node.children[step])
+        return nodes
+
+    def delete(self, path: List[int]) -> TreeNode:
+        """
+        删除 path 指向的子树：加、乘中由兄弟子树替代父节点；减法删被减数时取兄弟的相反数；
+        除法删分子得 0、删分母得分子。只重建被删节点到根路径上的节点
+        """
+        path = [int(step) for step in path]
+        if not path:
+            return self.const(0.0)
+        nodes = self._path_nodes(path)
+        parent, side = nodes[-2], path[-1]
+        sibling = parent.children[1 - side]
+        if parent.op in ('+', '*'):
+            replacement = sibling
+        elif parent.op == '-':
+            replacement = self.negate(sibling) if side == 0 else sibling
+        else:
+            replacement = self.const(0.0) if side == 0 else sibling
+        # 自下而上重建祖先节点，每层应用局部化简规则
+        for node, step in zip(reversed(nodes[:-2]), reversed(path[:-1])):
+            children = list(node.children)
+            children[step] = replacement
+            replacement = self.combine(node.op, children[0], children[1], node)
+        return replacement
+
+    def simplify(self, node: Optional[TreeNode] = None) -> TreeNode:
+        """自底向上化简；未发生变化的子树原样返回（输出不重算）"""
+        node = self.root if node is None else node
+        if node.kind != 'bin':
+            return node
+        left = self.simplify(node.children[0])
+        right = self.simplify(node.children[1])
+        return self.combine(node.op, left, right, node)
+
+    def optimize(self) -> TreeNode:
+        """化简后以 LM 重新拟合全部叶子数值（常数与变量权重），只接受使训练 MSE 下降的结果"""
+        root = self.simplify()
+        if root.kind == 'const' and self.n_train:
+            return self.const(np.mean(self.y[:self.n_train]))
+        ops, args, consts = self.to_program(root)
+        rows = np.arange(self.n_train)
+        if len(rows) > OPTIMIZE_MAX_ROWS:
+            rows = np.linspace(0, self.n_train - 1, OPTIMIZE_MAX_ROWS).astype(np.int64)
+        optimizer = ConstantOptimizer(self.XT[:, rows], self.y[rows], iterations=OPTIMIZE_ITERATIONS)
+        with np.errstate(all='ignore'):
+            error = np.mean((root.output[rows] - self.y[rows]) ** 2)
+        # 单棵树用反向模式雅可比，每次迭代的代价与叶子数无关
+        optimized, _ = optimizer.optimize_program(ops, args, consts, error)
+        return self.from_program(ops, args, optimized)
+
+    def apply(self, action: str, node_path: Optional[List[int]] = None) -> bool:
+        """
+        执行一次编辑（撤销时返回是否有可撤销的版本）
+
+        新版本与当前版本相同时同样记入历史，保证前端的操作计数与撤销一一对应
+        """
+        if action not in EXPR_TREE_ACTIONS:
+            raise ValueError(f"不支持的表达式树操作: {action}")
+        if action == 'undo':
+            if not self.history:
+                return False
+            previous = self.history.pop()
+            if isinstance(previous, str):
+                previous = self._build(parse_model({'expression_text': previous,
+                                                    'feature_columns': self.feature_names}, fold=False))
+            self.root = previous
+            return True
+        if action == 'delete':
+            if node_path is None:
+                raise ValueError("删除操作需要提供节点路径 node_path")
+            root = self.delete(node_path)
+        elif action == 'simplify':
+            root = self.simplify()
+        else:
+            root = self.optimize()
+        self.history.append(self.root)
+        self.root = root
+        return True
+
+    # ---------- 后缀程序互转 ----------
+
+    def postfix_nodes(self, root: Optional[TreeNode] = None) -> List[TreeNode]:
+        """后序（后缀）排列的全部节点"""
+        nodes: List[TreeNode] = []
+        stack = [(self.root if root is None else root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node.kind == 'bin' and not expanded:
+                stack.extend([(node, True), (node.children[1], False), (node.children[0], False)])
+            else:
+                nodes.append(node)
+        return nodes
+
+    def to_program(self, root: Optional[TreeNode] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """转换为后缀程序 (ops, args, consts)"""
+        nodes = self.postfix_nodes(root)
+        ops = [_OPCODES[node.op] if node.kind == 'bin' else OP_VAR if node.kind == 'var' else OP_CONST
+               for node in nodes]
+        args = [max(node.feature, 0) for node in nodes]
+        consts = [node.value if node.kind != 'bin' else 0.0 for node in nodes]
+        return (np.array(ops, dtype=np.int8), np.array(args, dtype=np.int16),
+                np.array(consts, dtype=np.float64))
+
+    def from_program(self, ops: np.ndarray, args: np.ndarray, consts: np.ndarray) -> TreeNode:
+        stack: List[TreeNode] = []
+        for op, arg, const in zip(ops, args, consts):
+            if op == OP_VAR:
+                stack.append(self.var(arg, const))
+            elif op == OP_CONST:
+                stack.append(self.const(const))
+            else:
+                right = stack.pop()
+                left = stack.pop()
+                stack.append(self.binary(_SYMBOLS[int(op)], left, right))
+        return stack[-1]
+
+    # ---------- 影响力与汇总 ----------
+
+    def node_impacts(self, ops: np.ndarray) -> np.ndarray:
+        """
+        各节点的消融影响力（按后缀位置，训练集上计算）：全部子树的消融一次批量完成，
+        兄弟子树直接取各节点缓存的输出
+        """
+        n = self.n_train
+        outputs = [node.output[:n] for node in self.postfix_nodes()]
+        return ablation_impacts(outputs, ops, self.y[:n])
+
+    def summary(self, constant_names: Optional[Dict[int, str]] = None) -> Dict[str, Any]:
+        """当前版本的表达式、常数表、详细指标、特征重要性与 impact_tree"""
+        ops, args, consts = self.to_program()
+        impacts = self.node_impacts(ops)
+        metrics = detailed_metrics(self.y, self.root.output, self.n_train)
+        metrics['model_depth'] = int(self.root.depth)
+        metrics['model_length'] = int(self.root.size)
+        expression_latex, constants = program_to_latex(ops, args, consts, self.feature_names,
+                                                       constant_names)
+        impact_tree = program_to_impact_tree(ops, args, consts, self.feature_names, impacts)
+        check_impact_tree(impact_tree, self.feature_names, self.XT, self.root.output)
+        return {
+            'expression': program_to_infix(ops, args, consts, self.feature_names),
+            'expression_latex': expression_latex,
+            'constants': constants,
+            'detailed_metrics': metrics,
+            'feature_importance': SymbolicRegression._aggregate_feature_importance(
+                feature_totals(ops, args, impacts, len(self.feature_names)), self.feature_names),
+            'impact_tree': impact_tree,
+        }
+
+    def history_expressions(self) -> List[str]:
+        """可持久化的历史版本（中缀表达式）"""
+        expressions = []
+        for entry in self.history:
+            if isinstance(entry, TreeNode):
+                entry = program_to_infix(*self.to_program(entry), self.feature_names)
+            expressions.append(entry)
+        return expressions
+
+
+class TreeSessionCache:
+    """
+    按 model_id 缓存正在编辑的表达式树（含节点输出与历史版本）的 LRU
+
+    缓存的版本与持久化的表达式不一致（如模型文件被其他途径修改）时视为失效。
+    ExpressionTree.apply 会原地修改缓存的树，同一模型的 get → apply → put（及模型文件的读写）
+    须在 lock(model_id) 内完成，不同模型的编辑互不阻塞
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = int(max_entries)
+        self._entries: 'OrderedDict[str, Tuple[str, int, ExpressionTree]]' = OrderedDict()
+        self._model_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def lock(self, model_id: str) -> threading.Lock:
+        """模型的编辑锁（同一 model_id 始终返回同一把锁）"""
+        with self._lock:
+            return self._model_locks.setdefault(str(model_id), threading.Lock())
+
+    def get(self, model_id: str, expression: str, history_length: int) -> Optional[ExpressionTree]:
+        with self._lock:
+            entry = self._entries.get(str(model_id))
+            if entry is None or entry[0] != expression or entry[1] != history_length:
+                return None
+            self._entries.move_to_end(str(model_id))
+            return entry[2]
+
+    def put(self, model_id: str, expression: str, tree: ExpressionTree):
+        with self._lock:
+            self._entries[str(model_id)] = (expression, len(tree.history), tree)
+            self._entries.move_to_end(str(model_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# 进程内共享的表达式树编辑会话
+tree_sessions = TreeSessionCache()
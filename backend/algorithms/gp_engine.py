@@ -0,0 +1,809 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+遗传规划（GP）符号回归引擎
+
+个体以定长数组存储的后缀（逆波兰）序列表示：
+    ops    - 操作码矩阵 (种群 × 最大长度)，超出个体长度的位置为 OP_PAD
+    args   - 变量下标矩阵，仅 OP_VAR 位置有效
+    consts - 常数矩阵，OP_CONST 位置为常数值，OP_VAR 位置为变量权重
+叶子节点与 HeuristicLab 一致，采用加权变量（w * X）与常数两种形式。
+"""
+
+import numpy as np
+from typing import Dict, List, Any, Optional, Tuple, Callable
+from loguru import logger
+import time
+
+from .pareto import pareto_front, selection_scores, select_survivors
+
+# 操作码
+OP_PAD = 0
+OP_CONST = 1
+OP_VAR = 2
+OP_ADD = 3
+OP_SUB = 4
+OP_MUL = 5
+OP_DIV = 6
+
+N_OPCODES = 7
+
+# 各操作码的元数（OP_PAD 不参与计算）
+ARITY = np.array([0, 0, 0, 2, 2, 2, 2], dtype=np.int64)
+
+# 前端语法选项到操作码的映射
+GRAMMAR_OPCODES = {
+    'addition': OP_ADD,
+    'subtraction': OP_SUB,
+    'multiplication': OP_MUL,
+    'division': OP_DIV,
+}
+
+# 与 impact_tree 中使用的节点名称保持一致
+OP_NAMES = {
+    OP_ADD: 'Addition',
+    OP_SUB: 'Subtraction',
+    OP_MUL: 'Multiplication',
+    OP_DIV: 'Division',
+}
+
+OP_SYMBOLS = {
+    OP_ADD: '+',
+    OP_SUB: '-',
+    OP_MUL: '*',
+    OP_DIV: '/',
+}
+
+BINARY_FUNCTIONS = {
+    OP_ADD: np.add,
+    OP_SUB: np.subtract,
+    OP_MUL: np.multiply,
+    OP_DIV: np.divide,
+}
+
+DEFAULT_GRAMMAR = ['addition', 'subtraction', 'multiplication', 'division']
+
+# 多目标模式下可与误差同时最小化的复杂度目标
+PARETO_OBJECTIVES = ('length', 'depth')
+
+# 适应度评估精度选项
+PRECISIONS = ('float64', 'float32')
+
+# 单精度评估结束后以 float64 重新评分的最优个体数（名人堂）
+HALL_OF_FAME_SIZE = 20
+
+
+def resolve_grammar(grammar: Optional[List[str]]) -> List[int]:
+    """将语法名称列表转换为操作码列表"""
+    names = grammar if grammar else DEFAULT_GRAMMAR
+    opcodes = []
+    for name in names:
+        key = str(name).strip().lower()
+        if key not in GRAMMAR_OPCODES:
+            raise ValueError(f"不支持的表达式语法: {name}")
+        if GRAMMAR_OPCODES[key] not in opcodes:
+            opcodes.append(GRAMMAR_OPCODES[key])
+    if not opcodes:
+        raise ValueError("表达式语法不能为空")
+    return opcodes
+
+
+class Population:
+    """数组存储的后缀表达式种群"""
+
+    def __init__(self, ops: np.ndarray, args: np.ndarray, consts: np.ndarray, lengths: np.ndarray):
+        self.ops = ops
+        self.args = args
+        self.consts = consts
+        self.lengths = lengths
+
+    @classmethod
+    def empty(cls, size: int, width: int) -> 'Population':
+        """创建空种群"""
+        return cls(
+            np.zeros((size, width), dtype=np.int8),
+            np.zeros((size, width), dtype=np.int16),
+            np.zeros((size, width), dtype=np.float64),
+            np.zeros(size, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_programs(cls, programs: List[Tuple[List[int], List[int], List[float]]],
+                      width: int) -> 'Population':
+        """由 (ops, args, consts) 列表构建种群"""
+        population = cls.empty(len(programs), width)
+        for i, (ops, args, consts) in enumerate(programs):
+            n = len(ops)
+            population.ops[i, :n] = ops
+            population.args[i, :n] = args
+            population.consts[i, :n] = consts
+            population.lengths[i] = n
+        return population
+
+    @classmethod
+    def concat(cls, populations: List['Population']) -> 'Population':
+        """拼接多个种群"""
+        return cls(
+            np.concatenate([p.ops for p in populations]),
+            np.concatenate([p.args for p in populations]),
+            np.concatenate([p.consts for p in populations]),
+            np.concatenate([p.lengths for p in populations]),
+        )
+
+    @property
+    def width(self) -> int:
+        return self.ops.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def take(self, index) -> 'Population':
+        """按下标选取个体（返回副本）"""
+        return Population(self.ops[index].copy(), self.args[index].copy(),
+                          self.consts[index].copy(), self.lengths[index].copy())
+
+    def program(self, i: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """取出第 i 个个体的有效后缀序列"""
+        n = int(self.lengths[i])
+        return self.ops[i, :n], self.args[i, :n], self.consts[i, :n]
+
+
+def random_program(rng: np.random.Generator, depth: int, n_features: int,
+                   function_ops: List[int], full: bool = False,
+                   const_prob: float = 0.2) -> Tuple[List[int], List[int], List[float]]:
+    """以 grow/full 方法随机生成一棵表达式树，返回后缀序列"""
+    ops: List[int] = []
+    args: List[int] = []
+    consts: List[float] = []
+
+    def grow(level: int):
+        is_leaf = level >= depth or (not full and level > 1 and rng.random() < 0.5)
+        if is_leaf:
+            if rng.random() < const_prob:
+                ops.append(OP_CONST)
+                args.append(0)
+                consts.append(float(rng.uniform(-5.0, 5.0)))
+            else:
+                ops.append(OP_VAR)
+                args.append(int(rng.integers(n_features)))
+                consts.append(float(rng.normal(1.0, 1.0)))
+            return
+        op = function_ops[int(rng.integers(len(function_ops)))]
+        for _ in range(ARITY[op]):
+            grow(level + 1)
+        ops.append(op)
+        args.append(0)
+        consts.append(0.0)
+
+    grow(1)
+    return ops, args, consts
+
+
+def ramped_half_and_half(rng: np.random.Generator, size: int, n_features: int,
+                         function_ops: List[int], max_depth: int, max_length: int) -> Population:
+    """ramped half-and-half 初始化种群，保证长度与深度约束"""
+    init_depth = max(1, min(max_depth, int(np.log2(max_length + 1))))
+    depths = np.arange(min(2, init_depth), init_depth + 1)
+    programs = []
+    for i in range(size):
+        depth = int(depths[i % len(depths)])
+        full = (i // len(depths)) % 2 == 0
+        program = random_program(rng, depth, n_features, function_ops, full=full)
+        while len(program[0]) > max_length:
+            program = random_program(rng, depth, n_features, function_ops, full=False)
+        programs.append(program)
+    return Population.from_programs(programs, max_length)
+
+
+def subtree_starts(ops: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    计算以 ends 为根的子树在后缀序列中的起始位置（按行向量化）
+
+    对后缀序列，记每个节点的栈效应 e = 1 - arity，则以 i 为根的子树
+    是满足 sum(e[j..i]) == 1 的最大 j。
+    """
+    effect = 1 - ARITY[ops]
+    effect[ops == OP_PAD] = 0
+    cum = np.cumsum(effect, axis=1)
+    cum_before = cum - effect
+    rows = np.arange(len(ops))
+    target = cum[rows, ends] - 1
+    positions = np.arange(ops.shape[1])
+    mask = (cum_before == target[:, None]) & (positions[None, :] <= ends[:, None])
+    return ops.shape[1] - 1 - np.argmax(mask[:, ::-1], axis=1)
+
+
+def program_depths(ops: np.ndarray) -> np.ndarray:
+    """按位置同步模拟栈，计算每个个体的树深度"""
+    n, width = ops.shape
+    stack = np.zeros((n, width // 2 + 2), dtype=np.int64)
+    sp = np.zeros(n, dtype=np.int64)
+    for pos in range(width):
+        op = ops[:, pos]
+        leaf = np.flatnonzero((op == OP_VAR) | (op == OP_CONST))
+        if len(leaf):
+            stack[leaf, sp[leaf]] = 1
+            sp[leaf] += 1
+        binary = np.flatnonzero(op >= OP_ADD)
+        if len(binary):
+            top = sp[binary]
+            stack[binary, top - 2] = np.maximum(stack[binary, top - 2], stack[binary, top - 1]) + 1
+            sp[binary] -= 1
+    return stack[:, 0]
+
+
+def splice(receiver: Population, r_start: np.ndarray, r_end: np.ndarray,
+           donor: Population, d_start: np.ndarray, d_end: np.ndarray) -> Population:
+    """
+    将 donor 的子树 [d_start, d_end] 替换到 receiver 的子树 [r_start, r_end] 位置（按行向量化）
+
+    receiver 与 donor 逐行对应；超出宽度的结果在调用方按长度约束处理。
+    """
+    width = receiver.width
+    seg1 = r_start
+    seg2 = d_end - d_start + 1
+    seg3 = receiver.lengths - r_end - 1
+    lengths = seg1 + seg2 + seg3
+
+    k = np.arange(width)[None, :]
+    in_donor = (k >= seg1[:, None]) & (k < (seg1 + seg2)[:, None])
+    valid = k < lengths[:, None]
+    pos = np.where(k < seg1[:, None], k,
+                   np.where(in_donor, d_start[:, None] + k - seg1[:, None],
+                            r_end[:, None] + 1 + k - (seg1 + seg2)[:, None]))
+    pos = np.clip(pos, 0, width - 1)
+    rows = np.arange(len(receiver))[:, None]
+
+    ops = np.where(in_donor, donor.ops[rows, pos], receiver.ops[rows, pos])
+    args = np.where(in_donor, donor.args[rows, pos], receiver.args[rows, pos])
+    consts = np.where(in_donor, donor.consts[rows, pos], receiver.consts[rows, pos])
+    ops[~valid] = OP_PAD
+    args[~valid] = 0
+    consts[~valid] = 0.0
+    return Population(ops.astype(np.int8), args.astype(np.int16), consts, lengths)
+
+
+def evaluate_program(ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                     XT: np.ndarray) -> np.ndarray:
+    """在整张特征矩阵上执行单个后缀程序（XT 为 特征 × 样本）"""
+    n_samples = XT.shape[1]
+    stack = []
+    with np.errstate(all='ignore'):
+        for op, arg, const in zip(ops, args, consts):
+            if op == OP_VAR:
+                stack.append(const * XT[arg])
+            elif op == OP_CONST:
+                stack.append(np.full(n_samples, const))
+            else:
+                right = stack.pop()
+                left = stack.pop()
+                stack.append(BINARY_FUNCTIONS[op](left, right))
+    return stack[-1]
+
+
+def linear_scaling_coefficients(predictions: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    逐个体的最优仿射变换 y ≈ a + b·f（闭式最小二乘解）
+
+    f 为常数（方差为 0）时 b = 0、a = mean(y)。
+    """
+    with np.errstate(all='ignore'):
+        f_mean = np.mean(predictions, axis=-1)
+        y_mean = np.mean(y)
+        centered = predictions - f_mean[..., None]
+        variance = np.mean(centered * centered, axis=-1)
+        covariance = np.mean(centered * (y - y_mean), axis=-1)
+        flat = ~(variance > np.finfo(np.float64).tiny)
+        b = np.where(flat, 0.0, covariance / np.where(flat, 1.0, variance))
+        a = y_mean - b * np.where(flat, 0.0, f_mean)
+    return a, b
+
+
+def scaled_mean_squared_errors(predictions: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """线性缩放后的逐个体均方误差 MSE(a + b·f, y)，非有限值视为无穷大"""
+    a, b = linear_scaling_coefficients(predictions, y)
+    with np.errstate(all='ignore'):
+        errors = np.mean((a[..., None] + b[..., None] * predictions - y) ** 2, axis=-1)
+    errors[~np.isfinite(errors)] = np.inf
+    return errors
+
+
+def append_linear_scaling(ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                          a: float, b: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """把缩放系数并入单个后缀程序：f → f * b + a"""
+    return (np.concatenate([ops, np.array([OP_CONST, OP_MUL, OP_CONST, OP_ADD], dtype=ops.dtype)]),
+            np.concatenate([args, np.zeros(4, dtype=args.dtype)]),
+            np.concatenate([consts, np.array([b, 0.0, a, 0.0])]))
+
+
+def objective_matrix(population: Population, errors: np.ndarray,
+                     pareto_objectives: List[str]) -> np.ndarray:
+    """多目标目标矩阵 (个体 × 目标)：误差（非有限值为 +inf）与各复杂度目标（length / depth）"""
+    columns = [np.where(np.isfinite(errors), errors, np.inf)]
+    for name in pareto_objectives:
+        if name == 'length':
+            columns.append(population.lengths.astype(np.float64))
+        else:
+            columns.append(program_depths(population.ops).astype(np.float64))
+    return np.column_stack(columns)
+
+
+class GPEngine:
+    """基于数组后缀表示的遗传规划引擎"""
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, population_size: int = 100,
+                 generations: int = 50, max_tree_depth: int = 35, max_tree_length: int = 35,
+                 grammar: Optional[List[str]] = None, rng: Optional[np.random.Generator] = None,
+                 tournament_size: int = 5, crossover_rate: float = 0.9,
+                 mutation_rate: float = 0.15, elitism: int = 1, workers: int = 1,
+                 subtree_cache: bool = False, cache_max_bytes: Optional[int] = None,
+                 constant_optimization_top_k: int = 0, constant_optimization_iterations: int = 10,
+                 linear_scaling: bool = False, semantic_dedup: bool = False,
+                 semantic_diversity: bool = False, multi_objective: bool = False,
+                 pareto_objectives: Optional[List[str]] = None, racing: bool = False,
+                 racing_min_rows: Optional[int] = None, racing_eta: Optional[int] = None,
+                 precision: str = 'float64'):
+        if max_tree_length < 1 or max_tree_depth < 1:
+            raise ValueError("表达式树最大长度和深度必须为正整数")
+        if precision not in PRECISIONS:
+            raise ValueError(f"不支持的评估精度: {precision}")
+        self.XT = np.ascontiguousarray(np.asarray(X, dtype=np.float64).T)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.n_features = self.XT.shape[0]
+        self.population_size = int(population_size)
+        self.generations = int(generations)
+        self.max_tree_depth = int(max_tree_depth)
+        self.max_tree_length = int(max_tree_length)
+        self.function_ops = resolve_grammar(grammar)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.tournament_size = int(tournament_size)
+        self.crossover_rate = float(crossover_rate)
+        self.mutation_rate = float(mutation_rate)
+        self.elitism = max(1, int(elitism))
+        self.history: List[Dict[str, float]] = []
+        self.population: Optional[Population] = None
+        self.errors: Optional[np.ndarray] = None
+        # 已完成的代数与此前各段运行的累计耗时（从检查点恢复时非零）
+        self.generation = 0
+        self.elapsed_before = 0.0
+        # 延迟导入，避免与求值器模块循环引用
+        from .gp_evaluator import BatchEvaluator
+        from .parallel import ParallelEvaluator, resolve_workers
+        from .subtree_cache import CachedEvaluator, DEFAULT_CACHE_MAX_BYTES
+        from .constant_optimizer import ConstantOptimizer
+        from .semantic_dedup import SemanticDeduplicator
+        from .racing import SuccessiveHalving, DEFAULT_RACING_MIN_ROWS, DEFAULT_RACING_ETA
+        self.workers = resolve_workers(workers)
+        # 线性缩放：适应度为最优仿射变换 a + b·f 后的 MSE
+        self.linear_scaling = bool(linear_scaling)
+        # 评估精度：float32 时搜索阶段的适应度评估为单精度，进化结束后名人堂以 float64 重新评分；
+        # 常数优化（LM）始终为 float64
+        self.precision = precision
+        dtype = np.dtype(precision)
+        if self.workers > 1:
+            # 子树缓存保存在进程内存中，进程池模式下不启用
+            self.evaluator = ParallelEvaluator(X, y, self.workers, linear_scaling=self.linear_scaling,
+                                               dtype=dtype)
+        elif subtree_cache:
+            self.evaluator = CachedEvaluator(X, y, cache_max_bytes or DEFAULT_CACHE_MAX_BYTES,
+                                             linear_scaling=self.linear_scaling, dtype=dtype)
+        else:
+            self.evaluator = BatchEvaluator(X, y, linear_scaling=self.linear_scaling, dtype=dtype)
+        # 每代只对误差最小的 top_k 个个体做常数优化，控制开销
+        self.constant_optimization_top_k = max(0, int(constant_optimization_top_k))
+        self.constant_optimizer = ConstantOptimizer(self.XT, self.y, constant_optimization_iterations,
+                                                    linear_scaling=self.linear_scaling)
+        # 语义去重：语义相同的个体只完整评估一次；semantic_diversity 时用新个体替换重复的后代
+        self.semantic_diversity = bool(semantic_diversity)
+        self.deduplicator = (SemanticDeduplicator(X) if semantic_dedup or semantic_diversity
+                             else None)
+        self.duplicate_ratio = 0.0
+        # 多目标模式：NSGA-II 同时最小化误差与复杂度（length / depth），父代与后代合并后做环境选择
+        self.multi_objective = bool(multi_objective)
+        self.pareto_objectives = list(pareto_objectives) if pareto_objectives else ['length']
+        for name in self.pareto_objectives:
+            if name not in PARETO_OBJECTIVES:
+                raise ValueError(f"不支持的复杂度目标: {name}")
+        # 小批量连续减半评估：只有晋级到最后的个体做全量评估，其余个体的误差为样本估计值，
+        # self.exact 标记种群中哪些误差是全量精确值（精英、常数优化与最终结果只取精确个体）
+        self.racing = (SuccessiveHalving(self.XT, self.y, self.rng,
+                                         racing_min_rows or DEFAULT_RACING_MIN_ROWS,
+                                         racing_eta or DEFAULT_RACING_ETA,
+                                         linear_scaling=self.linear_scaling, dtype=dtype)
+                       if racing else None)
+        self.exact: Optional[np.ndarray] = None
+
+    def evaluate(self, population: Population) -> np.ndarray:
+        """计算种群中每个个体的训练误差（MSE），整代批量求值"""
+        return self.evaluate_with_flags(population)[0]
+
+    def evaluate_with_flags(self, population: Population) -> Tuple[np.ndarray, np.ndarray]:
+        """计算训练误差，同时返回各误差是否为全量精确值（未启用连续减半时全部为 True）"""
+        if self.deduplicator is None:
+            return self._score(population)
+        representatives, group = self.deduplicator.groups(population)
+        self.duplicate_ratio = 1.0 - len(representatives) / max(len(population), 1)
+        errors, exact = self._score(population.take(representatives))
+        return errors[group], exact[group]
+
+    def _score(self, population: Population) -> Tuple[np.ndarray, np.ndarray]:
+        if self.racing is not None:
+            return self.racing.evaluate(population, self._full_errors)
+        return self._full_errors(population), np.ones(len(population), dtype=bool)
+
+    def _full_errors(self, population: Population) -> np.ndarray:
+        _, errors = self.evaluator.evaluate(population, return_predictions=False)
+        return errors
+
+    def _ranked(self, k: Optional[int] = None) -> np.ndarray:
+        """按误差升序的个体下标；启用连续减半时只包含误差为精确值的个体"""
+        if self.exact is not None and self.exact.any():
+            candidates = np.flatnonzero(self.exact)
+        else:
+            candidates = np.arange(len(self.errors))
+        return candidates[np.argsort(self.errors[candidates], kind='stable')][:k]
+
+    def _diversify(self, elite: Population, offspring: Population) -> Population:
+        """用随机新个体替换与精英或更早后代语义相同的后代"""
+        duplicates = self.deduplicator.duplicates(Population.concat([elite, offspring]))[len(elite):]
+        index = np.flatnonzero(duplicates)
+        if len(index):
+            fresh = ramped_half_and_half(self.rng, len(index), self.n_features, self.function_ops,
+                                         self.max_tree_depth, self.max_tree_length)
+            self._assign(offspring, index, fresh)
+        return offspring
+
+    def objectives(self, population: Population, errors: np.ndarray) -> np.ndarray:
+        """多目标模式下的目标矩阵"""
+        return objective_matrix(population, errors, self.pareto_objectives)
+
+    def initialize(self) -> Population:
+        """生成初始种群"""
+        return ramped_half_and_half(self.rng, self.population_size, self.n_features,
+                                    self.function_ops, self.max_tree_depth, self.max_tree_length)
+
+    def _tournament(self, errors: np.ndarray, n: int) -> np.ndarray:
+        """向量化锦标赛选择"""
+        candidates = self.rng.integers(0, len(errors), size=(n, self.tournament_size))
+        return candidates[np.arange(n), np.argmin(errors[candidates], axis=1)]
+
+    def _random_nodes(self, lengths: np.ndarray) -> np.ndarray:
+        """为每个个体均匀选取一个节点位置"""
+        return (self.rng.random(len(lengths)) * lengths).astype(np.int64)
+
+    def _crossover(self, receivers: Population, donors: Population) -> Population:
+        """子树交叉"""
+        r_end = self._random_nodes(receivers.lengths)
+        d_end = self._random_nodes(donors.lengths)
+        r_start = subtree_starts(receivers.ops, r_end)
+        d_start = subtree_starts(donors.ops, d_end)
+        return self._constrained_splice(receivers, r_start, r_end, donors, d_start, d_end)
+
+    def _subtree_mutation(self, receivers: Population) -> Population:
+        """子树变异：用随机生成的新子树替换随机选中的子树"""
+        # 新子树满二叉时的节点数 2^depth - 1 不超过最大长度
+        depth = max(1, min(4, self.max_tree_depth, int(np.log2(self.max_tree_length + 1))))
+        donors = Population.from_programs(
+            [random_program(self.rng, depth, self.n_features, self.function_ops)
+             for _ in range(len(receivers))],
+            receivers.width,
+        )
+        r_end = self._random_nodes(receivers.lengths)
+        r_start = subtree_starts(receivers.ops, r_end)
+        d_start = np.zeros(len(donors), dtype=np.int64)
+        d_end = donors.lengths - 1
+        return self._constrained_splice(receivers, r_start, r_end, donors, d_start, d_end)
+
+    def _constant_mutation(self, receivers: Population) -> Population:
+        """常数/权重扰动变异"""
+        result = receivers.take(slice(None))
+        leaf = (result.ops == OP_CONST) | (result.ops == OP_VAR)
+        noise = self.rng.normal(0.0, 1.0, size=result.consts.shape)
+        scale = 0.1 * np.maximum(np.abs(result.consts), 0.1)
+        result.consts = np.where(leaf, result.consts + noise * scale, result.consts)
+        return result
+
+    def _constrained_splice(self, receivers: Population, r_start, r_end,
+                            donors: Population, d_start, d_end) -> Population:
+        """拼接子树，违反长度或深度约束的后代保留原个体"""
+        new_lengths = receivers.lengths - (r_end - r_start + 1) + (d_end - d_start + 1)
+        fits = new_lengths <= self.max_tree_length
+        children = receivers.take(slice(None))
+        if not np.any(fits):
+            return children
+        idx = np.flatnonzero(fits)
+        spliced = splice(receivers.take(idx), r_start[idx], r_end[idx],
+                         donors.take(idx), d_start[idx], d_end[idx])
+        depth_ok = program_depths(spliced.ops) <= self.max_tree_depth
+        accept = idx[depth_ok]
+        children.ops[accept] = spliced.ops[depth_ok]
+        children.args[accept] = spliced.args[depth_ok]
+        children.consts[accept] = spliced.consts[depth_ok]
+        children.lengths[accept] = spliced.lengths[depth_ok]
+        return children
+
+    def _breed(self, population: Population, errors: np.ndarray, n: int) -> Population:
+        """选择、交叉、变异，产生 n 个后代"""
+        first = population.take(self._tournament(errors, n))
+        second = population.take(self._tournament(errors, n))
+        offspring = first
+
+        do_crossover = np.flatnonzero(self.rng.random(n) < self.crossover_rate)
+        if len(do_crossover):
+            crossed = self._crossover(first.take(do_crossover), second.take(do_crossover))
+            self._assign(offspring, do_crossover, crossed)
+
+        mutate = self.rng.random(n) < self.mutation_rate
+        subtree = mutate & (self.rng.random(n) < 0.5)
+        point = mutate & ~subtree
+        if np.any(subtree):
+            idx = np.flatnonzero(subtree)
+            self._assign(offspring, idx, self._subtree_mutation(offspring.take(idx)))
+        if np.any(point):
+            idx = np.flatnonzero(point)
+            self._assign(offspring, idx, self._constant_mutation(offspring.take(idx)))
+        return offspring
+
+    @staticmethod
+    def _assign(target: Population, index: np.ndarray, source: Population):
+        target.ops[index] = source.ops
+        target.args[index] = source.args
+        target.consts[index] = source.consts
+        target.lengths[index] = source.lengths
+
+    def run(self, callback: Optional[Callable[['GPEngine', int], None]] = None) -> Dict[str, Any]:
+        """
+        执行进化，返回最优个体及进化历史
+
+        Args:
+            callback: 每代结束后调用 callback(engine, generation)，用于迁移、检查点等扩展
+        """
+        try:
+            start_time = time.time()
+            if self.population is None:
+                self.population = self.initialize()
+                self.errors, exact = self.evaluate_with_flags(self.population)
+                self.exact = exact if self.racing is not None else None
+            # 从检查点恢复时从已完成的代数继续
+            for generation in range(self.generation, self.generations):
+                self.step(generation)
+                self.generation = generation + 1
+                if callback is not None:
+                    callback(self, generation)
+            if self.precision != 'float64':
+                self.rescore_hall_of_fame()
+            return self.result(self.elapsed_before + time.time() - start_time)
+        finally:
+            self.evaluator.close()
+
+    def state(self) -> Dict[str, Any]:
+        """可完整恢复进化过程的状态（种群数组、误差、随机数生成器状态、代数与历史）"""
+        return {
+            'ops': self.population.ops,
+            'args': self.population.args,
+            'consts': self.population.consts,
+            'lengths': self.population.lengths,
+            'errors': self.errors,
+            'generation': self.generation,
+            'rng_state': self.rng.bit_generator.state,
+            'history': self.history,
+            'exact': self.exact,
+            'racing': self.racing.state() if self.racing is not None else None,
+        }
+
+    def restore(self, state: Dict[str, Any], elapsed: float = 0.0):
+        """从 state() 的结果恢复，之后调用 run() 将从下一代继续"""
+        self.population = Population(np.array(state['ops'], dtype=np.int8),
+                                     np.array(state['args'], dtype=np.int16),
+                                     np.array(state['consts'], dtype=np.float64),
+                                     np.array(state['lengths'], dtype=np.int64))
+        self.errors = np.array(state['errors'], dtype=np.float64)
+        self.generation = int(state['generation'])
+        self.rng.bit_generator.state = state['rng_state']
+        self.history = list(state['history'])
+        if self.racing is not None:
+            self.exact = np.array(state['exact'], dtype=bool)
+            self.racing.restore(state['racing'])
+        self.elapsed_before = float(elapsed)
+
+    def step(self, generation: int):
+        """进化一代（精英保留 + 繁殖），更新 self.population 与 self.errors"""
+        if self.multi_objective:
+            self._pareto_step()
+        else:
+            population, errors = self.population, self.errors
+            elite_index = self._ranked(self.elitism)
+            elite = population.take(elite_index)
+            offspring = self._breed(population, errors, self.population_size - len(elite_index))
+            if self.semantic_diversity:
+                offspring = self._diversify(elite, offspring)
+            offspring_errors, offspring_exact = self.evaluate_with_flags(offspring)
+
+            self.population = Population.concat([elite, offspring])
+            self.errors = np.concatenate([errors[elite_index], offspring_errors])
+            if self.racing is not None:
+                self.exact = np.concatenate([self.exact[elite_index], offspring_exact])
+        if self.constant_optimization_top_k:
+            self.optimize_constants(self.constant_optimization_top_k)
+
+        best = int(self._ranked(1)[0])
+        record = {
+            'generation': generation + 1,
+            'best_error': float(self.errors[best]),
+            'mean_length': float(np.mean(self.population.lengths)),
+        }
+        if self.racing is not None:
+            # 截至本代累计的行评估次数（全量评估每个个体的次数为对照）
+            record.update(self.racing.stats())
+        if self.multi_objective:
+            record['front_size'] = int(len(pareto_front(self.objectives(self.population, self.errors))))
+        if self.deduplicator is not None:
+            # 本代后代中语义重复（共享评估）的比例
+            record['duplicate_ratio'] = float(self.duplicate_ratio)
+        self.history.append(record)
+        if generation % 10 == 0 or generation == self.generations - 1:
+            logger.debug(f"第 {generation + 1} 代，最优 MSE = {self.errors[best]:.6g}")
+
+    def _pareto_step(self):
+        """
+        NSGA-II 一代：按 (前沿编号, 拥挤距离) 锦标赛选择产生与种群等量的后代，
+        父代与后代合并后按非支配排序与拥挤距离保留 population_size 个个体
+        """
+        population, errors = self.population, self.errors
+        # 得分每代按当前种群重算，常数优化、迁入个体或检查点恢复后无需额外维护
+        scores = selection_scores(self.objectives(population, errors))
+        offspring = self._breed(population, scores, self.population_size)
+        if self.semantic_diversity:
+            offspring = self._diversify(population, offspring)
+        offspring_errors, offspring_exact = self.evaluate_with_flags(offspring)
+
+        combined = Population.concat([population, offspring])
+        combined_errors = np.concatenate([errors, offspring_errors])
+        survivors = select_survivors(self.objectives(combined, combined_errors), self.population_size)
+        self.population = combined.take(survivors)
+        self.errors = combined_errors[survivors]
+        if self.racing is not None:
+            self.exact = np.concatenate([self.exact, offspring_exact])[survivors]
+
+    def optimize_constants(self, k: int):
+        """对当前种群中误差最小的 k 个个体执行常数优化（就地更新）"""
+        top = self._ranked(k)
+        optimized, errors = self.constant_optimizer.optimize(self.population.take(top), self.errors[top])
+        self._assign(self.population, top, optimized)
+        self.errors[top] = errors
+
+    def rescore_hall_of_fame(self, k: int = HALL_OF_FAME_SIZE):
+        """
+        以 float64 在全部训练数据上重新评估误差最小的 k 个个体，
+        之后只有这些个体的误差视为精确值，最终结果从中选出
+        """
+        from .gp_evaluator import BatchEvaluator
+        top = self._ranked(k)
+        evaluator = BatchEvaluator(self.XT.T, self.y, linear_scaling=self.linear_scaling)
+        _, self.errors[top] = evaluator.evaluate(self.population.take(top), return_predictions=False)
+        self.exact = np.zeros(len(self.errors), dtype=bool)
+        self.exact[top] = True
+
+    def best_individuals(self, k: int) -> Tuple[Population, np.ndarray]:
+        """当前种群中误差最小的 k 个个体及其误差（启用连续减半时只取误差精确的个体，可能少于 k 个）"""
+        order = self._ranked(k)
+        return self.population.take(order), self.errors[order].copy()
+
+    def replace_worst(self, incoming: Population, incoming_errors: np.ndarray):
+        """用外部个体（如迁入个体）替换当前种群中误差最大的个体"""
+        k = min(len(incoming), len(self.population))
+        if k == 0:
+            return
+        worst = np.argsort(self.errors, kind='stable')[::-1][:k]
+        self._assign(self.population, worst, incoming.take(slice(0, k)))
+        self.errors[worst] = incoming_errors[:k]
+        if self.exact is not None:
+            self.exact[worst] = True
+
+    def result(self, elapsed: float) -> Dict[str, Any]:
+        """汇总当前种群的最优个体"""
+        best = int(self._ranked(1)[0])
+        ops, args, consts = self.population.program(best)
+        return {
+            'ops': ops.copy(),
+            'args': args.copy(),
+            'consts': consts.copy(),
+            'error': float(self.errors[best]),
+            'population': self.population,
+            'errors': self.errors,
+            'history': self.history,
+            'elapsed': elapsed,
+            'cache_stats': self.cache_stats(),
+            'racing_stats': self.racing.stats() if self.racing is not None else None,
+            'precision': self.precision,
+        }
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """子树缓存统计（未启用缓存时为 None）"""
+        cache = getattr(self.evaluator, 'cache', None)
+        return cache.stats() if cache is not None else None
+
+
+def format_constant(value: float) -> str:
+    """以定点记数法书写常数（不用科学记数法，前端解析器可直接识别），仍可精确还原为原浮点数"""
+    return np.format_float_positional(float(value), unique=True, trim='-')
+
+
+def program_to_infix(ops, args, consts, feature_names: List[str]) -> str:
+    """将后缀程序转换为中缀表达式文本"""
+    stack: List[Tuple[str, bool]] = []
+    for op, arg, const in zip(ops, args, consts):
+        if op == OP_VAR:
+            stack.append((f"{format_constant(const)} * {feature_names[arg]}", True))
+        elif op == OP_CONST:
+            stack.append((format_constant(const), False))
+        else:
+            right, weighted = stack.pop()
+            left, _ = stack.pop()
+            # 加权变量作为乘除的右操作数时需加括号，否则 a / w * X 会被读作 (a / w) * X
+            if weighted and op in (OP_MUL, OP_DIV):
+                right = f"({right})"
+            stack.append((f"({left} {OP_SYMBOLS[op]} {right})", False))
+    return stack[-1][0]
+
+
+def program_to_latex(ops, args, consts, feature_names: List[str],
+                     constant_names: Optional[Dict[int, str]] = None) -> Tuple[str, Dict[str, float]]:
+    """
+    将后缀程序转换为 MathJax 公式（常数以 c_{i} 表示），同时返回常数表
+
+    constant_names 可为指定位置的常数叶子命名（如线性缩放系数 a、b），不参与 c_{i} 编号
+    """
+    stack: List[str] = []
+    constants: Dict[str, float] = {}
+    constant_names = constant_names or {}
+    index = 0
+    for pos, (op, arg, const) in enumerate(zip(ops, args, consts)):
+        if op == OP_CONST and pos in constant_names:
+            constants[constant_names[pos]] = float(const)
+            stack.append(constant_names[pos])
+        elif op in (OP_VAR, OP_CONST):
+            constants[f"c{{{index}}}"] = float(const)
+            if op == OP_VAR:
+                stack.append(f"c_{{{index}}}  \\cdot\\text{{{feature_names[arg]}}}")
+            else:
+                stack.append(f"c_{{{index}}}")
+            index += 1
+        else:
+            right = stack.pop()
+            left = stack.pop()
+            if op == OP_DIV:
+                stack.append(f" \\cfrac{{ {left} }}{{ {right} }} ")
+            elif op == OP_MUL:
+                stack.append(f"{left}  \\cdot  {right}")
+            else:
+                stack.append(f" \\left( {left} {OP_SYMBOLS[op]} {right} \\right) ")
+    return stack[-1], constants
+
+
+def program_to_impact_tree(ops, args, consts, feature_names: List[str],
+                           leaf_impacts: np.ndarray) -> Dict[str, Any]:
+    """
+    将后缀程序转换为 impact_tree
+
+    运算符节点为 {'op': 运算符名, 'children': [左, 右]}，叶子为 {'label': 叶子文本, 'impact': 影响力}；
+    子节点按位置存放（同名兄弟节点不会互相覆盖，左右顺序明确），
+    叶子常数以可精确还原的定点形式书写，编译 impact_tree 与原程序的预测逐位一致
+    """
+    stack: List[Dict[str, Any]] = []
+    for pos, (op, arg, const) in enumerate(zip(ops, args, consts)):
+        if op == OP_VAR:
+            stack.append({'label': f"{format_constant(const)} * {feature_names[arg]}",
+                          'impact': float(leaf_impacts[pos])})
+        elif op == OP_CONST:
+            stack.append({'label': format_constant(const), 'impact': 0.0})
+        else:
+            right = stack.pop()
+            left = stack.pop()
+            stack.append({'op': OP_NAMES[op], 'children': [left, right]})
+    return stack[-1]
+
+
+def program_depth(ops) -> int:
+    """单个后缀程序的树深度"""
+    return int(program_depths(np.asarray(ops, dtype=np.int8)[None, :])[0])
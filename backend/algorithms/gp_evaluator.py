@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+种群批量栈式求值器
+
+整代个体的后缀程序被填充为 (种群 × 最大长度) 的操作码矩阵与常数矩阵，
+求值时按程序位置逐步推进，每一步同时在种群轴和样本轴上执行，
+Python 层的循环次数只与程序长度和操作码种类数有关，与种群大小无关。
+"""
+
+import numpy as np
+from typing import List, Optional, Tuple
+
+from .gp_engine import (Population, ARITY, OP_PAD, OP_CONST, OP_VAR, BINARY_FUNCTIONS,
+                        scaled_mean_squared_errors)
+from .metrics import mean_squared_errors
+
+# 单次求值栈张量的内存上限（字节），超出时按个体分块
+DEFAULT_MAX_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def stack_pointers(ops: np.ndarray) -> np.ndarray:
+    """计算每个位置执行前的栈深度（由程序结构静态决定，与数据无关）"""
+    effect = 1 - ARITY[ops]
+    effect[ops == OP_PAD] = 0
+    return np.cumsum(effect, axis=1) - effect
+
+
+class BatchEvaluator:
+    """在 (种群 × 样本) 上同步执行后缀程序的栈式求值器"""
+
+    def __init__(self, X: np.ndarray, y: np.ndarray,
+                 max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES, linear_scaling: bool = False,
+                 dtype=np.float64):
+        # dtype 为求值精度：float32 时数据、求值栈与预测矩阵均为单精度，内存带宽减半
+        self.XT = np.ascontiguousarray(np.asarray(X, dtype=dtype).T)
+        self.y = np.asarray(y, dtype=dtype)
+        self.max_chunk_bytes = int(max_chunk_bytes)
+        self.linear_scaling = bool(linear_scaling)
+
+    def errors(self, predictions: np.ndarray) -> np.ndarray:
+        """逐个体适应度（MSE；启用线性缩放时为缩放后的 MSE），统一以 float64 返回"""
+        if self.linear_scaling:
+            return scaled_mean_squared_errors(predictions, self.y).astype(np.float64)
+        return mean_squared_errors(predictions, self.y).astype(np.float64)
+
+    @property
+    def n_samples(self) -> int:
+        return self.XT.shape[1]
+
+    def _chunk_size(self, width: int) -> int:
+        """按栈张量内存上限计算每块的个体数"""
+        row_bytes = (width // 2 + 1) * self.n_samples * self.XT.itemsize
+        return max(1, self.max_chunk_bytes // max(row_bytes, 1))
+
+    def predict(self, ops: np.ndarray, args: np.ndarray, consts: np.ndarray) -> np.ndarray:
+        """返回 (个体 × 样本) 的预测矩阵"""
+        n_programs, width = ops.shape
+        chunk = self._chunk_size(width)
+        predictions = np.empty((n_programs, self.n_samples), dtype=self.XT.dtype)
+        for start in range(0, n_programs, chunk):
+            stop = min(start + chunk, n_programs)
+            predictions[start:stop], _ = self._predict_chunk(ops[start:stop], args[start:stop],
+                                                             consts[start:stop])
+        return predictions
+
+    def predict_with_plan(self, ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                          skip: np.ndarray, loads: np.ndarray, block: np.ndarray,
+                          captures: np.ndarray) -> Tuple[np.ndarray, List[Tuple[np.ndarray, int, np.ndarray]]]:
+        """
+        按执行计划求值：skip 位置不执行，loads >= 0 的位置直接写入 block 中的已知输出向量，
+        captures 位置执行后取出该节点（子树）的输出向量
+
+        Returns:
+            (预测矩阵, [(个体下标, 位置, 输出矩阵), ...])
+        """
+        n_programs, width = ops.shape
+        chunk = self._chunk_size(width)
+        predictions = np.empty((n_programs, self.n_samples), dtype=self.XT.dtype)
+        captured = []
+        for start in range(0, n_programs, chunk):
+            stop = min(start + chunk, n_programs)
+            part = slice(start, stop)
+            predictions[part], chunk_captured = self._predict_chunk(
+                ops[part], args[part], consts[part], skip=skip[part], loads=loads[part],
+                block=block, captures=captures[part])
+            captured.extend((rows + start, pos, values) for rows, pos, values in chunk_captured)
+        return predictions, captured
+
+    def _predict_chunk(self, ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                       skip: Optional[np.ndarray] = None, loads: Optional[np.ndarray] = None,
+                       block: Optional[np.ndarray] = None,
+                       captures: Optional[np.ndarray] = None):
+        """对一块个体执行锁步求值"""
+        n_programs = len(ops)
+        max_stack = ops.shape[1] // 2 + 1
+        stack = np.empty((n_programs, max_stack, self.n_samples), dtype=self.XT.dtype)
+        # 常数与数据同精度，避免单精度模式下运算被提升为 float64
+        consts = np.asarray(consts, dtype=self.XT.dtype)
+        # 栈位置由原始程序结构决定；节点输出写在 sp - arity 处
+        sp = stack_pointers(ops)
+        out = sp - ARITY[ops]
+        exec_ops = ops if skip is None else np.where(skip, OP_PAD, ops)
+        used = np.flatnonzero(np.any(ops != OP_PAD, axis=0))
+        width = int(used[-1]) + 1 if len(used) else 0
+        captured = []
+
+        with np.errstate(all='ignore'):
+            for pos in range(width):
+                op = exec_ops[:, pos]
+                depth = sp[:, pos]
+
+                rows = np.flatnonzero(op == OP_VAR)
+                if len(rows):
+                    stack[rows, depth[rows]] = consts[rows, pos, None] * self.XT[args[rows, pos]]
+
+                rows = np.flatnonzero(op == OP_CONST)
+                if len(rows):
+                    stack[rows, depth[rows]] = consts[rows, pos, None]
+
+                for opcode, func in BINARY_FUNCTIONS.items():
+                    rows = np.flatnonzero(op == opcode)
+                    if len(rows):
+                        top = depth[rows]
+                        stack[rows, top - 2] = func(stack[rows, top - 2], stack[rows, top - 1])
+
+                if loads is not None:
+                    rows = np.flatnonzero(loads[:, pos] >= 0)
+                    if len(rows):
+                        stack[rows, out[rows, pos]] = block[loads[rows, pos]]
+
+                if captures is not None:
+                    rows = np.flatnonzero(captures[:, pos])
+                    if len(rows):
+                        captured.append((rows, pos, stack[rows, out[rows, pos]]))
+
+        return stack[:, 0], captured
+
+    def evaluate(self, population: Population,
+                 return_predictions: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """求值整代种群，返回 (预测矩阵, 逐个体 MSE)"""
+        predictions = self.predict(population.ops, population.args, population.consts)
+        return predictions, self.errors(predictions)
+
+    def close(self):
+        """单进程求值器无需释放资源，与 ParallelEvaluator 接口保持一致"""
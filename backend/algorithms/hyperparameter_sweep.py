@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+符号回归超参数搜索
+
+在网格或随机空间上展开 population_size、generations、max_tree_depth、运算符子集与种子的组合，
+全部配置由同一个进程池调度，数据集经共享内存只加载一次。
+每个配置在训练行（前 n_train 行）上进化，各轮淘汰与排行榜都按训练行上的归一化 MSE 排名；
+测试行只用于报告指标，不参与选择（否则排名会过拟合测试集）。
+
+启用连续减半时分若干轮：第 i 轮每个存活配置进化到其代数的 eta^(i-s) 比例，
+每轮只保留得分最好的 1/eta 个配置，其余配置提前停止；
+晋级配置从上一轮结束时的进化状态继续，不重复已完成的代数。
+每个配置的随机数流只由其种子决定，排名与工作进程数无关。
+"""
+
+import itertools
+import math
+import time
+import numpy as np
+from contextlib import nullcontext
+from typing import Dict, List, Any, Optional
+from loguru import logger
+
+from .parallel import dataset_pool, dataset_state
+from .symbolic_regression import train_and_score
+from utils.rng import SeedLike, generator, child_generator, fresh_seed
+
+SWEEP_PARAMETERS = ('population_size', 'generations', 'max_tree_depth',
+                    'symbolic_expression_grammar', 'seed')
+SWEEP_MODES = ('grid', 'random')
+# 排名所用指标（只看训练行，测试指标仅随结果报告）
+SCORE_METRIC = 'normalized_mean_squared_error_training'
+# 单次搜索的最大配置数
+MAX_SWEEP_CONFIGURATIONS = 256
+DEFAULT_SWEEP_SAMPLES = 20
+DEFAULT_SWEEP_ETA = 3
+
+
+def _sample_dimension(values: Any, rng: np.random.Generator) -> Any:
+    """从一个维度随机取值：列表等概率取一项，{'low', 'high'[, 'log']} 为整数区间（可对数均匀）"""
+    if isinstance(values, dict):
+        low, high = int(values['low']), int(values['high'])
+        if values.get('log'):
+            return int(round(math.exp(rng.uniform(math.log(low), math.log(high)))))
+        return int(rng.integers(low, high + 1))
+    return values[int(rng.integers(len(values)))]
+
+
+def expand_space(space: Dict[str, Any], mode: str = 'grid',
+                 n_samples: int = DEFAULT_SWEEP_SAMPLES, seed: SeedLike = None) -> List[Dict[str, Any]]:
+    """
+    把搜索空间展开为配置列表
+
+    Args:
+        space: 参数名 → 候选值列表（随机模式下也可为 {'low', 'high', 'log'} 整数区间）；
+            symbolic_expression_grammar 的候选值为运算符列表
+        mode: grid（笛卡尔积）或 random（独立随机抽取 n_samples 个配置，去重）
+        n_samples: 随机模式的配置数
+        seed: 随机模式的种子
+    """
+    unknown = [name for name in space if name not in SWEEP_PARAMETERS]
+    if unknown:
+        raise ValueError(f"不支持的搜索参数: {unknown}（可选 {', '.join(SWEEP_PARAMETERS)}）")
+    if mode not in SWEEP_MODES:
+        raise ValueError(f"不支持的搜索方式: {mode}")
+    names = [name for name in SWEEP_PARAMETERS if name in space]
+    for name in names:
+        values = space[name]
+        if isinstance(values, dict):
+            if mode == 'grid':
+                raise ValueError(f"网格搜索的参数 {name} 必须为候选值列表")
+        elif not isinstance(values, list) or not values:
+            raise ValueError(f"参数 {name} 的候选值必须为非空列表")
+    if mode == 'grid':
+        configs = [dict(zip(names, combo)) for combo in itertools.product(*(space[name] for name in names))]
+    else:
+        rng = generator(seed)
+        configs, seen = [], set()
+        # 离散空间可能小于 n_samples，限制抽样次数
+        for _ in range(int(n_samples) * 20):
+            config = {name: _sample_dimension(space[name], rng) for name in names}
+            key = repr(sorted(config.items()))
+            if key not in seen:
+                seen.add(key)
+                configs.append(config)
+            if len(configs) >= int(n_samples):
+                break
+    if not configs:
+        raise ValueError("搜索空间为空")
+    if len(configs) > MAX_SWEEP_CONFIGURATIONS:
+        raise ValueError(f"配置数 {len(configs)} 超过上限 {MAX_SWEEP_CONFIGURATIONS}")
+    return configs
+
+
+def _run_config(X: np.ndarray, y: np.ndarray, n_train: int, config: Dict[str, Any],
+                engine_params: Dict[str, Any], target_generations: int,
+                state: Optional[Dict[str, Any]], feature_names: List[str]) -> Dict[str, Any]:
+    """把一个配置进化到 target_generations 代（有 state 时从中断处继续）并在全部行上评分"""
+    start_time = time.time()
+    params = dict(engine_params, generations=int(target_generations))
+    for name in ('population_size', 'max_tree_depth'):
+        if name in config:
+            params[name] = int(config[name])
+    if 'symbolic_expression_grammar' in config:
+        params['grammar'] = config['symbolic_expression_grammar']
+    engine, run, scores = train_and_score(X, y, n_train, feature_names, params,
+                                          generator(config['seed']), state)
+    return {
+        **scores,
+        'generations_run': int(engine.generation),
+        'state': {'engine': engine.state(), 'elapsed': float(run['elapsed'])},
+        'elapsed': round(time.time() - start_time, 3),
+    }
+
+
+def _config_task(n_train: int, config: Dict[str, Any], engine_params: Dict[str, Any],
+                 target_generations: int, state: Optional[Dict[str, Any]],
+                 feature_names: List[str]) -> Dict[str, Any]:
+    """在工作进程中运行一个配置（数据集由 dataset_pool 挂载）"""
+    return _run_config(dataset_state['X'], dataset_state['y'], n_train, config, engine_params,
+                       target_generations, state, feature_names)
+
+
+def _score(metrics: Dict[str, float]) -> float:
+    """排名得分：训练集归一化 MSE，非有限值排在最后"""
+    value = metrics[SCORE_METRIC]
+    return float(value) if np.isfinite(value) else math.inf
+
+
+def run_sweep(X: np.ndarray, y: np.ndarray, feature_names: List[str], n_train: int,
+              configs: List[Dict[str, Any]], engine_params: Dict[str, Any],
+              workers: int = 1, successive_halving: bool = False, eta: int = DEFAULT_SWEEP_ETA,
+              seed: SeedLike = None) -> Dict[str, Any]:
+    """
+    调度全部配置并返回排行榜
+
+    Args:
+        X: (样本 × 特征) 矩阵
+        y: 目标值
+        feature_names: 特征名
+        n_train: 训练行数（其余行只用于报告测试指标）
+        configs: expand_space 得到的配置列表
+        engine_params: 各配置共用的 GPEngine 参数（配置中的参数优先）
+        workers: 进程池大小
+        successive_halving: 是否启用连续减半提前停止较差的配置
+        eta: 每轮保留 1/eta 的配置
+        seed: 未在配置中指定种子时，第 i 个配置使用该种子的第 i 个子流派生的种子
+
+    Returns:
+        按得分升序的 leaderboard、各轮信息与耗时
+    """
+    start_time = time.time()
+    if eta < 2:
+        raise ValueError("连续减半的淘汰比例 eta 必须不小于 2")
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    seed = fresh_seed() if seed is None else seed
+    default_generations = int(engine_params.get('generations', 50))
+    configs = [dict(config) for config in configs]
+    for i, config in enumerate(configs):
+        config.setdefault('seed', int(child_generator(seed, i).integers(2 ** 31)))
+        config.setdefault('generations', default_generations)
+        if int(config['generations']) < 1:
+            raise ValueError("进化代数必须为正整数")
+
+    n_rungs = int(math.floor(math.log(len(configs), eta))) + 1 if successive_halving and len(configs) > 1 else 1
+    states: List[Optional[Dict[str, Any]]] = [None] * len(configs)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(configs)
+    stopped_at = [n_rungs - 1] * len(configs)
+    alive = list(range(len(configs)))
+    rungs = []
+    workers = max(1, min(int(workers), len(configs)))
+    logger.info(f"超参数搜索开始: {len(configs)} 个配置，{n_rungs} 轮，{workers} 个进程")
+
+    with (dataset_pool(X, y, workers) if workers > 1 else nullcontext()) as pool:
+        for rung in range(n_rungs):
+            fraction = float(eta) ** (rung - n_rungs + 1)
+            targets = {i: max(1, int(math.ceil(int(configs[i]['generations']) * fraction))) for i in alive}
+            if pool is not None:
+                futures = {i: pool.submit(_config_task, n_train, configs[i], engine_params, targets[i],
+                                          states[i], list(feature_names)) for i in alive}
+                outcomes = {i: future.result() for i, future in futures.items()}
+            else:
+                outcomes = {i: _run_config(X, y, n_train, configs[i], engine_params, targets[i],
+                                           states[i], list(feature_names)) for i in alive}
+            for i, outcome in outcomes.items():
+                states[i] = outcome.pop('state')
+                if results[i] is not None:
+                    outcome['elapsed'] = round(results[i]['elapsed'] + outcome['elapsed'], 3)
+                results[i] = outcome
+            ranked = sorted(alive, key=lambda i: (_score(results[i]['detailed_metrics']), i))
+            rungs.append({'rung': rung, 'fraction': fraction, 'n_configurations': len(alive)})
+            if rung < n_rungs - 1:
+                keep = max(1, int(math.ceil(len(alive) / eta)))
+                for i in ranked[keep:]:
+                    stopped_at[i] = rung
+                    states[i] = None
+                alive = sorted(ranked[:keep])
+
+    leaderboard = []
+    for i, result in enumerate(results):
+        leaderboard.append(dict(result, config=configs[i], config_index=i,
+                                score=_score(result['detailed_metrics']),
+                                stopped_at_rung=stopped_at[i],
+                                completed=stopped_at[i] == n_rungs - 1))
+    # 完成全部代数的配置排在提前停止的配置之前
+    leaderboard.sort(key=lambda item: (-item['stopped_at_rung'], item['score'], item['config_index']))
+    for rank, item in enumerate(leaderboard, start=1):
+        item['rank'] = rank
+        if not np.isfinite(item['score']):
+            item['score'] = None
+    return {
+        'leaderboard': leaderboard,
+        'best': leaderboard[0],
+        'n_configurations': len(configs),
+        'rungs': rungs,
+        'successive_halving': n_rungs > 1,
+        'eta': int(eta),
+        'workers': workers,
+        'seed': seed if isinstance(seed, int) else None,
+        'score_metric': SCORE_METRIC,
+        'elapsed': round(time.time() - start_time, 3),
+    }
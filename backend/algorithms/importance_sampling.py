@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+蒙特卡洛配比分析的自适应重要性采样（交叉熵方法）
+
+名义分布为各成分在 [min, max] 上的独立均匀分布（在单位立方体坐标下密度为 1）。
+建议分布为防御性混合 q(u) = α + (1 - α) · Π Beta(u_j; a_j, b_j)：
+前几轮各抽取一小批样本，取预测药效距目标值最近的精英样本（距离不超过容差时即目标区间内的全部样本），
+以似然比加权的矩估计拟合各成分的 Beta 参数并平滑更新；其余预算从实测加速比最高的一轮建议分布抽取。
+每个样本保留重要性权重 w = 1 / q(u)（均匀分量保证 w ≤ 1/α）：
+- 有效率（目标区间在名义分布下的概率）= mean(w · 1[有效])，对每一轮的样本都无偏；
+- 有效样本上的成分统计与药效分布为自归一化加权估计。
+第 k 轮使用根种子派生的第 k 个子随机数流，结果只由种子决定。
+"""
+
+import numpy as np
+from scipy import stats
+from typing import Callable, Dict, List, Any, Optional
+
+from utils.rng import SeedLike, child_generator
+
+# 用于探索的预算比例与最大轮数
+CE_PILOT_FRACTION = 0.2
+CE_MAX_STAGES = 5
+CE_MIN_STAGE_SAMPLES = 200
+# 每轮精英样本比例与参数平滑系数
+CE_ELITE_FRACTION = 0.1
+CE_SMOOTHING = 0.7
+# 建议分布中均匀分量的比例（限制最大权重）
+CE_DEFENSIVE_FRACTION = 0.1
+# Beta 形状参数的取值范围
+CE_MIN_SHAPE = 0.5
+CE_MAX_SHAPE = 1000.0
+
+
+def proposal_density(units: np.ndarray, a: np.ndarray, b: np.ndarray,
+                     defensive: float = CE_DEFENSIVE_FRACTION) -> np.ndarray:
+    """建议分布在单位立方体样本上的密度"""
+    with np.errstate(all='ignore'):
+        log_beta = np.sum(stats.beta.logpdf(units, a, b), axis=1)
+        density = defensive + (1 - defensive) * np.exp(log_beta)
+    density[~np.isfinite(density)] = np.inf
+    return density
+
+
+def draw_proposal(rng: np.random.Generator, a: np.ndarray, b: np.ndarray, rows: int,
+                  defensive: float = CE_DEFENSIVE_FRACTION) -> np.ndarray:
+    """从建议分布抽取 rows 个单位立方体样本"""
+    units = rng.beta(a, b, size=(rows, len(a)))
+    uniform = rng.random(rows) < defensive
+    units[uniform] = rng.random((int(np.count_nonzero(uniform)), len(a)))
+    return units
+
+
+def fit_beta(units: np.ndarray, weights: np.ndarray) -> Optional[tuple]:
+    """按加权均值与方差（矩估计）拟合各成分的 Beta 参数；样本不足时返回 None"""
+    total = float(np.sum(weights))
+    if len(units) < 2 or not total > 0:
+        return None
+    mean = np.clip(weights @ units / total, 1e-3, 1 - 1e-3)
+    variance = weights @ (units - mean) ** 2 / total
+    variance = np.clip(variance, 1e-8, mean * (1 - mean) * 0.999)
+    common = mean * (1 - mean) / variance - 1
+    a = np.clip(mean * common, CE_MIN_SHAPE, CE_MAX_SHAPE)
+    b = np.clip((1 - mean) * common, CE_MIN_SHAPE, CE_MAX_SHAPE)
+    return a, b
+
+
+def cross_entropy_sampling(evaluate: Callable[[np.ndarray], np.ndarray], dimension: int,
+                           iterations: int, seed: SeedLike, target_efficacy: float,
+                           tolerance: float, active: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    交叉熵自适应重要性采样
+
+    探索轮逐轮更新建议分布，并用全部探索样本的有效率估计衡量每一轮建议分布的加速比；
+    最终轮使用加速比最高的建议分布（均匀分布即第 0 轮也参与比较，自适应无益时退回均匀采样）
+
+    Args:
+        evaluate: 单位立方体样本 (行 × 成分) → 预测药效
+        dimension: 成分数
+        iterations: 总采样次数（含探索轮）
+        seed: 随机种子
+        target_efficacy: 目标药效
+        tolerance: 容差
+        active: 参与自适应的成分掩码（如模型实际用到的成分），其余成分保持均匀分布；None 时全部参与
+
+    Returns:
+        units（单位立方体样本）、efficacies、weights、各轮信息、选中的探索轮与最终 Beta 参数
+    """
+    active = np.ones(dimension, dtype=bool) if active is None else np.asarray(active, dtype=bool)
+    a = np.ones(dimension)
+    b = np.ones(dimension)
+    stage_rows = max(CE_MIN_STAGE_SAMPLES, int(iterations * CE_PILOT_FRACTION / CE_MAX_STAGES))
+    units_parts, efficacy_parts, weight_parts, valid_parts = [], [], [], []
+    proposals: List[tuple] = []
+    stages: List[Dict[str, Any]] = []
+    used = 0
+
+    def draw(stage: int, a: np.ndarray, b: np.ndarray, rows: int) -> np.ndarray:
+        units = draw_proposal(child_generator(seed, stage), a, b, rows)
+        efficacies = np.asarray(evaluate(units), dtype=np.float64)
+        distance = np.abs(efficacies - target_efficacy)
+        distance[~np.isfinite(distance)] = np.inf
+        units_parts.append(units)
+        efficacy_parts.append(efficacies)
+        weight_parts.append(1.0 / proposal_density(units, a, b))
+        valid_parts.append(distance <= tolerance)
+        return distance
+
+    for stage in range(CE_MAX_STAGES):
+        rows = min(stage_rows, iterations - used)
+        if rows <= 0:
+            break
+        distance = draw(stage, a, b, rows)
+        proposals.append((a, b))
+        used += rows
+        level = max(float(tolerance), float(np.quantile(distance, CE_ELITE_FRACTION)))
+        stages.append({'stage': stage, 'samples': int(rows), 'level': level,
+                       'valid_fraction': float(np.mean(valid_parts[-1]))})
+        elite = distance <= level
+        fitted = fit_beta(units_parts[-1][elite][:, active], weight_parts[-1][elite])
+        if fitted is not None:
+            a, b = a.copy(), b.copy()
+            a[active] = CE_SMOOTHING * fitted[0] + (1 - CE_SMOOTHING) * a[active]
+            b[active] = CE_SMOOTHING * fitted[1] + (1 - CE_SMOOTHING) * b[active]
+
+    # 每轮的加速比：该轮有效样本的 ESS 与同样本数均匀采样的期望有效样本数之比（有效率取全部探索样本的估计）
+    pilot_rate = float(np.mean(np.concatenate([np.where(valid, weights, 0.0)
+                                               for valid, weights in zip(valid_parts, weight_parts)])))
+    for info, valid, weights in zip(stages, valid_parts, weight_parts):
+        valid_weights = weights[valid]
+        square_sum = float(np.sum(valid_weights ** 2))
+        ess = float(np.sum(valid_weights)) ** 2 / square_sum if square_sum > 0 else 0.0
+        info['speedup'] = ess / (pilot_rate * info['samples']) if pilot_rate > 0 else None
+    if pilot_rate > 0:
+        selected = int(np.argmax([info['speedup'] for info in stages]))
+        a, b = proposals[selected]
+    else:
+        # 探索轮没有有效样本时沿用最后一次更新的建议分布
+        selected = None
+    if iterations > used:
+        draw(len(stages), a, b, iterations - used)
+    return {
+        'units': np.concatenate(units_parts),
+        'efficacies': np.concatenate(efficacy_parts),
+        'weights': np.concatenate(weight_parts),
+        'stages': stages,
+        'selected_stage': selected,
+        'alpha': a,
+        'beta': b,
+    }
+
+
+def weighted_quantile(values: np.ndarray, weights: np.ndarray, q) -> np.ndarray:
+    """加权分位数（按累积权重的中点插值）"""
+    order = np.argsort(values, kind='stable')
+    values, weights = values[order], weights[order]
+    cumulative = np.cumsum(weights) - 0.5 * weights
+    return np.interp(np.asarray(q) * np.sum(weights), cumulative, values)
+
+
+def weighted_statistics(values: np.ndarray, weights: np.ndarray) -> Dict[str, float]:
+    """自归一化加权统计（键与整批模式的成分统计相同，极值取样本的极值）"""
+    if len(values) == 0 or not np.sum(weights) > 0:
+        return {'min': 0.0, 'max': 0.0, 'mean': 0.0, 'std': 0.0,
+                'median': 0.0, 'q25': 0.0, 'q75': 0.0}
+    mean = float(np.average(values, weights=weights))
+    q25, median, q75 = weighted_quantile(values, weights, [0.25, 0.5, 0.75])
+    return {
+        'min': float(np.min(values)),
+        'max': float(np.max(values)),
+        'mean': mean,
+        'std': float(np.sqrt(np.average((values - mean) ** 2, weights=weights))),
+        'median': float(median),
+        'q25': float(q25),
+        'q75': float(q75)
+    }
+
+
+def importance_diagnostics(weights: np.ndarray, valid: np.ndarray) -> Dict[str, Any]:
+    """
+    有效率的无偏估计与采样效率
+
+    effective_sample_size 为有效样本权重的 (Σw)² / Σw²；
+    speedup 为它与同样采样次数下均匀采样的期望有效样本数 (p · N) 之比；
+    rate_variance_reduction 为均匀采样与重要性采样下有效率估计方差之比
+    """
+    n = len(weights)
+    contributions = np.where(valid, weights, 0.0)
+    valid_rate = float(np.mean(contributions))
+    valid_weights = weights[valid]
+    square_sum = float(np.sum(valid_weights ** 2))
+    ess = float(np.sum(valid_weights)) ** 2 / square_sum if square_sum > 0 else 0.0
+    variance = float(np.var(contributions))
+    plain_variance = valid_rate * (1 - valid_rate)
+    return {
+        'valid_rate': valid_rate,
+        'valid_rate_std_error': float(np.sqrt(variance / n)),
+        'effective_sample_size': ess,
+        'speedup': ess / (valid_rate * n) if valid_rate > 0 else None,
+        'rate_variance_reduction': plain_variance / variance if variance > 0 and plain_variance > 0 else None,
+        'max_weight': float(np.max(weights)),
+    }
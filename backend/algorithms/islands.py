@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+岛屿模型遗传规划
+
+多个子种群在独立进程中各自进化，每隔 migration_interval 代按环形拓扑
+（岛 i → 岛 i+1）同步交换各自最优的 migration_size 个个体，迁入个体替换
+目标岛上误差最大的个体。训练数据通过共享内存提供给各岛进程。
+"""
+
+import multiprocessing
+import queue
+import time
+import numpy as np
+from typing import Dict, List, Any, Optional
+from loguru import logger
+
+from .gp_engine import GPEngine, Population
+from .parallel import SharedArray
+from utils.rng import SeedLike, spawn_sequences
+
+# 等待相邻岛屿迁移个体的超时时间（秒）
+MIGRATION_TIMEOUT = 600
+
+
+def _island_main(index: int, xt_descriptor, y_descriptor, params: Dict[str, Any],
+                 seed_sequence: np.random.SeedSequence, inbox, outbox, results):
+    """岛屿进程入口：独立进化并在迁移代与相邻岛交换个体"""
+    try:
+        XT, xt_shm = SharedArray.attach(xt_descriptor)
+        y, y_shm = SharedArray.attach(y_descriptor)
+        engine = GPEngine(XT.T, y, rng=np.random.default_rng(seed_sequence), workers=1,
+                          **params['engine'])
+        interval = params['migration_interval']
+        size = params['migration_size']
+
+        def migrate(engine: GPEngine, generation: int):
+            if (generation + 1) % interval != 0 or generation + 1 == engine.generations:
+                return
+            emigrants, errors = engine.best_individuals(size)
+            outbox.put((emigrants.ops, emigrants.args, emigrants.consts, emigrants.lengths, errors))
+            ops, args, consts, lengths, incoming_errors = inbox.get(timeout=MIGRATION_TIMEOUT)
+            engine.replace_worst(Population(ops, args, consts, lengths), incoming_errors)
+
+        run = engine.run(callback=migrate)
+        population = run.pop('population')
+        results.put(('ok', index, run, (population.ops, population.args,
+                                        population.consts, population.lengths)))
+        del XT, y
+        xt_shm.close()
+        y_shm.close()
+    except Exception as e:
+        results.put(('error', index, f"{type(e).__name__}: {e}", None))
+
+
+class IslandModel:
+    """岛屿模型：多进程子种群 + 周期性环形迁移"""
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, islands: int = 4,
+                 migration_interval: int = 10, migration_size: int = 5,
+                 seed: SeedLike = None, **engine_params):
+        if islands < 2:
+            raise ValueError("岛屿模型至少需要 2 个岛")
+        if migration_interval < 1:
+            raise ValueError("迁移间隔必须为正整数")
+        self.X = np.asarray(X, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.islands = int(islands)
+        self.migration_interval = int(migration_interval)
+        self.migration_size = max(0, min(int(migration_size),
+                                         int(engine_params.get('population_size', 100)) - 1))
+        self.engine_params = engine_params
+        # 每个岛一个独立的子随机数流，结果与进程调度无关
+        self.seed_sequences = spawn_sequences(seed, self.islands)
+        self.workers = self.islands
+
+    def run(self) -> Dict[str, Any]:
+        """启动各岛进程并汇总结果，返回结构与 GPEngine.run 相同"""
+        start_time = time.time()
+        context = multiprocessing.get_context()
+        channels = [context.Queue() for _ in range(self.islands)]
+        results = context.Queue()
+        shared_x = SharedArray(self.X.T)
+        shared_y = SharedArray(self.y)
+        params = {
+            'engine': self.engine_params,
+            'migration_interval': self.migration_interval,
+            'migration_size': self.migration_size,
+        }
+        processes = []
+        try:
+            for i in range(self.islands):
+                process = context.Process(
+                    target=_island_main,
+                    args=(i, shared_x.descriptor(), shared_y.descriptor(), params,
+                          self.seed_sequences[i], channels[i],
+                          channels[(i + 1) % self.islands], results),
+                    daemon=True,
+                )
+                process.start()
+                processes.append(process)
+            logger.info(f"岛屿模型已启动: {self.islands} 个岛，每 {self.migration_interval} 代"
+                        f"迁移 {self.migration_size} 个个体")
+
+            island_runs: List[Optional[Dict[str, Any]]] = [None] * self.islands
+            for _ in range(self.islands):
+                try:
+                    status, index, payload, arrays = results.get(timeout=MIGRATION_TIMEOUT)
+                except queue.Empty:
+                    raise RuntimeError("岛屿进程长时间无响应")
+                if status != 'ok':
+                    raise RuntimeError(f"岛 {index} 进化失败: {payload}")
+                payload['population'] = Population(*arrays)
+                island_runs[index] = payload
+            for process in processes:
+                process.join()
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            shared_x.release()
+            shared_y.release()
+
+        return self._merge(island_runs, time.time() - start_time)
+
+    def _merge(self, island_runs: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+        """合并各岛结果：取全局最优个体，拼接最终种群，逐代记录各岛最优误差"""
+        best = min(range(self.islands), key=lambda i: island_runs[i]['error'])
+        history = []
+        for records in zip(*[run['history'] for run in island_runs]):
+            record = {
+                'generation': records[0]['generation'],
+                'best_error': min(r['best_error'] for r in records),
+                'mean_length': float(np.mean([r['mean_length'] for r in records])),
+                'island_best_errors': [r['best_error'] for r in records],
+            }
+            if 'duplicate_ratio' in records[0]:
+                record['duplicate_ratio'] = float(np.mean([r['duplicate_ratio'] for r in records]))
+            history.append(record)
+        winner = island_runs[best]
+        return {
+            'ops': winner['ops'],
+            'args': winner['args'],
+            'consts': winner['consts'],
+            'error': winner['error'],
+            'population': Population.concat([run['population'] for run in island_runs]),
+            'errors': np.concatenate([run['errors'] for run in island_runs]),
+            'history': history,
+            'elapsed': elapsed,
+            'best_island': best,
+            'cache_stats': self._merge_cache_stats([run.get('cache_stats') for run in island_runs]),
+            'precision': winner['precision'],
+            'racing_stats': self._merge_racing_stats([run.get('racing_stats') for run in island_runs]),
+        }
+
+    @staticmethod
+    def _merge_racing_stats(stats: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """汇总各岛连续减半评估的行评估次数"""
+        stats = [s for s in stats if s]
+        if not stats:
+            return None
+        merged = {key: sum(s[key] for s in stats)
+                  for key in ('row_evaluations', 'full_row_evaluations', 'saved_row_evaluations')}
+        total = merged['full_row_evaluations']
+        merged['saved_ratio'] = merged['saved_row_evaluations'] / total if total else 0.0
+        return merged
+
+    @staticmethod
+    def _merge_cache_stats(stats: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """汇总各岛子树缓存统计（各岛缓存相互独立，计数与内存占用直接相加）"""
+        stats = [s for s in stats if s]
+        if not stats:
+            return None
+        merged = {key: sum(s[key] for s in stats)
+                  for key in ('hits', 'lookups', 'bytes', 'entries', 'evictions')}
+        merged['hit_rate'] = merged['hits'] / merged['lookups'] if merged['lookups'] else 0.0
+        return merged
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+蒙特卡洛采样的在线聚合量
+
+流式模式逐块更新这些聚合量，不保留任何样本，内存占用与采样次数无关：
+- RunningMoments：Welford / Chan 合并的计数、均值、二阶中心矩与极值
+- FixedHistogram：固定分箱直方图（另计下溢 / 上溢）
+- QuantileSketch：相对误差有界的对数分桶分位数草图（DDSketch）
+- TopK：最接近目标药效的 k 个配比（有界）
+- FirstRows：按样本序号最先出现的若干有效配比
+
+所有聚合量都可合并：计数、直方图与草图的合并是精确的整数加法，与顺序无关；
+矩的合并按固定顺序进行，同一组块以相同顺序合并时结果逐位一致。
+"""
+
+import math
+import numpy as np
+from typing import Dict, List, Any
+
+# 分位数草图的默认相对精度
+DEFAULT_SKETCH_ACCURACY = 0.005
+
+
+class RunningMoments:
+    """逐列的计数、均值、二阶中心矩（Welford / Chan 合并）与最小 / 最大值"""
+
+    def __init__(self, dim: int):
+        self.count = 0
+        self.mean = np.zeros(dim)
+        self.m2 = np.zeros(dim)
+        self.min = np.full(dim, np.inf)
+        self.max = np.full(dim, -np.inf)
+
+    def update(self, values: np.ndarray):
+        """并入一块 (行 × 列) 数据"""
+        if len(values) == 0:
+            return
+        values = np.asarray(values, dtype=np.float64)
+        block = RunningMoments(values.shape[1])
+        block.count = len(values)
+        block.mean = values.mean(axis=0)
+        deviation = values - block.mean
+        block.m2 = np.einsum('ij,ij->j', deviation, deviation)
+        block.min = values.min(axis=0)
+        block.max = values.max(axis=0)
+        self.merge(block)
+
+    def merge(self, other: 'RunningMoments'):
+        """并入另一组矩（Chan 等的并行合并公式）"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean.copy(), other.m2.copy()
+            self.min, self.max = other.min.copy(), other.max.copy()
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / total)
+        self.m2 = self.m2 + other.m2 + delta * delta * (self.count * other.count / total)
+        self.count = total
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+
+    @property
+    def std(self) -> np.ndarray:
+        """总体标准差（与 np.std 一致）"""
+        return np.sqrt(self.m2 / self.count) if self.count else np.zeros(len(self.m2))
+
+
+class FixedHistogram:
+    """固定范围与分箱数的直方图（分箱规则与 np.histogram 相同，范围外的值另计）"""
+
+    def __init__(self, bins: int = 50, low: float = 0.0, high: float = 1.0):
+        if bins < 1 or not high > low:
+            raise ValueError("直方图需要正的分箱数与 high > low 的范围")
+        self.bins = int(bins)
+        self.low = float(low)
+        self.high = float(high)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        below = values < self.low
+        above = values > self.high
+        self.underflow += int(np.count_nonzero(below))
+        self.overflow += int(np.count_nonzero(above))
+        inside = values[~(below | above)]
+        index = ((inside - self.low) * (self.bins / (self.high - self.low))).astype(np.int64)
+        # 右端点并入最后一个分箱
+        np.minimum(index, self.bins - 1, out=index)
+        self.counts += np.bincount(index, minlength=self.bins)
+
+    def merge(self, other: 'FixedHistogram'):
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+    @property
+    def edges(self) -> np.ndarray:
+        return np.linspace(self.low, self.high, self.bins + 1)
+
+
+class _BucketStore:
+    """对数分桶计数的稠密存储（桶编号连续，按需扩展）"""
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def _extend(self, low: int, high: int):
+        if len(self.counts) == 0:
+            self.offset = low
+            self.counts = np.zeros(high - low + 1, dtype=np.int64)
+            return
+        new_low = min(low, self.offset)
+        new_high = max(high, self.offset + len(self.counts) - 1)
+        if new_low == self.offset and new_high == self.offset + len(self.counts) - 1:
+            return
+        counts = np.zeros(new_high - new_low + 1, dtype=np.int64)
+        counts[self.offset - new_low:self.offset - new_low + len(self.counts)] = self.counts
+        self.offset, self.counts = new_low, counts
+
+    def add(self, keys: np.ndarray):
+        if len(keys) == 0:
+            return
+        low, high = int(keys.min()), int(keys.max())
+        self._extend(low, high)
+        self.counts[low - self.offset:high - self.offset + 1] += np.bincount(keys - low,
+                                                                             minlength=high - low + 1)
+
+    def merge(self, other: '_BucketStore'):
+        if len(other.counts) == 0:
+            return
+        self._extend(other.offset, other.offset + len(other.counts) - 1)
+        start = other.offset - self.offset
+        self.counts[start:start + len(other.counts)] += other.counts
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+
+class QuantileSketch:
+    """
+    DDSketch 分位数草图：值按 γ = (1+α)/(1-α) 的对数分桶计数，
+    任一分位数估计的相对误差不超过 α；桶数只随取值范围的对数增长
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_SKETCH_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("分位数草图的相对精度必须在 0 与 1 之间")
+        self.relative_accuracy = float(relative_accuracy)
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._inverse_log_gamma = 1.0 / math.log(self.gamma)
+        self.positive = _BucketStore()
+        self.negative = _BucketStore()
+        self.zero_count = 0
+
+    def _keys(self, magnitudes: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(magnitudes) * self._inverse_log_gamma).astype(np.int64)
+
+    def _value(self, key: int) -> float:
+        return 2.0 * self.gamma ** key / (self.gamma + 1)
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        positive = values > 0
+        negative = values < 0
+        self.zero_count += int(len(values) - np.count_nonzero(positive) - np.count_nonzero(negative))
+        self.positive.add(self._keys(values[positive]))
+        self.negative.add(self._keys(-values[negative]))
+
+    def merge(self, other: 'QuantileSketch'):
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zero_count += other.zero_count
+
+    @property
+    def count(self) -> int:
+        return self.positive.total + self.negative.total + self.zero_count
+
+    def quantile(self, q: float) -> float:
+        """q 分位数的估计值（秩 q·(n-1)，与 np.percentile 的默认定义对应）；空草图返回 0"""
+        n = self.count
+        if n == 0:
+            return 0.0
+        rank = q * (n - 1)
+        # 负值按绝对值从大到小排在最前，之后是 0 与正值
+        negative = self.negative.counts[::-1]
+        cumulative = np.cumsum(negative)
+        if len(negative) and rank < cumulative[-1]:
+            i = int(np.searchsorted(cumulative, rank, side='right'))
+            return -self._value(self.negative.offset + len(negative) - 1 - i)
+        seen = int(cumulative[-1]) if len(negative) else 0
+        if rank < seen + self.zero_count:
+            return 0.0
+        cumulative = np.cumsum(self.positive.counts) + seen + self.zero_count
+        i = min(int(np.searchsorted(cumulative, rank, side='right')), len(cumulative) - 1)
+        return self._value(self.positive.offset + i)
+
+
+class TopK:
+    """距离最小的 k 行（距离相同按样本序号），只保留 k 行"""
+
+    def __init__(self, k: int, dim: int):
+        self.k = int(k)
+        self.distance = np.zeros(0)
+        self.index = np.zeros(0, dtype=np.int64)
+        self.rows = np.zeros((0, dim))
+        self.values = np.zeros(0)
+
+    def _keep(self, distance, index, rows, values):
+        order = np.lexsort((index, distance))[:self.k]
+        self.distance, self.index = distance[order], index[order]
+        self.rows, self.values = rows[order], values[order]
+
+    def update(self, start: int, rows: np.ndarray, values: np.ndarray, distance: np.ndarray):
+        """并入一块：start 为块首行的全局样本序号；非有限距离不参与"""
+        candidates = np.flatnonzero(np.isfinite(distance))
+        if len(candidates) > self.k:
+            candidates = candidates[np.argpartition(distance[candidates], self.k - 1)[:self.k]]
+        self._keep(np.concatenate([self.distance, distance[candidates]]),
+                   np.concatenate([self.index, candidates + start]),
+                   np.concatenate([self.rows, np.asarray(rows[candidates], dtype=np.float64)]),
+                   np.concatenate([self.values, np.asarray(values[candidates], dtype=np.float64)]))
+
+    def merge(self, other: 'TopK'):
+        self._keep(np.concatenate([self.distance, other.distance]),
+                   np.concatenate([self.index, other.index]),
+                   np.concatenate([self.rows, other.rows]),
+                   np.concatenate([self.values, other.values]))
+
+
+class FirstRows:
+    """按样本序号最先出现的 limit 行（合并时须按样本序号先后的顺序合并）"""
+
+    def __init__(self, limit: int, dim: int):
+        self.limit = int(limit)
+        self.rows = np.zeros((0, dim))
+        self.values = np.zeros(0)
+
+    def update(self, rows: np.ndarray, values: np.ndarray):
+        room = self.limit - len(self.values)
+        if room > 0 and len(values):
+            self.rows = np.concatenate([self.rows, np.asarray(rows[:room], dtype=np.float64)])
+            self.values = np.concatenate([self.values, np.asarray(values[:room], dtype=np.float64)])
+
+    def merge(self, other: 'FirstRows'):
+        self.update(other.rows, other.values)
+
+
+class MonteCarloAggregate:
+    """
+    一段样本的全部在线聚合量
+
+    全体样本：药效的矩、直方图与分位数草图；有效样本（药效落在目标区间）：
+    各成分的矩与分位数草图、最先出现的 first_valid 个配比；以及最接近目标药效的 top_k 个配比
+    """
+
+    def __init__(self, n_components: int, target_efficacy: float, tolerance: float,
+                 histogram_bins: int = 50, histogram_range: tuple = (0.0, 1.0),
+                 top_k: int = 10, first_valid: int = 100,
+                 relative_accuracy: float = DEFAULT_SKETCH_ACCURACY):
+        self.target_efficacy = float(target_efficacy)
+        self.tolerance = float(tolerance)
+        self.iterations = 0
+        self.valid_count = 0
+        self.nonfinite_count = 0
+        self.efficacy_moments = RunningMoments(1)
+        self.efficacy_histogram = FixedHistogram(histogram_bins, *histogram_range)
+        self.efficacy_sketch = QuantileSketch(relative_accuracy)
+        self.component_moments = RunningMoments(n_components)
+        self.component_sketches = [QuantileSketch(relative_accuracy) for _ in range(n_components)]
+        self.top = TopK(top_k, n_components)
+        self.first_valid = FirstRows(first_valid, n_components)
+
+    def update(self, start: int, samples: np.ndarray, efficacies: np.ndarray):
+        """并入一块样本；start 为块首行的全局样本序号"""
+        efficacies = np.asarray(efficacies, dtype=np.float64)
+        finite = np.isfinite(efficacies)
+        distance = np.abs(efficacies - self.target_efficacy)
+        with np.errstate(invalid='ignore'):
+            valid = distance <= self.tolerance
+        self.iterations += len(efficacies)
+        self.valid_count += int(np.count_nonzero(valid))
+        self.nonfinite_count += int(len(efficacies) - np.count_nonzero(finite))
+        finite_values = efficacies[finite]
+        self.efficacy_moments.update(finite_values[:, None])
+        self.efficacy_histogram.update(finite_values)
+        self.efficacy_sketch.update(finite_values)
+        valid_samples = samples[valid]
+        self.component_moments.update(valid_samples)
+        for j, sketch in enumerate(self.component_sketches):
+            sketch.update(valid_samples[:, j])
+        self.top.update(start, samples, efficacies, distance)
+        self.first_valid.update(valid_samples, efficacies[valid])
+
+    def merge(self, other: 'MonteCarloAggregate'):
+        """并入紧随其后的一段样本的聚合量"""
+        self.iterations += other.iterations
+        self.valid_count += other.valid_count
+        self.nonfinite_count += other.nonfinite_count
+        self.efficacy_moments.merge(other.efficacy_moments)
+        self.efficacy_histogram.merge(other.efficacy_histogram)
+        self.efficacy_sketch.merge(other.efficacy_sketch)
+        self.component_moments.merge(other.component_moments)
+        for sketch, other_sketch in zip(self.component_sketches, other.component_sketches):
+            sketch.merge(other_sketch)
+        self.top.merge(other.top)
+        self.first_valid.merge(other.first_valid)
+
+    def component_statistics(self, names: List[str]) -> Dict[str, Dict[str, float]]:
+        """各成分在有效样本上的统计（键与整批模式相同，分位数为草图估计）"""
+        moments = self.component_moments
+        if moments.count == 0:
+            return {name: {'min': 0.0, 'max': 0.0, 'mean': 0.0, 'std': 0.0,
+                           'median': 0.0, 'q25': 0.0, 'q75': 0.0} for name in names}
+        std = moments.std
+        return {
+            name: {
+                'min': float(moments.min[j]),
+                'max': float(moments.max[j]),
+                'mean': float(moments.mean[j]),
+                'std': float(std[j]),
+                'median': self.component_sketches[j].quantile(0.5),
+                'q25': self.component_sketches[j].quantile(0.25),
+                'q75': self.component_sketches[j].quantile(0.75)
+            }
+            for j, name in enumerate(names)
+        }
+
+    def efficacy_statistics(self) -> Dict[str, float]:
+        """全部有限药效预测的统计"""
+        moments = self.efficacy_moments
+        if moments.count == 0:
+            return {'min': 0.0, 'max': 0.0, 'mean': 0.0, 'std': 0.0, 'median': 0.0}
+        return {
+            'min': float(moments.min[0]),
+            'max': float(moments.max[0]),
+            'mean': float(moments.mean[0]),
+            'std': float(moments.std[0]),
+            'median': self.efficacy_sketch.quantile(0.5)
+        }
+
+    @staticmethod
+    def records(rows: np.ndarray, values: np.ndarray, names: List[str]) -> List[Dict[str, Any]]:
+        """把配比行整理为 {'sample': {成分: 数值}, 'predicted_efficacy'} 列表"""
+        return [
+            {
+                'sample': {name: float(value) for name, value in zip(names, row)},
+                'predicted_efficacy': float(efficacy)
+            }
+            for row, efficacy in zip(rows, values)
+        ]
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+回归模型性能指标
+
+detailed_metrics 的 14 项指标（训练集 / 测试集各 MAE、MSE、NMSE、RMSE、平均相对误差、皮尔逊 r）
+由一次融合遍历得到：按行分块扫描 (y, ŷ)，每块只计算一次残差，累加少量运行和
+（Σ|r|、Σr²、Σ|r|/|y|、Σŷ、Σŷ²、Σyŷ），所有指标再由这些和闭式导出。
+预测可以是单个模型的向量，也可以是 (模型 × 样本) 矩阵，整个种群或模型列表一次评分。
+为避免运行和的相消误差，y 先减去其均值、各模型的 ŷ 先减去其首块均值再累加。
+
+GP 引擎的适应度、符号回归结果与 Pareto 前沿、表达式树编辑以及模型对比共用本模块。
+"""
+
+import numpy as np
+from typing import Dict, List, Union
+
+# 单块 (模型 × 行) 的最大元素数
+METRICS_CHUNK_ELEMENTS = 1 << 20
+
+# 指标键名（与前端 detailed_metrics 的字段一致）
+METRIC_NAMES = {
+    'mae': 'mean_absolute_error',
+    'mse': 'mean_squared_error',
+    'nmse': 'normalized_mean_squared_error',
+    'rmse': 'root_mean_squared_error',
+    'are': 'average_relative_error',
+    'pearson_r': 'pearson_r',
+}
+
+# 方差相对于二阶矩低于该比例时视为常数（皮尔逊 r 记为 0）
+_FLAT_TOLERANCE = 1e-12
+
+
+def mean_squared_errors(predictions: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """计算 (个体 × 样本) 预测矩阵的逐个体均方误差，非有限值视为无穷大（GP 适应度）"""
+    with np.errstate(all='ignore'):
+        errors = np.mean((predictions - y) ** 2, axis=-1)
+    errors[~np.isfinite(errors)] = np.inf
+    return errors
+
+
+def split_metrics(y: np.ndarray, predictions: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    单个数据划分上各模型的误差指标（融合单遍）
+
+    Args:
+        y: 目标值 (样本)
+        predictions: 预测矩阵 (模型 × 样本)
+
+    Returns:
+        指标名 → 各模型的指标值数组；空划分时全部为 0
+    """
+    y = np.asarray(y, dtype=np.float64)
+    P = np.asarray(predictions, dtype=np.float64)
+    m, n = P.shape
+    if n == 0:
+        return {key: np.zeros(m) for key in METRIC_NAMES}
+
+    yc = y - float(np.mean(y))
+    nonzero = y != 0
+    inverse = np.where(nonzero, 1.0 / np.where(nonzero, np.abs(y), 1.0), 0.0)
+    sums = {key: np.zeros(m) for key in ('abs', 'sq', 'rel', 'p', 'pp', 'yp')}
+    step = max(1, METRICS_CHUNK_ELEMENTS // max(m, 1))
+    with np.errstate(all='ignore'):
+        p_shift = np.mean(P[:, :step], axis=1)
+        p_shift[~np.isfinite(p_shift)] = 0.0
+        for start in range(0, n, step):
+            stop = min(start + step, n)
+            residual = P[:, start:stop] - y[start:stop]
+            pc = P[:, start:stop] - p_shift[:, None]
+            sums['sq'] += np.einsum('ij,ij->i', residual, residual)
+            np.abs(residual, out=residual)
+            sums['abs'] += residual.sum(axis=1)
+            sums['rel'] += residual @ inverse[start:stop]
+            sums['p'] += pc.sum(axis=1)
+            sums['pp'] += np.einsum('ij,ij->i', pc, pc)
+            sums['yp'] += pc @ yc[start:stop]
+
+        mse = sums['sq'] / n
+        variance = float(np.var(y))
+        n_nonzero = int(np.count_nonzero(nonzero))
+        p_mean = sums['p'] / n
+        p_second = sums['pp'] / n
+        p_variance = p_second - p_mean ** 2
+        y_mean = float(np.sum(yc)) / n
+        covariance = sums['yp'] / n - y_mean * p_mean
+        flat = ~(p_variance > _FLAT_TOLERANCE * np.maximum(p_second, np.finfo(np.float64).tiny))
+        denominator = np.sqrt(variance * np.where(flat, 0.0, p_variance))
+        pearson_r = np.where(denominator > 0, covariance / np.where(denominator > 0, denominator, 1.0), 0.0)
+    return {
+        'mae': sums['abs'] / n,
+        'mse': mse,
+        'nmse': mse / variance if variance > 0 else np.zeros(m),
+        'rmse': np.sqrt(mse),
+        'are': sums['rel'] / n_nonzero * 100 if n_nonzero else np.zeros(m),
+        'pearson_r': pearson_r,
+    }
+
+
+def detailed_metrics(y: np.ndarray, predictions: np.ndarray,
+                     n_train: int) -> Union[Dict[str, float], List[Dict[str, float]]]:
+    """
+    训练集（前 n_train 行）与测试集的详细性能指标
+
+    predictions 为一维向量时返回单个指标字典；为 (模型 × 样本) 矩阵时返回每个模型的指标字典列表
+    """
+    P = np.asarray(predictions, dtype=np.float64)
+    single = P.ndim == 1
+    P = np.atleast_2d(P)
+    y = np.asarray(y, dtype=np.float64)
+    columns: Dict[str, np.ndarray] = {}
+    for split, rows in (('training', slice(None, n_train)), ('test', slice(n_train, None))):
+        for key, values in split_metrics(y[rows], P[:, rows]).items():
+            columns[f"{METRIC_NAMES[key]}_{split}"] = values
+    metrics = [{name: float(values[i]) for name, values in columns.items()} for i in range(len(P))]
+    return metrics[0] if single else metrics
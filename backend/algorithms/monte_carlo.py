@@ -2,29 +2,203 @@
 # -*- coding: utf-8 -*-
 """
 蒙特卡洛采样分析算法模块
+
+样本矩阵、药效预测、有效性判断与各项统计均为整批数组运算，没有逐样本的 Python 循环。
+流式模式把样本按固定的段（每段 MC_SEGMENT_BLOCKS 块）生成并归约为可合并的在线聚合量，
+各段可分配到进程池并行计算；第 k 块始终使用根种子派生的第 k 个子随机数流，
+各段聚合量按段序合并，因此同一种子的结果与工作进程数无关。
+除均匀随机采样外还支持准随机采样（scipy.stats.qmc 的 Sobol、Halton 与拉丁超立方），
+点集经种子扰乱后缩放到各成分的 [min, max]；流式模式下每段为一个独立扰乱的点集。
+adaptive 采样器为向目标药效区间集中的交叉熵重要性采样（见 importance_sampling），只用于整批模式。
 """
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from scipy.stats import qmc
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from loguru import logger
 import json
 from pathlib import Path
 import time
+from concurrent.futures import ProcessPoolExecutor
 from .symbolic_regression import SymbolicRegression
+from .expression_compiler import CompiledExpression, expression_cache
+from .mc_aggregates import FixedHistogram, MonteCarloAggregate
+from .importance_sampling import (cross_entropy_sampling, importance_diagnostics,
+                                  weighted_statistics)
+from utils.rng import child_generator, fresh_seed
+
+# 每个采样块的样本数；第 k 块使用根种子派生的第 k 个子随机数流，结果与分块执行方式无关
+MC_CHUNK_SIZE = 10000
+# 结果中保留的最接近目标药效的样本数与最先出现的有效样本数
+MC_TOP_SAMPLES = 10
+MC_FIRST_VALID = 100
+# 药效直方图的分箱（两种模式相同）；范围由试探块的预测药效与目标区间确定，MC_HISTOGRAM_RANGE 为无有限预测时的默认范围
+MC_HISTOGRAM_BINS = 50
+MC_HISTOGRAM_RANGE = (0.0, 1.0)
+# 试探块的样本数与直方图范围两端的留白比例
+MC_PILOT_ROWS = 1000
+MC_HISTOGRAM_MARGIN = 0.05
+# 未指定模式时，超过该采样次数使用流式模式
+MC_STREAMING_THRESHOLD = 1000000
+# 流式模式每段的块数：每段的聚合量从零开始累积，各段再按段序合并；段也是进程池的任务单位
+MC_SEGMENT_BLOCKS = 8
+# 采样器：均匀随机、准随机（低差异序列）与自适应重要性采样
+MC_SAMPLERS = ('uniform', 'sobol', 'halton', 'lhs', 'adaptive')
+# 流式模式下准随机采样每段的点数（2 的幂，Sobol 点集在每段内平衡）
+MC_QMC_SEGMENT_SIZE = 1 << 16
+
+
+def draw_block(low: np.ndarray, high: np.ndarray, seed: Any, block_index: int, rows: int) -> np.ndarray:
+    """第 block_index 块的均匀样本 (rows × 成分)，使用根种子派生的第 block_index 个子随机数流"""
+    return child_generator(seed, block_index).uniform(low, high, size=(rows, len(low)))
+
+
+def predict_block(compiled: CompiledExpression, names: List[str], samples: np.ndarray,
+                  dtype=np.float64) -> np.ndarray:
+    """一次求值一块样本的预测药效"""
+    return compiled.evaluate_columns({name: samples[:, i] for i, name in enumerate(names)}, dtype=dtype)
+
+
+def histogram_range(compiled: CompiledExpression, names: List[str], low: np.ndarray, high: np.ndarray,
+                    seed: Any, target_efficacy: float, tolerance: float, dtype=np.float64) -> Tuple[float, float]:
+    """
+    药效直方图的范围：覆盖试探块（第 0 个子流的前 MC_PILOT_ROWS 个均匀样本）的有限预测与目标区间，两端各留白 MC_HISTOGRAM_MARGIN
+
+    只由种子决定，整批与流式模式、各采样器使用同一范围；范围外的样本计入 underflow / overflow
+    """
+    pilot = draw_block(low, high, seed, 0, MC_PILOT_ROWS).astype(dtype)
+    efficacies = predict_block(compiled, names, pilot, dtype).astype(np.float64)
+    efficacies = efficacies[np.isfinite(efficacies)]
+    if len(efficacies) == 0:
+        return MC_HISTOGRAM_RANGE
+    lower = min(float(np.min(efficacies)), target_efficacy - tolerance)
+    upper = max(float(np.max(efficacies)), target_efficacy + tolerance)
+    margin = (upper - lower) * MC_HISTOGRAM_MARGIN or max(abs(upper), 1.0) * MC_HISTOGRAM_MARGIN
+    return lower - margin, upper + margin
+
+
+def new_aggregate(n_components: int, target_efficacy: float, tolerance: float,
+                  efficacy_range: Tuple[float, float] = MC_HISTOGRAM_RANGE) -> MonteCarloAggregate:
+    """按本模块的直方图、top-k 与有效样本数设置创建空的在线聚合量"""
+    return MonteCarloAggregate(n_components, target_efficacy, tolerance,
+                               histogram_bins=MC_HISTOGRAM_BINS, histogram_range=efficacy_range,
+                               top_k=MC_TOP_SAMPLES, first_valid=MC_FIRST_VALID)
+
+
+def balanced_iterations(sampler: str, iterations: int, streaming: bool,
+                        max_iterations: Optional[int] = None) -> int:
+    """
+    采样器要求的平衡样本数：Sobol 序列取不小于 iterations 的 2 的幂
+    （流式模式下超过一段时取段长 MC_QMC_SEGMENT_SIZE 的整数倍），其余采样器不变；
+    向上取整会超过 max_iterations 时改为向下取整（不大于 iterations 的 2 的幂 / 段长整数倍）
+    """
+    if sampler != 'sobol':
+        return iterations
+    if streaming and iterations > MC_QMC_SEGMENT_SIZE:
+        balanced = -(-iterations // MC_QMC_SEGMENT_SIZE) * MC_QMC_SEGMENT_SIZE
+        if max_iterations is not None and balanced > max_iterations:
+            balanced = iterations // MC_QMC_SEGMENT_SIZE * MC_QMC_SEGMENT_SIZE
+        return balanced
+    balanced = 1 << (iterations - 1).bit_length()
+    if max_iterations is not None and balanced > max_iterations:
+        balanced = 1 << (iterations.bit_length() - 1)
+    return balanced
+
+
+def qmc_points(sampler: str, dimension: int, seed: Any, segment: int, rows: int) -> np.ndarray:
+    """第 segment 段的准随机点 (rows × 维数)，扰乱使用根种子派生的第 segment 个子随机数流"""
+    rng = child_generator(seed, segment)
+    if sampler == 'sobol':
+        engine = qmc.Sobol(dimension, scramble=True, seed=rng)
+    elif sampler == 'halton':
+        engine = qmc.Halton(dimension, scramble=True, seed=rng)
+    else:
+        engine = qmc.LatinHypercube(dimension, seed=rng)
+    return engine.random(rows)
+
+
+def segment_size(sampler: str) -> int:
+    """流式模式每段的样本数"""
+    return MC_SEGMENT_BLOCKS * MC_CHUNK_SIZE if sampler == 'uniform' else MC_QMC_SEGMENT_SIZE
+
+
+def segment_rows(sampler: str, segment: int, iterations: int) -> Tuple[int, int]:
+    """流式模式第 segment 段的样本序号区间 [start, stop)"""
+    size = segment_size(sampler)
+    start = segment * size
+    return start, min(start + size, iterations)
+
+
+def segment_blocks(sampler: str, low: np.ndarray, high: np.ndarray, seed: Any, segment: int,
+                   iterations: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    依次生成第 segment 段各块的 (块首样本序号, 样本)
+
+    均匀采样的块与整批模式相同；准随机采样整段为一个独立扰乱的点集（段内平衡），再按块切分
+    """
+    start, stop = segment_rows(sampler, segment, iterations)
+    if sampler == 'uniform':
+        for block_start in range(start, stop, MC_CHUNK_SIZE):
+            yield block_start, draw_block(low, high, seed, block_start // MC_CHUNK_SIZE,
+                                          min(MC_CHUNK_SIZE, stop - block_start))
+        return
+    points = qmc_points(sampler, len(low), seed, segment, stop - start)
+    for offset in range(0, stop - start, MC_CHUNK_SIZE):
+        yield start + offset, low + points[offset:offset + MC_CHUNK_SIZE] * (high - low)
+
+
+def simulate_segment(compiled: CompiledExpression, names: List[str], low: np.ndarray,
+                     high: np.ndarray, seed: Any, segment: int, iterations: int,
+                     target_efficacy: float, tolerance: float, dtype=np.float64,
+                     sampler: str = 'uniform',
+                     efficacy_range: Tuple[float, float] = MC_HISTOGRAM_RANGE) -> MonteCarloAggregate:
+    """生成并求值第 segment 段的样本，返回这一段的在线聚合量"""
+    aggregate = new_aggregate(len(names), target_efficacy, tolerance, efficacy_range)
+    for start, samples in segment_blocks(sampler, low, high, seed, segment, iterations):
+        samples = samples.astype(dtype, copy=False)
+        aggregate.update(start, samples, predict_block(compiled, names, samples, dtype))
+    return aggregate
+
+
+# 工作进程内的全局状态
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_segment_worker(compiled: CompiledExpression, names: List[str], low: np.ndarray,
+                         high: np.ndarray, seed: Any, iterations: int, target_efficacy: float,
+                         tolerance: float, dtype, sampler: str, efficacy_range: Tuple[float, float]):
+    """工作进程初始化：保存编译表达式与采样参数，各段任务只传段号"""
+    _worker_state.update(compiled=compiled, names=names, low=low, high=high, seed=seed,
+                         iterations=iterations, target_efficacy=target_efficacy,
+                         tolerance=tolerance, dtype=dtype, sampler=sampler,
+                         efficacy_range=efficacy_range)
+
+
+def _segment_task(segment: int) -> MonteCarloAggregate:
+    """在工作进程中计算一段的聚合量"""
+    state = _worker_state
+    return simulate_segment(state['compiled'], state['names'], state['low'], state['high'],
+                            state['seed'], segment, state['iterations'], state['target_efficacy'],
+                            state['tolerance'], state['dtype'], state['sampler'], state['efficacy_range'])
+
 
 class MonteCarloAnalysis:
     """蒙特卡洛采样配比分析算法实现"""
     
-    def __init__(self):
+    def __init__(self, regression_engine: Optional[SymbolicRegression] = None):
         self.results = {}
         self.results_dir = Path("monte_carlo_results")
         self.results_dir.mkdir(exist_ok=True)
-        self.regression_engine = SymbolicRegression()
+        self.regression_engine = regression_engine or SymbolicRegression()
         self._load_saved_results()
     
     def analyze(self, model_id: str, target_efficacy: float, iterations: int = 10000,
-                tolerance: float = 0.1, component_ranges: Optional[Dict[str, List[float]]] = None) -> Dict[str, Any]:
+                tolerance: float = 0.1, component_ranges: Optional[Dict[str, List[float]]] = None,
+                seed: Optional[int] = None, precision: str = 'float64',
+                model: Optional[Dict[str, Any]] = None, save: bool = True,
+                streaming: Optional[bool] = None, workers: int = 1,
+                sampler: str = 'uniform', max_iterations: Optional[int] = None) -> Dict[str, Any]:
         """
         执行蒙特卡洛采样配比分析
         
@@ -34,6 +208,15 @@ class MonteCarloAnalysis:
             iterations: 采样次数
             tolerance: 容差范围
             component_ranges: 各成分的范围定义
+            seed: 随机种子（None 时随机生成并记录在结果中）
+            precision: 采样矩阵与药效预测的精度（float64 / float32），记录在结果中
+            model: 直接提供的回归模型内容（如数据模型的回归模型文件）；None 时按 model_id 从符号回归引擎获取
+            save: 是否将结果保存到 monte_carlo_results 目录
+            streaming: 是否使用流式模式（内存与采样次数无关），None 时按采样次数自动选择
+            workers: 流式模式下并行计算各段的进程数（结果与进程数无关）；整批模式在当前进程内计算
+            sampler: 采样器（uniform / sobol / halton / lhs / adaptive）；Sobol 的采样次数向上取为平衡的点数，
+                adaptive 为自适应重要性采样（整批模式）
+            max_iterations: 采样次数上限；Sobol 向上取整会超过上限时改为向下取整
             
         Returns:
             分析结果字典
@@ -43,19 +226,24 @@ class MonteCarloAnalysis:
             logger.info(f"目标药效: {target_efficacy}, 采样次数: {iterations}")
             
             # 获取回归模型
-            model = self.regression_engine.get_model(model_id)
+            if model is None:
+                model = self.regression_engine.get_model(model_id)
             if not model:
                 raise ValueError(f"模型 {model_id} 不存在")
             
             # 执行蒙特卡洛模拟
             result = self._perform_monte_carlo_simulation(
-                model, target_efficacy, iterations, tolerance, component_ranges
+                model, target_efficacy, iterations, tolerance, component_ranges,
+                seed=fresh_seed() if seed is None else seed, precision=precision,
+                model_id=model_id, streaming=streaming, workers=workers, sampler=sampler,
+                max_iterations=max_iterations
             )
             
             # 保存结果
-            analysis_id = self._save_result(result)
+            if save:
+                self._save_result(result)
             
-            logger.info(f"蒙特卡洛采样分析完成，分析ID: {analysis_id}")
+            logger.info(f"蒙特卡洛采样分析完成，分析ID: {result['analysis_id']}，耗时 {result['elapsed']}s")
             return result
             
         except Exception as e:
@@ -64,83 +252,89 @@ class MonteCarloAnalysis:
     
     def _perform_monte_carlo_simulation(self, model: Dict[str, Any], target_efficacy: float,
                                       iterations: int, tolerance: float,
-                                      component_ranges: Optional[Dict[str, List[float]]] = None) -> Dict[str, Any]:
-        """执行蒙特卡洛采样模拟"""
+                                      component_ranges: Optional[Dict[str, List[float]]] = None,
+                                      seed: Optional[int] = None,
+                                      precision: str = 'float64',
+                                      model_id: Optional[str] = None,
+                                      streaming: Optional[bool] = None,
+                                      workers: int = 1,
+                                      sampler: str = 'uniform',
+                                      max_iterations: Optional[int] = None) -> Dict[str, Any]:
+        """
+        执行蒙特卡洛采样模拟
+
+        整批模式：整个 (采样次数 × 成分) 样本矩阵按块填充（每块一次抽样），药效由编译表达式一次求值，
+        有效性判断、成分统计与直方图均为数组运算，分位数精确。
+        流式模式：逐块生成、求值并更新在线聚合量（见 mc_aggregates），不保留样本，
+        峰值内存与采样次数无关；分位数为草图估计。
+        各模式的 distribution_data 都只含直方图与汇总统计，不保留逐样本的药效（结果大小与采样次数无关）。
+        streaming 为 None 时采样次数超过 MC_STREAMING_THRESHOLD 即使用流式模式；
+        流式模式的各段由 workers 个进程并行计算，整批模式不使用进程池。
+        sampler 为准随机采样器时，整批模式使用一个覆盖全部采样次数的扰乱点集，
+        结果中的 iterations 为平衡后的实际采样次数（不超过 max_iterations），requested_iterations 为请求值。
+        sampler 为 adaptive 时有效率为重要性加权的无偏估计，统计量为加权估计，另附 importance_sampling 诊断。
+        三种模式的药效统计与直方图都只取有限预测（非有限的个数记为 nonfinite_count），
+        直方图范围见 histogram_range，范围外的样本数记为 underflow / overflow。
+        """
         try:
             logger.info("开始执行蒙特卡洛采样模拟...")
-            
-            # 模拟计算时间
-            time.sleep(3)
+            start_time = time.time()
+            if precision not in ('float64', 'float32'):
+                raise ValueError(f"不支持的计算精度: {precision}")
+            if iterations < 1:
+                raise ValueError("采样次数必须为正整数")
+            if sampler not in MC_SAMPLERS:
+                raise ValueError(f"不支持的采样器: {sampler}（可选 {', '.join(MC_SAMPLERS)}）")
+            dtype = np.dtype(precision)
+            if sampler == 'adaptive':
+                if streaming:
+                    raise ValueError("自适应重要性采样不支持流式模式")
+                streaming = False
+            if streaming is None:
+                streaming = iterations > MC_STREAMING_THRESHOLD
+            requested_iterations = iterations
+            iterations = balanced_iterations(sampler, iterations, streaming, max_iterations)
             
             # 获取特征信息
             feature_importance = model['feature_importance']
-            n_components = len(feature_importance)
+            names = [feature['feature'] for feature in feature_importance]
             
             # 如果没有提供成分范围，使用默认范围
             if component_ranges is None:
-                component_ranges = {}
-                for feature in feature_importance:
-                    component_ranges[feature['feature']] = [0.0, 1.0]
-            
-            # 生成随机样本
-            valid_samples = []
-            all_samples = []
-            
-            for i in range(iterations):
-                # 生成随机配比
-                sample = {}
-                for feature in feature_importance:
-                    feature_name = feature['feature']
-                    if feature_name in component_ranges:
-                        min_val, max_val = component_ranges[feature_name]
-                        sample[feature_name] = np.random.uniform(min_val, max_val)
-                    else:
-                        sample[feature_name] = np.random.uniform(0.0, 1.0)
-                
-                # 计算预测药效（模拟）
-                predicted_efficacy = self._predict_efficacy(sample, model)
-                
-                # 检查是否在目标范围内
-                if abs(predicted_efficacy - target_efficacy) <= tolerance:
-                    valid_samples.append({
-                        'sample': sample,
-                        'predicted_efficacy': predicted_efficacy
-                    })
-                
-                all_samples.append({
-                    'sample': sample,
-                    'predicted_efficacy': predicted_efficacy
-                })
-            
-            # 计算统计信息
-            valid_count = len(valid_samples)
-            valid_rate = valid_count / iterations
-            
-            # 计算各成分的分布统计
-            component_stats = self._calculate_component_statistics(valid_samples, feature_importance)
-            
-            # 生成分布数据
-            distribution_data = self._generate_distribution_data(all_samples)
+                component_ranges = {name: [0.0, 1.0] for name in names}
+            low = np.array([component_ranges.get(name, [0.0, 1.0])[0] for name in names], dtype=np.float64)
+            high = np.array([component_ranges.get(name, [0.0, 1.0])[1] for name in names], dtype=np.float64)
+            compiled = self._compile(model, model_id)
+            efficacy_range = histogram_range(compiled, names, low, high, seed, target_efficacy, tolerance, dtype)
+            
+            if streaming:
+                summary = self._streaming_summary(compiled, names, low, high, iterations, seed,
+                                                  target_efficacy, tolerance, dtype, workers, sampler,
+                                                  efficacy_range)
+            elif sampler == 'adaptive':
+                summary = self._adaptive_summary(compiled, names, low, high, iterations, seed,
+                                                 target_efficacy, tolerance, dtype, efficacy_range)
+            else:
+                summary = self._batch_summary(compiled, names, low, high, iterations, seed,
+                                              target_efficacy, tolerance, dtype, sampler, efficacy_range)
+            valid_count = summary['valid_samples_count']
+            valid_rate = summary.get('valid_rate', valid_count / iterations)
             
             result = {
                 'analysis_id': f"mc_{int(time.time())}",
-                'model_id': model.get('model_id'),
+                'model_id': model_id or model.get('model_id'),
                 'target_efficacy': target_efficacy,
                 'tolerance': tolerance,
                 'iterations': iterations,
+                'requested_iterations': requested_iterations,
+                'sampler': sampler,
+                'seed': seed,
+                'precision': precision,
+                'streaming': bool(streaming),
                 'valid_samples_count': valid_count,
                 'valid_rate': valid_rate,
-                'component_statistics': component_stats,
-                'distribution_data': distribution_data,
-                'sample_data': {
-                    'valid_samples': valid_samples[:100],  # 只保存前100个有效样本
-                    'all_samples_summary': {
-                        'min_efficacy': min(s['predicted_efficacy'] for s in all_samples),
-                        'max_efficacy': max(s['predicted_efficacy'] for s in all_samples),
-                        'mean_efficacy': np.mean([s['predicted_efficacy'] for s in all_samples]),
-                        'std_efficacy': np.std([s['predicted_efficacy'] for s in all_samples])
-                    }
-                },
+                **{key: value for key, value in summary.items() if key not in ('valid_samples_count', 'valid_rate')},
+                'elapsed': round(time.time() - start_time, 4),
                 'timestamp': time.time()
             }
             
@@ -151,94 +345,258 @@ class MonteCarloAnalysis:
             logger.error(f"蒙特卡洛采样模拟执行失败: {str(e)}")
             raise
     
-    def _predict_efficacy(self, sample: Dict[str, float], model: Dict[str, Any]) -> float:
-        """预测药效值（模拟实现）"""
+    def _batch_summary(self, compiled: CompiledExpression, names: List[str], low: np.ndarray,
+                       high: np.ndarray, iterations: int, seed: Any, target_efficacy: float,
+                       tolerance: float, dtype=np.float64, sampler: str = 'uniform',
+                       efficacy_range: Tuple[float, float] = MC_HISTOGRAM_RANGE) -> Dict[str, Any]:
+        """整批模式：物化全部样本与药效，统计量精确"""
+        samples = np.empty((iterations, len(names)), dtype=dtype)
+        if sampler == 'uniform':
+            # 生成随机样本：按块使用独立的子随机数流（不使用全局随机状态）
+            for block_index, start in enumerate(range(0, iterations, MC_CHUNK_SIZE)):
+                rows = min(MC_CHUNK_SIZE, iterations - start)
+                samples[start:start + rows] = draw_block(low, high, seed, block_index, rows)
+        else:
+            samples[:] = low + qmc_points(sampler, len(names), seed, 0, iterations) * (high - low)
+        
+        # 一次求值全部样本的预测药效
+        efficacies = predict_block(compiled, names, samples, dtype)
+        
+        # 检查是否在目标范围内（非有限预测视为无效）
+        with np.errstate(invalid='ignore'):
+            valid = np.abs(efficacies - target_efficacy) <= tolerance
+        valid_index = np.flatnonzero(valid)
+        distribution = self._generate_distribution_data(efficacies, efficacy_range)
+        statistics = distribution['statistics']
+        
+        return {
+            'valid_samples_count': int(len(valid_index)),
+            'workers': 1,
+            # 计算各成分的分布统计
+            'component_statistics': self._calculate_component_statistics(samples[valid_index], names),
+            # 生成分布数据
+            'distribution_data': distribution,
+            'sample_data': {
+                'valid_samples': self._sample_records(samples, efficacies, valid_index[:MC_FIRST_VALID], names),  # 只保存前100个有效样本
+                'top_samples': self._sample_records(
+                    samples, efficacies, self._closest_to_target(efficacies, target_efficacy, MC_TOP_SAMPLES), names),
+                'all_samples_summary': {
+                    'min_efficacy': statistics['min'],
+                    'max_efficacy': statistics['max'],
+                    'mean_efficacy': statistics['mean'],
+                    'std_efficacy': statistics['std']
+                }
+            }
+        }
+    
+    def _adaptive_summary(self, compiled: CompiledExpression, names: List[str], low: np.ndarray,
+                          high: np.ndarray, iterations: int, seed: Any, target_efficacy: float,
+                          tolerance: float, dtype=np.float64,
+                          efficacy_range: Tuple[float, float] = MC_HISTOGRAM_RANGE) -> Dict[str, Any]:
+        """自适应重要性采样：有效率为加权无偏估计，成分统计与药效分布按重要性权重加权"""
+        width = high - low
+        
+        def evaluate(units: np.ndarray) -> np.ndarray:
+            return predict_block(compiled, names, (low + units * width).astype(dtype), dtype)
+        
+        # 模型未用到的成分不影响药效，保持均匀分布
+        used = {compiled.features[column] for column in compiled.used_columns}
+        run = cross_entropy_sampling(evaluate, len(names), iterations, seed, target_efficacy, tolerance,
+                                     active=np.array([name in used for name in names]))
+        samples = low + run['units'] * width
+        efficacies = run['efficacies']
+        weights = run['weights']
+        with np.errstate(invalid='ignore'):
+            valid = np.abs(efficacies - target_efficacy) <= tolerance
+        valid_index = np.flatnonzero(valid)
+        diagnostics = importance_diagnostics(weights, valid)
+        
+        finite = np.isfinite(efficacies)
+        statistics = weighted_statistics(efficacies[finite], weights[finite])
+        # 加权直方图：名义（均匀）采样下各分箱的期望样本数，范围外的也按权重计
+        hist, bins = np.histogram(efficacies[finite], bins=MC_HISTOGRAM_BINS, range=efficacy_range,
+                                  weights=weights[finite])
+        finite_weights = weights[finite]
+        return {
+            'valid_samples_count': int(len(valid_index)),
+            'valid_rate': diagnostics.pop('valid_rate'),
+            'workers': 1,
+            'component_statistics': {
+                name: weighted_statistics(samples[valid_index, j], weights[valid_index])
+                for j, name in enumerate(names)
+            },
+            'distribution_data': {
+                'histogram': {
+                    'counts': hist.tolist(),
+                    'bins': bins.tolist(),
+                    'underflow': float(np.sum(finite_weights[efficacies[finite] < efficacy_range[0]])),
+                    'overflow': float(np.sum(finite_weights[efficacies[finite] > efficacy_range[1]]))
+                },
+                'statistics': {key: statistics[key] for key in ('min', 'max', 'mean', 'std', 'median')},
+                'nonfinite_count': int(len(efficacies) - np.count_nonzero(finite))
+            },
+            'sample_data': {
+                'valid_samples': self._sample_records(samples, efficacies, valid_index[:MC_FIRST_VALID], names),
+                'top_samples': self._sample_records(
+                    samples, efficacies, self._closest_to_target(efficacies, target_efficacy, MC_TOP_SAMPLES), names),
+                'all_samples_summary': {
+                    'min_efficacy': statistics['min'],
+                    'max_efficacy': statistics['max'],
+                    'mean_efficacy': statistics['mean'],
+                    'std_efficacy': statistics['std']
+                }
+            },
+            'importance_sampling': dict(
+                diagnostics,
+                stages=run['stages'],
+                selected_stage=run['selected_stage'],
+                proposal={name: {'alpha': float(run['alpha'][j]), 'beta': float(run['beta'][j])}
+                          for j, name in enumerate(names)}
+            )
+        }
+    
+    def _streaming_summary(self, compiled: CompiledExpression, names: List[str], low: np.ndarray,
+                           high: np.ndarray, iterations: int, seed: Any, target_efficacy: float,
+                           tolerance: float, dtype=np.float64, workers: int = 1,
+                           sampler: str = 'uniform',
+                           efficacy_range: Tuple[float, float] = MC_HISTOGRAM_RANGE) -> Dict[str, Any]:
+        """流式模式：各段从零累积在线聚合量（可在进程池中并行），再按段序合并"""
+        segments = range(-(-iterations // segment_size(sampler)))
+        workers = max(1, min(int(workers), len(segments)))
+        aggregate = new_aggregate(len(names), target_efficacy, tolerance, efficacy_range)
+        if workers > 1:
+            logger.info(f"流式蒙特卡洛: {len(segments)} 段，{workers} 个进程")
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_segment_worker,
+                                     initargs=(compiled, names, low, high, seed, iterations,
+                                               target_efficacy, tolerance, dtype, sampler,
+                                               efficacy_range)) as pool:
+                # map 按提交顺序返回，合并顺序固定为段序
+                for part in pool.map(_segment_task, segments):
+                    aggregate.merge(part)
+        else:
+            for segment in segments:
+                aggregate.merge(simulate_segment(compiled, names, low, high, seed, segment, iterations,
+                                                 target_efficacy, tolerance, dtype, sampler, efficacy_range))
+        return dict(self._aggregate_summary(aggregate, names), workers=workers)
+    
+    @staticmethod
+    def _aggregate_summary(aggregate: MonteCarloAggregate, names: List[str]) -> Dict[str, Any]:
+        """把在线聚合量整理为与整批模式相同的结果字段"""
+        histogram = aggregate.efficacy_histogram
+        statistics = aggregate.efficacy_statistics()
+        return {
+            'valid_samples_count': aggregate.valid_count,
+            'component_statistics': aggregate.component_statistics(names),
+            'distribution_data': {
+                'histogram': {
+                    'counts': histogram.counts.tolist(),
+                    'bins': histogram.edges.tolist(),
+                    'underflow': histogram.underflow,
+                    'overflow': histogram.overflow
+                },
+                'statistics': statistics,
+                'nonfinite_count': aggregate.nonfinite_count,
+                'quantile_relative_accuracy': aggregate.efficacy_sketch.relative_accuracy
+            },
+            'sample_data': {
+                'valid_samples': aggregate.records(aggregate.first_valid.rows, aggregate.first_valid.values, names),
+                'top_samples': aggregate.records(aggregate.top.rows, aggregate.top.values, names),
+                'all_samples_summary': {
+                    'min_efficacy': statistics['min'],
+                    'max_efficacy': statistics['max'],
+                    'mean_efficacy': statistics['mean'],
+                    'std_efficacy': statistics['std']
+                }
+            }
+        }
+    
+    @staticmethod
+    def _compile(model: Dict[str, Any], model_id: Optional[str] = None) -> CompiledExpression:
+        """模型的编译表达式（按模型ID与内容缓存）"""
         try:
-            # 这里应该使用真实的模型进行预测
-            # 目前使用简单的线性组合作为示例
-            
-            feature_importance = model['feature_importance']
-            total_contribution = 0.0
-            total_weight = 0.0
-            
-            for feature in feature_importance:
-                feature_name = feature['feature']
-                importance = feature['importance']
-                
-                if feature_name in sample:
-                    contribution = sample[feature_name] * importance
-                    total_contribution += contribution
-                    total_weight += importance
-            
-            # 归一化
-            if total_weight > 0:
-                predicted = total_contribution / total_weight
-            else:
-                predicted = 0.0
-            
-            # 添加一些随机噪声
-            noise = np.random.normal(0, 0.05)
-            predicted += noise
-            
-            return max(0.0, min(1.0, predicted))  # 限制在[0,1]范围内
+            return expression_cache.get(model_id or model.get('model_id', ''), model)
             
         except Exception as e:
             logger.error(f"药效预测失败: {str(e)}")
-            return 0.0
+            raise
+    
+    @staticmethod
+    def _closest_to_target(efficacies: np.ndarray, target_efficacy: float, k: int) -> np.ndarray:
+        """预测药效最接近目标值的 k 个样本下标（按距离升序，非有限预测排除在外）"""
+        distance = np.abs(efficacies.astype(np.float64) - target_efficacy)
+        finite = np.flatnonzero(np.isfinite(distance))
+        if len(finite) > k:
+            finite = finite[np.argpartition(distance[finite], k - 1)[:k]]
+        return finite[np.lexsort((finite, distance[finite]))]
     
-    def _calculate_component_statistics(self, valid_samples: List[Dict], 
-                                      feature_importance: List[Dict]) -> Dict[str, Dict]:
-        """计算各成分的统计信息"""
+    @staticmethod
+    def _sample_records(samples: np.ndarray, efficacies: np.ndarray, index: np.ndarray,
+                        names: List[str]) -> List[Dict[str, Any]]:
+        """把选中的样本行整理为 {'sample': {成分: 数值}, 'predicted_efficacy'} 列表"""
+        return [
+            {
+                'sample': {name: float(value) for name, value in zip(names, samples[i])},
+                'predicted_efficacy': float(efficacies[i])
+            }
+            for i in index
+        ]
+    
+    def _calculate_component_statistics(self, valid_samples: np.ndarray,
+                                      names: List[str]) -> Dict[str, Dict]:
+        """计算各成分的统计信息（valid_samples 为有效样本矩阵，各列统计一次完成）"""
         try:
-            component_stats = {}
-            
-            for feature in feature_importance:
-                feature_name = feature['feature']
-                values = [sample['sample'][feature_name] for sample in valid_samples]
-                
-                if values:
-                    component_stats[feature_name] = {
-                        'min': float(np.min(values)),
-                        'max': float(np.max(values)),
-                        'mean': float(np.mean(values)),
-                        'std': float(np.std(values)),
-                        'median': float(np.median(values)),
-                        'q25': float(np.percentile(values, 25)),
-                        'q75': float(np.percentile(values, 75))
-                    }
-                else:
-                    component_stats[feature_name] = {
-                        'min': 0.0, 'max': 0.0, 'mean': 0.0, 'std': 0.0,
-                        'median': 0.0, 'q25': 0.0, 'q75': 0.0
-                    }
-            
-            return component_stats
+            if len(valid_samples) == 0:
+                return {
+                    name: {'min': 0.0, 'max': 0.0, 'mean': 0.0, 'std': 0.0,
+                           'median': 0.0, 'q25': 0.0, 'q75': 0.0}
+                    for name in names
+                }
+            values = valid_samples.astype(np.float64, copy=False)
+            q25, median, q75 = np.percentile(values, [25, 50, 75], axis=0)
+            columns = {
+                'min': np.min(values, axis=0),
+                'max': np.max(values, axis=0),
+                'mean': np.mean(values, axis=0),
+                'std': np.std(values, axis=0),
+                'median': median,
+                'q25': q25,
+                'q75': q75
+            }
+            return {name: {key: float(column[i]) for key, column in columns.items()}
+                    for i, name in enumerate(names)}
             
         except Exception as e:
             logger.error(f"计算成分统计信息失败: {str(e)}")
             return {}
     
-    def _generate_distribution_data(self, all_samples: List[Dict]) -> Dict[str, Any]:
-        """生成分布数据"""
+    def _generate_distribution_data(self, efficacies: np.ndarray,
+                                    efficacy_range: Tuple[float, float] = MC_HISTOGRAM_RANGE) -> Dict[str, Any]:
+        """生成分布数据：直方图与汇总统计（只取有限预测，分箱规则与流式模式的 FixedHistogram 相同，不保留逐样本药效）"""
         try:
-            efficacies = [sample['predicted_efficacy'] for sample in all_samples]
-            
+            finite = efficacies[np.isfinite(efficacies)].astype(np.float64)
             # 创建直方图数据
-            hist, bins = np.histogram(efficacies, bins=50, range=(0, 1))
+            histogram = FixedHistogram(MC_HISTOGRAM_BINS, *efficacy_range)
+            histogram.update(finite)
+            if len(finite) == 0:
+                statistics = {'min': 0.0, 'max': 0.0, 'mean': 0.0, 'std': 0.0, 'median': 0.0}
+            else:
+                statistics = {
+                    'min': float(np.min(finite)),
+                    'max': float(np.max(finite)),
+                    'mean': float(np.mean(finite)),
+                    'std': float(np.std(finite)),
+                    'median': float(np.median(finite))
+                }
             
             return {
-                'efficacies': efficacies,
                 'histogram': {
-                    'counts': hist.tolist(),
-                    'bins': bins.tolist()
+                    'counts': histogram.counts.tolist(),
+                    'bins': histogram.edges.tolist(),
+                    'underflow': histogram.underflow,
+                    'overflow': histogram.overflow
                 },
-                'statistics': {
-                    'min': float(np.min(efficacies)),
-                    'max': float(np.max(efficacies)),
-                    'mean': float(np.mean(efficacies)),
-                    'std': float(np.std(efficacies)),
-                    'median': float(np.median(efficacies))
-                }
+                'statistics': statistics,
+                'nonfinite_count': int(len(efficacies) - len(finite))
             }
             
         except Exception as e:
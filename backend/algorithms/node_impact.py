@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+节点影响力（子树消融）
+
+依次把每个子树替换为其在训练集上的均值（或指定常数），以归一化 MSE（MSE / Var(y)）的增加量
+作为该节点的影响力。全部消融一次批量完成：消融矩阵每行对应一个被替换的节点，
+从被替换节点开始逐层向根传播，每一层对所有尚未到达根的消融做一次按运算符分组的数组运算，
+兄弟子树直接取已缓存的节点输出，不重新求值任何未受影响的子树。
+特征重要性由同一组影响力按变量叶子汇总，因此 feature_importance 与 impact_tree 始终一致。
+"""
+
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+from .gp_engine import OP_CONST, OP_VAR, OP_ADD, OP_SUB, OP_MUL, OP_DIV
+
+# 消融传播时按行分块，限制 (节点 × 行) 矩阵的内存
+DEFAULT_IMPACT_CHUNK_ROWS = 4096
+
+_FUNCS = ((OP_ADD, np.add), (OP_SUB, np.subtract), (OP_MUL, np.multiply), (OP_DIV, np.divide))
+
+
+def program_structure(ops: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """后缀程序各节点的父节点位置（根为 -1）与所在的子节点侧（0 左 / 1 右）"""
+    parent = np.full(len(ops), -1, dtype=np.int64)
+    side = np.zeros(len(ops), dtype=np.int64)
+    stack: List[int] = []
+    for pos, op in enumerate(ops):
+        if op >= OP_ADD:
+            right = stack.pop()
+            left = stack.pop()
+            parent[[left, right]] = pos
+            side[right] = 1
+        stack.append(pos)
+    return parent, side
+
+
+def node_outputs(ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                 XT: np.ndarray) -> np.ndarray:
+    """后缀程序每个节点（子树）的输出 (节点 × 样本)"""
+    outputs = np.empty((len(ops), XT.shape[1]))
+    stack: List[int] = []
+    funcs = dict(_FUNCS)
+    with np.errstate(all='ignore'):
+        for pos, (op, arg, const) in enumerate(zip(ops, args, consts)):
+            if op == OP_VAR:
+                np.multiply(XT[arg], const, out=outputs[pos])
+            elif op == OP_CONST:
+                outputs[pos] = const
+            else:
+                right = stack.pop()
+                left = stack.pop()
+                funcs[int(op)](outputs[left], outputs[right], out=outputs[pos])
+            stack.append(pos)
+    return outputs
+
+
+def ablation_impacts(outputs: Sequence[np.ndarray], ops: np.ndarray, y: np.ndarray,
+                     replacement: Optional[float] = None,
+                     chunk_rows: int = DEFAULT_IMPACT_CHUNK_ROWS) -> np.ndarray:
+    """
+    所有节点的消融影响力（按后缀位置）
+
+    Args:
+        outputs: 各节点在样本上的输出（按后缀位置，可为二维数组或一维数组序列，复用已缓存的输出）
+        ops: 后缀程序操作码
+        y: 目标值
+        replacement: 替换值；None 时用各子树输出的均值
+    """
+    ops = np.asarray(ops)
+    n_nodes, n_rows = len(ops), len(y)
+    impacts = np.zeros(n_nodes)
+    if n_nodes == 0 or n_rows == 0:
+        return impacts
+    parent, side = program_structure(ops)
+    root = n_nodes - 1
+    sibling = np.full(n_nodes, -1, dtype=np.int64)
+    stack: List[int] = []
+    for pos, op in enumerate(ops):
+        if op >= OP_ADD:
+            right = stack.pop()
+            left = stack.pop()
+            sibling[left], sibling[right] = right, left
+        stack.append(pos)
+
+    # 传播计划：每一步仍未到达根的消融（紧凑排列，逐步缩小）、其兄弟节点、
+    # 按父节点运算符与所在侧的分组，以及本步之后到达根而退出的消融
+    plan = []
+    ids = np.flatnonzero(parent >= 0)
+    current = ids.copy()
+    while len(ids):
+        parent_ops = ops[parent[current]]
+        groups = []
+        for code, func in _FUNCS:
+            for flag in (0, 1):
+                rows = np.flatnonzero((parent_ops == code) & (side[current] == flag))
+                if len(rows):
+                    groups.append((func, rows, flag))
+        siblings = sibling[current]
+        current = parent[current]
+        finished = current == root
+        plan.append((ids, siblings, groups, finished))
+        ids, current = ids[~finished], current[~finished]
+
+    with np.errstate(all='ignore'):
+        if replacement is None:
+            fill = np.array([np.mean(output) for output in outputs], dtype=np.float64)
+        else:
+            fill = np.full(n_nodes, float(replacement))
+        squared = np.zeros(n_nodes)
+        for start in range(0, n_rows, int(chunk_rows)):
+            stop = min(start + int(chunk_rows), n_rows)
+            cached = np.stack([np.broadcast_to(output[start:stop], (stop - start,)) for output in outputs])
+            target = y[start:stop]
+            # 根节点自身的消融即整体替换为常数；其余消融从被替换节点开始逐层上推
+            squared[root] += np.sum((fill[root] - target) ** 2)
+            squared[root] -= np.sum((cached[root] - target) ** 2)
+            if plan:
+                z = np.repeat(fill[plan[0][0], None], stop - start, axis=1)
+            for ids, siblings, groups, finished in plan:
+                s = cached[siblings]
+                result = np.empty_like(z)
+                for func, rows, flag in groups:
+                    if flag == 0:
+                        result[rows] = func(z[rows], s[rows])
+                    else:
+                        result[rows] = func(s[rows], z[rows])
+                if finished.any():
+                    squared[ids[finished]] += np.sum((result[finished] - target) ** 2, axis=1)
+                z = result[~finished]
+            base = np.sum((cached[root] - target) ** 2)
+            squared[np.arange(n_nodes) != root] -= base
+        variance = float(np.var(y)) or 1.0
+        impacts = squared / n_rows / variance
+    impacts[~np.isfinite(impacts)] = 0.0
+    return impacts
+
+
+def feature_totals(ops: np.ndarray, args: np.ndarray, impacts: np.ndarray,
+                   n_features: int) -> np.ndarray:
+    """按特征汇总变量叶子的影响力（未出现在表达式中的特征为 0）"""
+    is_var = np.asarray(ops) == OP_VAR
+    return np.bincount(np.asarray(args)[is_var].astype(np.int64), weights=impacts[is_var],
+                       minlength=n_features)
+
+
+def program_impacts(ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                    XT: np.ndarray, y: np.ndarray,
+                    replacement: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    后缀程序的节点影响力与特征汇总
+
+    Returns:
+        (各节点影响力（按后缀位置）, 各特征的影响力之和)
+    """
+    impacts = ablation_impacts(node_outputs(ops, args, consts, XT), ops, y, replacement)
+    return impacts, feature_totals(ops, args, impacts, XT.shape[0])
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多进程并行适应度评估
+
+训练数据在每次运行开始时放入 multiprocessing.shared_memory，
+工作进程在初始化时按名称挂载为 NumPy 视图，评估任务只传递程序矩阵，
+不再重复序列化特征矩阵与目标变量。
+交叉验证与超参数搜索的进程池也通过 dataset_pool 共享同一份数据集。
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, Any, Iterator, Optional, Tuple
+from loguru import logger
+
+from .gp_engine import Population
+from .gp_evaluator import BatchEvaluator
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """解析工作进程数：None 或 1 为单进程，<= 0 表示使用全部 CPU 核心"""
+    cpu_count = os.cpu_count() or 1
+    if workers is None:
+        return 1
+    workers = int(workers)
+    if workers <= 0:
+        return cpu_count
+    return min(workers, cpu_count)
+
+
+class SharedArray:
+    """基于共享内存的只读 NumPy 数组"""
+
+    def __init__(self, array: np.ndarray):
+        array = np.ascontiguousarray(array)
+        self.shape = array.shape
+        self.dtype = array.dtype.str
+        self._shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(self.shape, dtype=array.dtype, buffer=self._shm.buf)[...] = array
+
+    def descriptor(self) -> Tuple[str, Tuple[int, ...], str]:
+        """工作进程挂载所需的信息（名称、形状、类型）"""
+        return self._shm.name, self.shape, self.dtype
+
+    @staticmethod
+    def attach(descriptor: Tuple[str, Tuple[int, ...], str]) -> Tuple[np.ndarray, shared_memory.SharedMemory]:
+        """在工作进程中挂载共享数组（返回的 SharedMemory 需保持引用）"""
+        name, shape, dtype = descriptor
+        shm = shared_memory.SharedMemory(name=name)
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf), shm
+
+    def release(self):
+        """关闭并删除共享内存块"""
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def attach_shared_arrays(state: Dict[str, Any], **descriptors):
+    """在工作进程中按关键字挂载共享数组到 state，SharedMemory 引用保存在 state['handles']"""
+    handles = []
+    for key, descriptor in descriptors.items():
+        state[key], shm = SharedArray.attach(descriptor)
+        handles.append(shm)
+    state['handles'] = tuple(handles)
+
+
+# 工作进程内的全局状态
+_worker_state: Dict[str, Any] = {}
+# dataset_pool 工作进程内挂载的数据集（X、y）
+dataset_state: Dict[str, Any] = {}
+
+
+def _init_worker(xt_descriptor, y_descriptor, linear_scaling: bool = False):
+    """工作进程初始化：挂载共享训练数据并构建求值器"""
+    attach_shared_arrays(_worker_state, XT=xt_descriptor, y=y_descriptor)
+    XT = _worker_state['XT']
+    # XT.T 的转置即共享内存本身（求值精度与共享数组一致），BatchEvaluator 不会再复制
+    _worker_state['evaluator'] = BatchEvaluator(XT.T, _worker_state['y'],
+                                                linear_scaling=linear_scaling, dtype=XT.dtype)
+
+
+def _init_dataset_worker(x_descriptor, y_descriptor):
+    """工作进程初始化：挂载共享数据集"""
+    attach_shared_arrays(dataset_state, X=x_descriptor, y=y_descriptor)
+
+
+@contextmanager
+def dataset_pool(X: np.ndarray, y: np.ndarray, workers: int) -> Iterator[ProcessPoolExecutor]:
+    """
+    进程池上下文：X、y 放入共享内存，各工作进程初始化时挂载到 dataset_state，
+    任务只需传递行下标与参数；退出时关闭进程池并释放共享内存
+    """
+    shared = [SharedArray(X), SharedArray(y)]
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_dataset_worker,
+                                 initargs=tuple(array.descriptor() for array in shared)) as pool:
+            yield pool
+    finally:
+        for array in shared:
+            array.release()
+
+
+def _evaluate_chunk(ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                    return_predictions: bool) -> Tuple[Optional[np.ndarray], np.ndarray]:
+    """在工作进程中评估一块个体"""
+    evaluator = _worker_state['evaluator']
+    predictions = evaluator.predict(ops, args, consts)
+    errors = evaluator.errors(predictions)
+    return (predictions if return_predictions else None), errors
+
+
+class ParallelEvaluator:
+    """将整代种群按个体分块，分发到进程池评估"""
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, workers: int, linear_scaling: bool = False,
+                 dtype=np.float64):
+        self.workers = max(1, int(workers))
+        self.linear_scaling = bool(linear_scaling)
+        self._XT = SharedArray(np.asarray(X, dtype=dtype).T)
+        self._y = SharedArray(np.asarray(y, dtype=dtype))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.n_samples = self._XT.shape[1]
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self._XT.descriptor(), self._y.descriptor(), self.linear_scaling),
+            )
+            logger.info(f"并行适应度评估进程池已启动，工作进程数: {self.workers}")
+        return self._pool
+
+    def evaluate(self, population: Population,
+                 return_predictions: bool = True) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """并行求值整代种群，返回 (预测矩阵或 None, 逐个体 MSE)"""
+        pool = self._ensure_pool()
+        bounds = np.linspace(0, len(population), min(self.workers, len(population)) + 1).astype(int)
+        futures = [
+            pool.submit(_evaluate_chunk, population.ops[start:stop], population.args[start:stop],
+                        population.consts[start:stop], return_predictions)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        parts = [future.result() for future in futures]
+        errors = np.concatenate([part[1] for part in parts])
+        predictions = np.concatenate([part[0] for part in parts]) if return_predictions else None
+        return predictions, errors
+
+    def close(self):
+        """关闭进程池并释放共享内存"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self._XT.release()
+        self._y.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
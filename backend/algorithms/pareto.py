@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多目标（Pareto）选择
+
+非支配排序采用 ENS-BS（Efficient Non-dominated Sort with Binary Search）：
+个体先按各目标字典序排序，之后每个个体只可能被排在它前面的个体支配，
+按顺序用二分查找确定它所属的前沿，总复杂度 O(MN log N)。
+两目标时前沿内个体第二目标单调不增，只需与前沿中最后加入的个体比较。
+同一前沿内按 NSGA-II 拥挤距离保持多样性。所有目标均为越小越好。
+"""
+
+import numpy as np
+from typing import List
+
+
+def non_dominated_sort(objectives: np.ndarray) -> np.ndarray:
+    """
+    非支配排序
+
+    Args:
+        objectives: 目标矩阵 (个体 × 目标)，NaN 视为 +inf
+
+    Returns:
+        每个个体所在前沿的编号（0 为 Pareto 最优前沿）
+    """
+    F = np.where(np.isnan(objectives), np.inf, np.asarray(objectives, dtype=np.float64))
+    n, m = F.shape
+    ranks = np.empty(n, dtype=np.int64)
+    if n == 0:
+        return ranks
+    order = np.lexsort(F.T[::-1])
+    fronts: List[List[int]] = []
+
+    def dominated(p: int, front: List[int]) -> bool:
+        # 字典序在前的个体各目标不大于 p 即支配 p（目标完全相同的个体互不支配）
+        if m == 2:
+            q = F[front[-1]]
+            return bool(q[1] <= F[p, 1] and not np.array_equal(q, F[p]))
+        members = F[front[::-1]]
+        return bool(np.any(np.all(members <= F[p], axis=1) & np.any(members < F[p], axis=1)))
+
+    for p in order:
+        low, high = 0, len(fronts)
+        while low < high:
+            mid = (low + high) // 2
+            if dominated(p, fronts[mid]):
+                low = mid + 1
+            else:
+                high = mid
+        if low == len(fronts):
+            fronts.append([])
+        fronts[low].append(int(p))
+        ranks[p] = low
+    return ranks
+
+
+def crowding_distance(objectives: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """各前沿内的 NSGA-II 拥挤距离（边界个体为 +inf）"""
+    F = np.where(np.isfinite(objectives), objectives, np.finfo(np.float64).max)
+    distance = np.zeros(len(F))
+    for rank in np.unique(ranks):
+        members = np.flatnonzero(ranks == rank)
+        if len(members) <= 2:
+            distance[members] = np.inf
+            continue
+        for column in F[members].T:
+            order = np.argsort(column, kind='stable')
+            sorted_values = column[order]
+            span = sorted_values[-1] - sorted_values[0]
+            distance[members[order[[0, -1]]]] = np.inf
+            if span > 0 and np.isfinite(span):
+                distance[members[order[1:-1]]] += (sorted_values[2:] - sorted_values[:-2]) / span
+    return distance
+
+
+def selection_scores(objectives: np.ndarray) -> np.ndarray:
+    """
+    锦标赛选择用的标量得分（越小越好）：先比较前沿编号，同一前沿内拥挤距离越大越好
+
+    得分 = 前沿编号 + 0.5 × (1 − d / (1 + d))，落在 [前沿编号, 前沿编号 + 0.5] 内
+    """
+    ranks = non_dominated_sort(objectives)
+    distance = crowding_distance(objectives, ranks)
+    with np.errstate(invalid='ignore'):
+        spread = np.where(np.isinf(distance), 1.0, distance / (1.0 + distance))
+    return ranks + 0.5 * (1.0 - spread)
+
+
+def select_survivors(objectives: np.ndarray, k: int) -> np.ndarray:
+    """
+    NSGA-II 环境选择：按前沿依次保留，最后一个前沿按拥挤距离截断，返回保留个体下标
+
+    目标向量重复的个体（除首个外）排在所有不重复个体之后，避免种群被同一个
+    小而准的个体（如常数）的副本占满而使前沿塌缩
+    """
+    F = np.where(np.isnan(objectives), np.inf, objectives)
+    _, first = np.unique(F, axis=0, return_index=True)
+    duplicate = np.ones(len(F), dtype=bool)
+    duplicate[first] = False
+    ranks = non_dominated_sort(F)
+    distance = crowding_distance(F, ranks)
+    order = np.lexsort((-distance, ranks, duplicate))
+    return np.sort(order[:k])
+
+
+def pareto_front(objectives: np.ndarray) -> np.ndarray:
+    """
+    Pareto 最优前沿成员下标：目标向量相同的个体只保留第一个，按第二个目标（复杂度）升序排列
+    """
+    F = np.where(np.isnan(objectives), np.inf, objectives)
+    members = np.flatnonzero(non_dominated_sort(F) == 0)
+    members = members[np.all(np.isfinite(F[members]), axis=1)]
+    _, first = np.unique(F[members], axis=0, return_index=True)
+    members = members[np.sort(first)]
+    # np.lexsort 以最后一个键为主键：依次按复杂度目标、误差排序
+    priority = list(range(1, F.shape[1])) + [0]
+    return members[np.lexsort(F[members][:, priority[::-1]].T)]
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+置换特征重要性
+
+对表达式中出现的每个特征、每次重复，把该特征列随机置换后的输入副本堆叠为一个大输入，
+经编译后的表达式一次求值，按副本计算归一化 MSE（MSE / Var(y)）相对基线的增加量。
+堆叠输入不整体物化，求值时按行块由置换下标惰性生成；重复数很多时再按重复分批。
+各批重复在线程池中并行
+（求值全部由释放 GIL 的 NumPy ufunc 完成，线程间共享输入数据，无需序列化副本）。
+第 r 次重复的置换只由 (种子, r) 决定，结果与工作线程数无关。
+表达式中未出现的特征置换后预测不变，重要性恒为 0，无需求值。
+"""
+
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy import stats
+from typing import Dict, List, Any
+
+from .expression_compiler import CompiledExpression
+from utils.rng import SeedLike, child_generator, fresh_seed
+
+DEFAULT_PERMUTATION_REPEATS = 30
+DEFAULT_CONFIDENCE = 0.95
+# 单批置换下标的最大元素数（副本 × 行）
+MAX_STACK_ELEMENTS = 1 << 23
+
+
+def _score_repeats(compiled: CompiledExpression, X: np.ndarray, y: np.ndarray,
+                   columns: np.ndarray, repeats: np.ndarray, seed: SeedLike) -> np.ndarray:
+    """
+    一组重复的置换 MSE (特征 × 重复)
+
+    堆叠副本按 (重复, 特征, 行) 排列，不整体物化：求值时按行块由置换下标即时取出各列
+    """
+    n_rows = X.shape[0]
+    k = len(columns)
+    XT = np.ascontiguousarray(X[:, columns].T)
+    mse = np.empty((k, len(repeats)))
+    per_chunk = max(1, MAX_STACK_ELEMENTS // max(k * n_rows, 1))
+    base = np.arange(n_rows)
+    for start in range(0, len(repeats), per_chunk):
+        chunk = repeats[start:start + per_chunk]
+        blocks = len(chunk) * k
+        # 第 b 个副本置换第 b % k 个特征，其行顺序为 permutations[b]
+        permutations = np.concatenate([
+            child_generator(seed, int(r)).permuted(np.broadcast_to(base, (k, n_rows)), axis=1)
+            for r in chunk
+        ])
+
+        def block_columns(lo: int, hi: int) -> List[np.ndarray]:
+            index = np.arange(lo, hi)
+            block, row = np.divmod(index, n_rows)
+            permuted_rows = permutations[block, row]
+            feature = block % k
+            return [XT[p][np.where(feature == p, permuted_rows, row)] for p in range(k)]
+
+        predictions = compiled.evaluate_generated(blocks * n_rows, block_columns).reshape(blocks, n_rows)
+        with np.errstate(all='ignore'):
+            errors = np.mean((predictions - y) ** 2, axis=1)
+        mse[:, start:start + len(chunk)] = errors.reshape(len(chunk), k).T
+    return mse
+
+
+def permutation_importance(compiled: CompiledExpression, X: np.ndarray, y: np.ndarray,
+                           n_repeats: int = DEFAULT_PERMUTATION_REPEATS,
+                           seed: SeedLike = None, workers: int = 1,
+                           confidence: float = DEFAULT_CONFIDENCE) -> Dict[str, Any]:
+    """
+    计算置换特征重要性及其置信区间
+
+    Args:
+        compiled: 编译后的表达式
+        X: (样本 × 特征) 矩阵，列顺序与 compiled.features 一致
+        y: 目标值
+        n_repeats: 每个特征的置换重复次数
+        seed: 随机种子（None 时随机生成并在结果中返回，便于复现）
+        workers: 并行计算重复的线程数
+        confidence: 置信水平（t 分布区间）
+
+    Returns:
+        按重要性降序的 feature_importance（含 std、ci_low、ci_high）及基线误差等信息
+    """
+    start_time = time.time()
+    if n_repeats < 1:
+        raise ValueError("置换重复次数必须不小于 1")
+    if not 0 < confidence < 1:
+        raise ValueError("置信水平必须在 0 与 1 之间")
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if X.ndim != 2 or X.shape[0] != len(y) or X.shape[1] != len(compiled.features):
+        raise ValueError(f"输入矩阵应为 ({len(y)} × {len(compiled.features)})，实际为 {X.shape}")
+    seed = fresh_seed() if seed is None else seed
+    variance = float(np.var(y)) or 1.0
+    with np.errstate(all='ignore'):
+        baseline = float(np.mean((compiled.evaluate(X) - y) ** 2))
+
+    columns = np.asarray(compiled.used_columns, dtype=np.int64)
+    increases = np.zeros((len(compiled.features), n_repeats))
+    if len(columns) and len(y):
+        shards = [shard for shard in np.array_split(np.arange(n_repeats), max(1, int(workers))) if len(shard)]
+        if len(shards) > 1:
+            with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+                parts = list(pool.map(lambda shard: _score_repeats(compiled, X, y, columns, shard, seed),
+                                      shards))
+        else:
+            parts = [_score_repeats(compiled, X, y, columns, shards[0], seed)]
+        increases[columns] = (np.concatenate(parts, axis=1) - baseline) / variance
+    increases[~np.isfinite(increases)] = 0.0
+
+    mean = increases.mean(axis=1)
+    if n_repeats > 1:
+        std = increases.std(axis=1, ddof=1)
+        half_width = stats.t.ppf((1 + confidence) / 2, n_repeats - 1) * std / np.sqrt(n_repeats)
+    else:
+        std = np.zeros(len(mean))
+        half_width = np.zeros(len(mean))
+    feature_importance: List[Dict[str, Any]] = [
+        {
+            'feature': name,
+            'importance': float(mean[i]),
+            'std': float(std[i]),
+            'ci_low': float(mean[i] - half_width[i]),
+            'ci_high': float(mean[i] + half_width[i]),
+        }
+        for i, name in enumerate(compiled.features)
+    ]
+    feature_importance.sort(key=lambda item: item['importance'], reverse=True)
+    return {
+        'feature_importance': feature_importance,
+        'baseline_mse': baseline,
+        'n_repeats': int(n_repeats),
+        'confidence': float(confidence),
+        'seed': seed if isinstance(seed, int) else None,
+        'workers': max(1, int(workers)),
+        'n_samples': int(len(y)),
+        'elapsed': round(time.time() - start_time, 4),
+    }
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小批量 + 连续减半（successive halving）适应度评估
+
+面向 10^5–10^6 行的大数据集：每次评估先在一小批轮转抽样的行上给全部个体打分，
+每一轮只把误差最小的 1/eta 个体晋级到 eta 倍大小的样本上继续评估，
+最后一轮的幸存者才在全部行上做完整评估。
+样本取自训练行的一个固定随机排列，每次评估后窗口前移，逐代轮转覆盖全部数据；
+同一次评估中各轮的样本互相嵌套（小样本是大样本的前缀）。
+
+未晋级个体的误差为其最后一轮的样本估计值，exact 标记为 False；
+在子样本上已出现非有限预测的个体在全量数据上同样非有限，直接记为精确的 +inf。
+"""
+
+import math
+import numpy as np
+from typing import Callable, Dict, Any, Tuple
+
+from .gp_engine import Population
+from .gp_evaluator import BatchEvaluator
+
+# 默认首轮样本行数与每轮淘汰比例
+DEFAULT_RACING_MIN_ROWS = 2048
+DEFAULT_RACING_ETA = 3
+
+
+class SuccessiveHalving:
+    """轮转小批量样本上的连续减半评估"""
+
+    def __init__(self, XT: np.ndarray, y: np.ndarray, rng: np.random.Generator,
+                 min_rows: int = DEFAULT_RACING_MIN_ROWS, eta: int = DEFAULT_RACING_ETA,
+                 linear_scaling: bool = False, dtype=np.float64):
+        if eta < 2:
+            raise ValueError("连续减半的淘汰比例 eta 必须不小于 2")
+        self.XT = XT
+        self.y = y
+        self.n_rows = len(y)
+        self.min_rows = max(1, int(min_rows))
+        self.eta = int(eta)
+        self.linear_scaling = bool(linear_scaling)
+        self.dtype = dtype
+        self.row_order = rng.permutation(self.n_rows)
+        self.offset = 0
+        # 各轮样本大小（均小于总行数），之后为全量评估
+        self.rung_rows = []
+        rows = self.min_rows
+        while rows < self.n_rows:
+            self.rung_rows.append(rows)
+            rows *= self.eta
+        # 实际评估的行数与全部个体都做全量评估时的行数
+        self.row_evaluations = 0
+        self.full_row_evaluations = 0
+
+    def evaluate(self, population: Population,
+                 full_evaluate: Callable[[Population], np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        评估种群，full_evaluate 对晋级到最后的个体做全量评估（可走缓存或进程池求值器）
+
+        Returns:
+            (误差, 是否为全量精确误差的标记)
+        """
+        n = len(population)
+        errors = np.full(n, np.inf)
+        exact = np.zeros(n, dtype=bool)
+        alive = np.arange(n)
+        window = (self.offset + np.arange(self.rung_rows[-1] if self.rung_rows else 0)) % self.n_rows
+        rows = self.row_order[window]
+        for size in self.rung_rows:
+            if not len(alive):
+                break
+            sample = rows[:size]
+            evaluator = BatchEvaluator(self.XT[:, sample].T, self.y[sample],
+                                       linear_scaling=self.linear_scaling, dtype=self.dtype)
+            _, estimates = evaluator.evaluate(population.take(alive), return_predictions=False)
+            self.row_evaluations += len(alive) * size
+            errors[alive] = estimates
+            # 子样本上非有限的个体在全量数据上也非有限，无需继续评估
+            finite = np.isfinite(estimates)
+            exact[alive[~finite]] = True
+            alive, estimates = alive[finite], estimates[finite]
+            keep = math.ceil(len(alive) / self.eta)
+            alive = alive[np.argsort(estimates, kind='stable')[:keep]]
+        if len(alive):
+            errors[alive] = full_evaluate(population.take(alive))
+            exact[alive] = True
+            self.row_evaluations += len(alive) * self.n_rows
+        self.full_row_evaluations += n * self.n_rows
+        self.offset = (self.offset + self.min_rows) % self.n_rows
+        return errors, exact
+
+    def stats(self) -> Dict[str, Any]:
+        """行评估次数统计"""
+        saved = self.full_row_evaluations - self.row_evaluations
+        return {
+            'row_evaluations': int(self.row_evaluations),
+            'full_row_evaluations': int(self.full_row_evaluations),
+            'saved_row_evaluations': int(saved),
+            'saved_ratio': saved / self.full_row_evaluations if self.full_row_evaluations else 0.0,
+        }
+
+    def state(self) -> Dict[str, Any]:
+        """检查点需要保存的轮转位置与计数"""
+        return {'offset': int(self.offset), 'row_evaluations': int(self.row_evaluations),
+                'full_row_evaluations': int(self.full_row_evaluations)}
+
+    def restore(self, state: Dict[str, Any]):
+        self.offset = int(state['offset'])
+        self.row_evaluations = int(state['row_evaluations'])
+        self.full_row_evaluations = int(state['full_row_evaluations'])
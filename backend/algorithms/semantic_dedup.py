@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GP 个体语义去重
+
+只用加减乘除构成的表达式中，大量个体语法不同但语义相同（如 a + b 与 b + a、
+x * 1 与 x）。先在少量探针行上求值，以输出向量作为语义签名对个体分组，
+每组只对一个代表个体做完整评估，其余个体共享其适应度。
+
+签名按 float32 精度比较，以吸收不同运算顺序带来的末位舍入差异；
+探针行在训练集上均匀选取，在连续型数据上两个不同函数在全部探针行上
+输出一致的概率可以忽略。
+"""
+
+import numpy as np
+from typing import Tuple
+
+from .gp_engine import Population
+from .gp_evaluator import BatchEvaluator
+
+# 默认探针行数
+DEFAULT_PROBE_SIZE = 32
+
+
+class SemanticDeduplicator:
+    """基于探针行输出签名的语义去重器"""
+
+    def __init__(self, X: np.ndarray, probe_size: int = DEFAULT_PROBE_SIZE):
+        X = np.asarray(X, dtype=np.float64)
+        n_rows = len(X)
+        probe = np.unique(np.linspace(0, n_rows - 1, min(int(probe_size), n_rows)).astype(int))
+        self.probe_rows = probe
+        self._evaluator = BatchEvaluator(X[probe], np.zeros(len(probe)))
+
+    def signatures(self, population: Population) -> np.ndarray:
+        """探针行上的输出签名矩阵 (个体 × 探针行)，非有限值统一为 NaN"""
+        outputs = self._evaluator.predict(population.ops, population.args, population.consts)
+        outputs = outputs.astype(np.float32)
+        outputs[~np.isfinite(outputs)] = np.nan
+        return outputs.view(np.uint32)
+
+    def groups(self, population: Population) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        按语义签名分组
+
+        Returns:
+            (每组代表个体的下标（按首次出现顺序）, 每个个体所属组的编号)
+        """
+        if len(population) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        _, first, inverse = np.unique(self.signatures(population), axis=0,
+                                      return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        # 按首次出现顺序重新编号，使代表个体与原种群顺序一致
+        order = np.argsort(first, kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return first[order], rank[inverse]
+
+    def duplicates(self, population: Population) -> np.ndarray:
+        """与排在其前面的某个个体语义相同的个体掩码"""
+        representatives, _ = self.groups(population)
+        mask = np.ones(len(population), dtype=bool)
+        mask[representatives] = False
+        return mask
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+子树输出缓存
+
+以规范化结构哈希为键，缓存子树在训练数据上的输出向量，带内存上限与 LRU 淘汰。
+交叉与变异产生的后代大部分子树直接来自父代，命中缓存的子树在批量求值时
+不再执行，只把缓存向量写入对应的栈位置。
+
+结构哈希在整代种群上向量化计算（uint64 混合函数），加法与乘法的两个子节点
+哈希先排序，使交换律等价的子树得到相同的键；另一条独立哈希通道用于校验碰撞。
+"""
+
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
+
+from .gp_engine import Population, OP_CONST, OP_VAR, OP_ADD, OP_MUL, subtree_starts
+from .gp_evaluator import BatchEvaluator, stack_pointers
+
+# 默认缓存内存上限（字节）
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# 准入过滤器记录的键数上限，超出后清空重新计数
+DOORKEEPER_MAX_KEYS = 1 << 20
+# 准入过滤器（两路探测的 Bloom 过滤器）的位数，取 2 的幂
+DOORKEEPER_BITS = 1 << 23
+
+_M1 = np.uint64(0xbf58476d1ce4e5b9)
+_M2 = np.uint64(0x94d049bb133111eb)
+_GOLDEN = np.uint64(0x9e3779b97f4a7c15)
+_LANE_SALTS = (np.uint64(0x243f6a8885a308d3), np.uint64(0x13198a2e03707344))
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 终混函数（uint64 溢出按模 2^64 回绕）"""
+    x = (x ^ (x >> np.uint64(30))) * _M1
+    x = (x ^ (x >> np.uint64(27))) * _M2
+    return x ^ (x >> np.uint64(31))
+
+
+def structural_hashes(ops: np.ndarray, args: np.ndarray,
+                      consts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算每个位置为根的子树的结构哈希（两条独立通道）
+
+    Returns:
+        (主哈希矩阵, 校验哈希矩阵)，形状均为 (个体 × 最大长度)，OP_PAD 位置为 0
+    """
+    n, width = ops.shape
+    sp = stack_pointers(ops)
+    const_bits = np.ascontiguousarray(consts, dtype=np.float64).view(np.uint64)
+    lanes = []
+    with np.errstate(over='ignore'):
+        for salt in _LANE_SALTS:
+            stack = np.zeros((n, width // 2 + 1), dtype=np.uint64)
+            hashes = np.zeros((n, width), dtype=np.uint64)
+            for pos in range(width):
+                op = ops[:, pos]
+                depth = sp[:, pos]
+                leaf = np.flatnonzero((op == OP_VAR) | (op == OP_CONST))
+                if len(leaf):
+                    code = op[leaf].astype(np.uint64) * _GOLDEN + salt
+                    arg = args[leaf, pos].astype(np.uint64)
+                    h = _mix(_mix(code ^ arg) + const_bits[leaf, pos])
+                    stack[leaf, depth[leaf]] = h
+                    hashes[leaf, pos] = h
+                binary = np.flatnonzero(op >= OP_ADD)
+                if len(binary):
+                    top = depth[binary]
+                    left = stack[binary, top - 2]
+                    right = stack[binary, top - 1]
+                    commutative = (op[binary] == OP_ADD) | (op[binary] == OP_MUL)
+                    first = np.where(commutative, np.minimum(left, right), left)
+                    second = np.where(commutative, np.maximum(left, right), right)
+                    code = op[binary].astype(np.uint64) * _GOLDEN + salt
+                    h = _mix(_mix(code ^ first) + second * _M2)
+                    stack[binary, top - 2] = h
+                    hashes[binary, pos] = h
+            lanes.append(hashes)
+    return lanes[0], lanes[1]
+
+
+class SubtreeCache:
+    """
+    带内存上限的 LRU 子树输出缓存
+
+    内存紧张时，子树第一次出现只记入准入过滤器，再次出现才写入缓存，
+    避免只出现一次的子树挤掉被反复继承的子树。
+    准入过滤器为固定大小的 Bloom 过滤器（记满 DOORKEEPER_MAX_KEYS 个键后清空）；
+    contains 使用的有序键数组在写入与淘汰时增量维护，不随缓存大小重建。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._entries: 'OrderedDict[int, Tuple[int, np.ndarray]]' = OrderedDict()
+        self._sorted_keys = np.empty(0, dtype=np.uint64)
+        # 上次 contains 之后写入与淘汰的键
+        self._added: List[int] = []
+        self._evicted: List[int] = []
+        self._seen = np.zeros(DOORKEEPER_BITS, dtype=bool)
+        self._seen_count = 0
+        self.bytes = 0
+        self.hits = 0
+        self.lookups = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _sync_keys(self):
+        """把上次 contains 之后写入与淘汰的键并入有序键数组（二分定位后整段删除 / 插入）"""
+        changed = np.unique(np.array(self._added + self._evicted, dtype=np.uint64))
+        self._added, self._evicted = [], []
+        sorted_keys = self._sorted_keys
+        pos = np.searchsorted(sorted_keys, changed)
+        listed = (pos < len(sorted_keys)) & (sorted_keys[np.minimum(pos, len(sorted_keys) - 1)] == changed
+                                             if len(sorted_keys) else False)
+        cached = np.fromiter((int(key) in self._entries for key in changed), dtype=bool,
+                             count=len(changed))
+        sorted_keys = np.delete(sorted_keys, pos[listed & ~cached])
+        added = changed[cached & ~listed]
+        self._sorted_keys = np.insert(sorted_keys, np.searchsorted(sorted_keys, added), added)
+
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        """向量化判断键是否在缓存中"""
+        if self._added or self._evicted:
+            self._sync_keys()
+        if len(self._sorted_keys) == 0:
+            return np.zeros(keys.shape, dtype=bool)
+        idx = np.searchsorted(self._sorted_keys, keys)
+        idx = np.minimum(idx, len(self._sorted_keys) - 1)
+        return self._sorted_keys[idx] == keys
+
+    def admit(self, keys: np.ndarray, entry_bytes: int) -> np.ndarray:
+        """返回允许写入缓存的键，并把本批键记入准入过滤器"""
+        mask = np.uint64(DOORKEEPER_BITS - 1)
+        first = keys & mask
+        second = (keys >> np.uint64(32)) & mask
+        if self.bytes + len(keys) * entry_bytes <= self.max_bytes:
+            seen = np.ones(len(keys), dtype=bool)
+        else:
+            seen = self._seen[first] & self._seen[second]
+        if self._seen_count + len(keys) > DOORKEEPER_MAX_KEYS:
+            self._seen[:] = False
+            self._seen_count = 0
+        self._seen[first] = True
+        self._seen[second] = True
+        self._seen_count += len(keys)
+        return seen
+
+    def get(self, key: int, check: int):
+        """取出缓存向量并刷新 LRU 顺序，校验哈希不符时视为未命中"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != check:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: int, check: int, values: np.ndarray):
+        """写入缓存，超出内存上限时按 LRU 淘汰"""
+        if key in self._entries or values.nbytes > self.max_bytes:
+            return
+        self._entries[key] = (check, values.copy())
+        self._added.append(key)
+        self.bytes += values.nbytes
+        while self.bytes > self.max_bytes and self._entries:
+            evicted_key, (_, evicted) = self._entries.popitem(last=False)
+            self._evicted.append(evicted_key)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计：命中率为被缓存覆盖而免于计算的运算节点占比"""
+        return {
+            'hits': int(self.hits),
+            'lookups': int(self.lookups),
+            'hit_rate': float(self.hits / self.lookups) if self.lookups else 0.0,
+            'bytes': int(self.bytes),
+            'entries': len(self._entries),
+            'evictions': int(self.evictions),
+        }
+
+
+class CachedEvaluator(BatchEvaluator):
+    """带子树输出缓存的批量求值器"""
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 linear_scaling: bool = False, dtype=np.float64):
+        super().__init__(X, y, linear_scaling=linear_scaling, dtype=dtype)
+        self.cache = SubtreeCache(max_bytes)
+
+    def evaluate(self, population: Population,
+                 return_predictions: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """求值整代种群：命中缓存的最外层子树直接载入，其余运算节点的输出写回缓存"""
+        ops, args, consts = population.ops, population.args, population.consts
+        keys, checks = structural_hashes(ops, args, consts)
+        operator = ops >= OP_ADD
+        cached = operator & self.cache.contains(keys)
+
+        # 缓存子树的区间 [start, end]：覆盖计数为 1 的命中节点即最外层命中
+        rows, ends = np.nonzero(cached)
+        block_rows = []
+        loads = np.full(ops.shape, -1, dtype=np.int64)
+        covered = np.zeros(ops.shape, dtype=bool)
+        if len(rows):
+            starts = subtree_starts(ops[rows], ends)
+            diff = np.zeros((ops.shape[0], ops.shape[1] + 1), dtype=np.int64)
+            np.add.at(diff, (rows, starts), 1)
+            np.add.at(diff, (rows, ends + 1), -1)
+            coverage = np.cumsum(diff[:, :-1], axis=1)
+            covered = coverage > 0
+            outermost = coverage[rows, ends] == 1
+            slots: Dict[int, int] = {}
+            for r, e, s in zip(rows[outermost], ends[outermost], starts[outermost]):
+                key = int(keys[r, e])
+                slot = slots.get(key)
+                if slot is None:
+                    values = self.cache.get(key, int(checks[r, e]))
+                    if values is None:
+                        # 校验通道不一致（哈希碰撞），该子树照常计算
+                        covered[r, s:e + 1] = False
+                        continue
+                    slot = slots[key] = len(block_rows)
+                    block_rows.append(values)
+                loads[r, e] = slot
+        self.cache.lookups += int(np.count_nonzero(operator))
+        self.cache.hits += int(np.count_nonzero(operator & covered))
+
+        block = (np.stack(block_rows) if block_rows
+                 else np.empty((0, self.n_samples), dtype=self.XT.dtype))
+        skip = covered
+        captures = operator & ~covered
+        captures[captures] = self.cache.admit(keys[captures],
+                                                 self.n_samples * self.XT.itemsize)
+        predictions, captured = self.predict_with_plan(ops, args, consts, skip, loads, block, captures)
+
+        for cap_rows, pos, values in captured:
+            for r, vector in zip(cap_rows, values):
+                self.cache.put(int(keys[r, pos]), int(checks[r, pos]), vector)
+
+        return predictions, self.errors(predictions)
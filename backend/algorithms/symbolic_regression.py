@@ -6,11 +6,62 @@
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from loguru import logger
 import json
+import re
 from pathlib import Path
 import time
+from uuid import uuid4
+from .gp_engine import (GPEngine, evaluate_program,
+                        program_depth, program_to_infix, program_to_latex,
+                        program_to_impact_tree, linear_scaling_coefficients,
+                        append_linear_scaling, objective_matrix)
+from .pareto import pareto_front
+from .islands import IslandModel
+from .expression_compiler import check_impact_tree, expression_cache
+from .checkpoint import save_checkpoint, load_checkpoint
+from .node_impact import program_impacts
+from .metrics import detailed_metrics as compute_detailed_metrics
+from utils.rng import generator, fresh_seed
+
+
+def train_and_score(X: np.ndarray, y: np.ndarray, n_train: int, feature_names: List[str],
+                    engine_params: Dict[str, Any], rng: np.random.Generator,
+                    state: Optional[Dict[str, Any]] = None) -> Tuple[GPEngine, Dict[str, Any], Dict[str, Any]]:
+    """
+    在前 n_train 行上进化单进程 GP 引擎，并在全部行上评估最终模型（交叉验证各折与超参数搜索各配置共用）
+
+    Args:
+        X: (样本 × 特征) 矩阵，前 n_train 行为训练行，其余为测试行
+        y: 目标值
+        n_train: 训练行数
+        feature_names: 特征名
+        engine_params: GPEngine 参数
+        rng: 引擎的随机数生成器
+        state: 从中断处继续进化时为 {'engine': GPEngine.state(), 'elapsed': 已用时间}
+
+    Returns:
+        (引擎, engine.run() 的结果, {'expression', 'training_error', 'detailed_metrics'})
+    """
+    X_train, y_train = X[:n_train], y[:n_train]
+    engine = GPEngine(X_train, y_train, rng=rng, workers=1, **engine_params)
+    if state is not None:
+        engine.restore(state['engine'], elapsed=state['elapsed'])
+    run = engine.run()
+    ops, args, consts, _ = SymbolicRegression._finalize_program(
+        run['ops'], run['args'], run['consts'], X_train, y_train,
+        bool(engine_params.get('linear_scaling')))
+    y_pred = evaluate_program(ops, args, consts, np.ascontiguousarray(X.T))
+    metrics = compute_detailed_metrics(y, y_pred, n_train)
+    metrics['model_depth'] = program_depth(ops)
+    metrics['model_length'] = int(len(ops))
+    return engine, run, {
+        'expression': program_to_infix(ops, args, consts, feature_names),
+        'training_error': float(run['error']),
+        'detailed_metrics': metrics,
+    }
+
 
 class SymbolicRegression:
     """符号回归算法实现"""
@@ -19,11 +70,27 @@ class SymbolicRegression:
         self.models = {}
         self.models_dir = Path("models")
         self.models_dir.mkdir(exist_ok=True)
+        self.checkpoint_dir = self.models_dir / "checkpoints"
+        self.pareto_dir = self.models_dir / "pareto"
+        # 多目标运行的 Pareto 前沿成员（轻量条目，按 entry_id 索引）
+        self.pareto_entries = {}
         self._load_saved_models()
     
     def analyze(self, data: Dict[str, Any], target_column: str, 
                 feature_columns: List[str], population_size: int = 100, 
-                generations: int = 50, set_seed_randomly: bool = False) -> Dict[str, Any]:
+                generations: int = 50, set_seed_randomly: bool = False,
+                max_tree_depth: int = 35, max_tree_length: int = 35,
+                symbolic_expression_grammar: Optional[List[str]] = None,
+                train_ratio: float = 80, seed: int = 42,
+                workers: int = 1, islands: int = 1, migration_interval: int = 10,
+                migration_size: int = 5, subtree_cache: bool = False,
+                cache_max_bytes: Optional[int] = None, constant_optimization_top_k: int = 10,
+                constant_optimization_iterations: int = 10, linear_scaling: bool = False,
+                semantic_dedup: bool = False, semantic_diversity: bool = False,
+                checkpoint_interval: int = 0, multi_objective: bool = False,
+                pareto_objectives: Optional[List[str]] = None, racing: bool = False,
+                racing_min_rows: Optional[int] = None, racing_eta: Optional[int] = None,
+                precision: str = 'float64', save: bool = True) -> Dict[str, Any]:
         """
         执行符号回归分析
         
@@ -33,6 +100,34 @@ class SymbolicRegression:
             feature_columns: 特征变量列名列表
             population_size: 种群大小
             generations: 进化代数
+            set_seed_randomly: 是否使用随机种子
+            max_tree_depth: 表达式树最大深度
+            max_tree_length: 表达式树最大节点数
+            symbolic_expression_grammar: 允许的运算符（addition/subtraction/multiplication/division）
+            train_ratio: 训练集占比（百分比，按行顺序划分）
+            seed: 固定种子模式下使用的随机种子
+            workers: 适应度评估的工作进程数（<= 0 表示使用全部 CPU 核心）
+            islands: 岛屿数量（> 1 时启用岛屿模型，每个岛在独立进程中进化 population_size 个个体）
+            migration_interval: 岛间迁移间隔（代）
+            migration_size: 每次迁移的个体数
+            subtree_cache: 是否启用子树输出缓存（仅单进程评估时生效；训练行数少时缓存的开销超过重新求值，默认关闭）
+            cache_max_bytes: 子树缓存内存上限（字节），None 使用默认值
+            constant_optimization_top_k: 每代做常数优化（LM）的最优个体数，0 表示不优化
+            constant_optimization_iterations: 每次常数优化的 LM 迭代次数
+            linear_scaling: 是否以线性缩放 a + b·f 后的误差作为适应度（a、b 闭式求解并并入最终模型）
+            semantic_dedup: 是否对语义相同的个体只做一次完整评估（history 中记录每代重复比例）
+            semantic_diversity: 是否用随机新个体替换语义重复的后代以保持多样性
+            checkpoint_interval: 每隔多少代写一次检查点（0 表示不写；运行结束时总会写最终检查点），
+                结果中的 run_id 可用于 resume() 续跑或追加代数
+            multi_objective: 是否启用多目标模式（NSGA-II 同时最小化误差与复杂度），
+                结果中的 pareto_front 为整个 Pareto 前沿，主模型仍为误差最小的前沿成员
+            pareto_objectives: 与误差同时最小化的复杂度目标（length / depth），默认 ['length']
+            racing: 是否启用小批量连续减半评估（大数据集用；结果中的 racing_stats 记录节省的行评估次数）
+            racing_min_rows: 首轮样本行数，None 使用默认值
+            racing_eta: 每轮只保留误差最小的 1/eta 个体晋级到 eta 倍样本，None 使用默认值
+            precision: 适应度评估精度（float64 / float32）；float32 时进化结束后名人堂以 float64 重新评分，
+                结果中的 precision 记录实际使用的精度
+            save: 是否将模型（及 Pareto 前沿成员）保存到 models 目录
             
         Returns:
             分析结果字典
@@ -42,30 +137,98 @@ class SymbolicRegression:
             logger.info(f"特征变量: {feature_columns}")
             logger.info(f"随机种子随机化: {set_seed_randomly}")
             
-            # 设置随机种子
+            # 本次运行的根种子：所有随机数流由它经 SeedSequence 派生，不使用全局随机状态
             if not set_seed_randomly:
-                np.random.seed(42)  # 固定种子，确保结果可重复
-                logger.info("使用固定随机种子: 42")
+                run_seed = seed  # 固定种子，确保结果可重复
+                logger.info(f"使用固定随机种子: {seed}")
             else:
-                logger.info("使用随机种子，结果不可重复")
+                run_seed = fresh_seed()
+                logger.info(f"使用随机种子: {run_seed}（记录在结果 parameters.seed 中，可用于复现）")
             
             # 数据预处理
             X, y = self._prepare_data(data, target_column, feature_columns)
             
-            # 执行符号回归（这里使用模拟实现）
-            result = self._perform_symbolic_regression(X, y, feature_columns, 
-                                                     population_size, generations)
+            # run_id 标识本次运行，检查点与 Pareto 前沿条目都通过它关联（随机生成，并发运行互不覆盖）
+            run_id = f"run_{uuid4().hex}"
+            if checkpoint_interval > 0 and islands > 1:
+                logger.warning("岛屿模型的各岛在独立进程中运行，暂不支持检查点，已忽略 checkpoint_interval")
+                checkpoint_interval = 0
+            
+            # 执行符号回归
+            result = self._perform_symbolic_regression(
+                X, y, feature_columns, population_size, generations,
+                max_tree_depth=max_tree_depth, max_tree_length=max_tree_length,
+                grammar=symbolic_expression_grammar, train_ratio=train_ratio, seed=run_seed,
+                workers=workers, islands=islands, migration_interval=migration_interval,
+                migration_size=migration_size, subtree_cache=subtree_cache,
+                cache_max_bytes=cache_max_bytes,
+                constant_optimization_top_k=constant_optimization_top_k,
+                constant_optimization_iterations=constant_optimization_iterations,
+                linear_scaling=linear_scaling, semantic_dedup=semantic_dedup,
+                semantic_diversity=semantic_diversity, target_column=target_column,
+                multi_objective=multi_objective, pareto_objectives=pareto_objectives,
+                racing=racing, racing_min_rows=racing_min_rows, racing_eta=racing_eta,
+                precision=precision, run_id=run_id, checkpoint_interval=checkpoint_interval
+            )
+            result['target_variable'] = target_column
+            result['feature_columns'] = list(feature_columns)
             
             # 保存模型
-            model_id = self._save_model(result)
-            
-            logger.info(f"符号回归分析完成，模型ID: {model_id}")
+            if save:
+                model_id = self._save_model(result)
+                self.save_pareto_front(result, model_id)
+                logger.info(f"符号回归分析完成，模型ID: {model_id}")
             return result
             
         except Exception as e:
             logger.error(f"符号回归分析失败: {str(e)}")
             raise
     
+    def resume(self, run_id: str, extra_generations: int = 0, workers: int = 1,
+               save: bool = True) -> Dict[str, Any]:
+        """
+        从检查点续跑符号回归
+        
+        Args:
+            run_id: analyze 返回的运行ID
+            extra_generations: 在原计划代数之外追加的代数
+            workers: 适应度评估的工作进程数（不影响结果）
+            save: 是否将模型保存到 models 目录
+            
+        Returns:
+            与 analyze 相同结构的结果字典；随机数状态从检查点恢复，
+            结果与不中断地运行相同代数逐位一致
+        """
+        try:
+            if not re.fullmatch(r'run_[0-9a-f]+', str(run_id)):
+                raise ValueError(f"无效的运行ID: {run_id}")
+            arrays, meta = load_checkpoint(self.checkpoint_dir / f"{run_id}.npz")
+            engine_params = dict(meta['engine_params'])
+            engine_params['generations'] = int(engine_params['generations']) + max(0, int(extra_generations))
+            logger.info(f"从检查点恢复运行 {run_id}：已完成 {meta['generation']} 代，"
+                        f"目标 {engine_params['generations']} 代")
+            
+            result = self._perform_symbolic_regression(
+                arrays['X'], arrays['y'], meta['feature_columns'],
+                train_ratio=meta['train_ratio'], seed=meta['seed'], workers=workers,
+                target_column=meta['target_column'], run_id=run_id,
+                checkpoint_interval=meta['checkpoint_interval'], resume=(arrays, meta),
+                **engine_params
+            )
+            result['target_variable'] = meta['target_column']
+            result['feature_columns'] = list(meta['feature_columns'])
+            result['resumed_from_generation'] = int(meta['generation'])
+            
+            if save:
+                model_id = self._save_model(result)
+                self.save_pareto_front(result, model_id)
+                logger.info(f"续跑完成，模型ID: {model_id}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"符号回归续跑失败: {str(e)}")
+            raise
+    
     def _prepare_data(self, data: Dict[str, Any], target_column: str, 
                      feature_columns: List[str]) -> tuple:
         """准备训练数据"""
@@ -104,66 +267,115 @@ class SymbolicRegression:
     
     def _perform_symbolic_regression(self, X: np.ndarray, y: np.ndarray, 
                                    feature_names: List[str], population_size: int, 
-                                   generations: int) -> Dict[str, Any]:
-        """执行符号回归算法（模拟实现）"""
+                                   generations: int, max_tree_depth: int = 35,
+                                   max_tree_length: int = 35,
+                                   grammar: Optional[List[str]] = None,
+                                   train_ratio: float = 80,
+                                   seed: Optional[int] = None,
+                                   workers: int = 1, islands: int = 1,
+                                   migration_interval: int = 10,
+                                   migration_size: int = 5,
+                                   subtree_cache: bool = False,
+                                   cache_max_bytes: Optional[int] = None,
+                                   constant_optimization_top_k: int = 10,
+                                   constant_optimization_iterations: int = 10,
+                                   linear_scaling: bool = False,
+                                   semantic_dedup: bool = False,
+                                   semantic_diversity: bool = False,
+                                   multi_objective: bool = False,
+                                   pareto_objectives: Optional[List[str]] = None,
+                                   racing: bool = False,
+                                   racing_min_rows: Optional[int] = None,
+                                   racing_eta: Optional[int] = None,
+                                   precision: str = 'float64',
+                                   target_column: Optional[str] = None,
+                                   run_id: Optional[str] = None,
+                                   checkpoint_interval: int = 0,
+                                   resume: Optional[tuple] = None) -> Dict[str, Any]:
+        """执行符号回归算法（遗传规划）；checkpoint_interval > 0 时写检查点，resume 为 (数组, 状态) 时从检查点继续"""
         try:
-            # 这里使用模拟实现，实际项目中应该使用真实的符号回归库
-            # 如 PySR, gplearn 等
-            
             logger.info("开始执行符号回归算法...")
             
-            # 模拟计算时间
-            time.sleep(2)
-            
-            # 生成模拟结果
-            n_features = X.shape[1]
-            
-            # 简单的线性组合作为示例
-            coefficients = np.random.rand(n_features) * 2 - 1
-            intercept = np.random.rand() * 2 - 1
-            
-            # 构建表达式
-            expression_parts = []
-            for i, (coef, name) in enumerate(zip(coefficients, feature_names)):
-                if abs(coef) > 0.01:  # 只保留显著系数
-                    if coef >= 0 and i > 0:
-                        expression_parts.append(f"+ {coef:.3f} * {name}")
-                    else:
-                        expression_parts.append(f"{coef:.3f} * {name}")
-            
-            expression = " + ".join(expression_parts)
-            if intercept >= 0:
-                expression += f" + {intercept:.3f}"
+            n_train = self._train_size(len(y), train_ratio)
+            X_train, y_train = X[:n_train], y[:n_train]
+            
+            engine_params = {
+                'population_size': population_size,
+                'generations': generations,
+                'max_tree_depth': max_tree_depth,
+                'max_tree_length': max_tree_length,
+                'grammar': grammar,
+                'subtree_cache': subtree_cache,
+                'cache_max_bytes': cache_max_bytes,
+                'constant_optimization_top_k': constant_optimization_top_k,
+                'constant_optimization_iterations': constant_optimization_iterations,
+                'linear_scaling': linear_scaling,
+                'semantic_dedup': semantic_dedup,
+                'semantic_diversity': semantic_diversity,
+                'multi_objective': multi_objective,
+                'pareto_objectives': pareto_objectives,
+                'racing': racing,
+                'racing_min_rows': racing_min_rows,
+                'racing_eta': racing_eta,
+                'precision': precision,
+            }
+            if islands > 1:
+                # 岛屿模型：每个岛独占一个进程，岛内不再开启评估进程池
+                engine = IslandModel(X_train, y_train, islands=islands,
+                                     migration_interval=migration_interval,
+                                     migration_size=migration_size, seed=seed, **engine_params)
             else:
-                expression += f" - {abs(intercept):.3f}"
+                engine = GPEngine(X_train, y_train, rng=generator(seed),
+                                  workers=workers, **engine_params)
+            if resume is not None:
+                arrays, meta = resume
+                engine.restore(dict(arrays, generation=meta['generation'], rng_state=meta['rng_state'],
+                                    history=meta['history'], racing=meta.get('racing')),
+                               elapsed=meta['elapsed'])
+            
+            run_meta = {
+                'run_id': run_id,
+                'target_column': target_column,
+                'feature_columns': list(feature_names),
+                'train_ratio': train_ratio,
+                'seed': seed,
+                'checkpoint_interval': checkpoint_interval,
+                'engine_params': engine_params,
+            }
+            callback = (self._checkpoint_callback(run_meta, X, y)
+                        if checkpoint_interval > 0 and run_id is not None else None)
+            # 岛屿模型的 run() 不接受回调（检查点仅支持单种群）
+            run = engine.run(callback=callback) if callback is not None else engine.run()
+            ops, args, consts, constant_names = self._finalize_program(
+                run['ops'], run['args'], run['consts'], X_train, y_train, linear_scaling)
             
             # 计算预测值
-            y_pred = np.dot(X, coefficients) + intercept
+            y_pred = evaluate_program(ops, args, consts, np.ascontiguousarray(X.T))
             
             # 计算性能指标
-            # 计算皮尔逊相关系数
-            y_mean = np.mean(y)
-            y_pred_mean = np.mean(y_pred)
-            numerator = np.sum((y - y_mean) * (y_pred - y_pred_mean))
-            denominator = np.sqrt(np.sum((y - y_mean) ** 2) * np.sum((y_pred - y_pred_mean) ** 2))
-            pearson_r = numerator / denominator if denominator != 0 else 0
-            
-            # 特征重要性（基于系数绝对值）
-            feature_importance = []
-            for name, coef in zip(feature_names, coefficients):
-                feature_importance.append({
-                    'feature': name,
-                    'coefficient': float(coef),
-                    'importance': float(abs(coef))
-                })
-            
-            # 按重要性排序
-            feature_importance.sort(key=lambda x: x['importance'], reverse=True)
+            detailed_metrics = compute_detailed_metrics(y, y_pred, n_train)
+            detailed_metrics['model_depth'] = program_depth(ops)
+            detailed_metrics['model_length'] = int(len(ops))
+            
+            # 节点影响力与特征重要性（同一次批量子树消融）
+            node_impacts, totals = program_impacts(ops, args, consts,
+                                                   np.ascontiguousarray(X_train.T), y_train)
+            impact_tree = program_to_impact_tree(ops, args, consts, feature_names, node_impacts)
+            check_impact_tree(impact_tree, feature_names, np.ascontiguousarray(X.T), y_pred)
+            feature_importance = self._aggregate_feature_importance(totals, feature_names)
+            
+            expression = program_to_infix(ops, args, consts, feature_names)
+            expression_latex, constants = program_to_latex(ops, args, consts, feature_names,
+                                                           constant_names)
             
             result = {
                 'expression': expression,
-                'pearson_r': float(pearson_r),
+                'expression_latex': expression_latex,
+                'constants': constants,
+                'pearson_r': detailed_metrics['pearson_r_training'],
                 'feature_importance': feature_importance,
+                'impact_tree': impact_tree,
+                'detailed_metrics': detailed_metrics,
                 'predictions': {
                     'actual': y.tolist(),
                     'predicted': y_pred.tolist()
@@ -171,19 +383,172 @@ class SymbolicRegression:
                 'parameters': {
                     'population_size': population_size,
                     'generations': generations,
-                    'n_features': n_features,
-                    'n_samples': len(y)
+                    'max_tree_depth': max_tree_depth,
+                    'max_tree_length': max_tree_length,
+                    'symbolic_expression_grammar': grammar,
+                    'train_ratio': train_ratio,
+                    'seed': seed,
+                    'n_features': X.shape[1],
+                    'n_samples': len(y),
+                    'n_train': n_train,
+                    'workers': engine.workers,
+                    'islands': islands,
+                    'migration_interval': migration_interval,
+                    'migration_size': migration_size,
+                    'subtree_cache': run['cache_stats'] is not None,
+                    'constant_optimization_top_k': constant_optimization_top_k,
+                    'constant_optimization_iterations': constant_optimization_iterations,
+                    'linear_scaling': linear_scaling,
+                    'semantic_dedup': semantic_dedup,
+                    'semantic_diversity': semantic_diversity,
+                    'multi_objective': multi_objective,
+                    'pareto_objectives': engine_params['pareto_objectives'] or ['length'],
+                    'racing': racing,
+                    'precision': run['precision']
                 },
+                'history': run['history'],
+                'run_id': run_id,
+                'training_time': round(run['elapsed'], 3),
+                'cache_stats': run['cache_stats'],
+                'racing_stats': run['racing_stats'],
+                'precision': run['precision'],
                 'timestamp': time.time()
             }
-            
-            logger.info(f"符号回归完成，皮尔逊相关系数 = {pearson_r:.3f}")
+            if multi_objective:
+                result['pareto_front'] = self._pareto_front_entries(
+                    run, X, y, n_train, feature_names, linear_scaling,
+                    result['parameters']['pareto_objectives'], run_id)
+                logger.info(f"Pareto 前沿共 {len(result['pareto_front'])} 个表达式")
+            
+            logger.info(f"符号回归完成，训练集 MSE = {run['error']:.6g}，"
+                        f"皮尔逊相关系数 = {result['pearson_r']:.3f}，耗时 {run['elapsed']:.2f}s")
             return result
             
         except Exception as e:
             logger.error(f"符号回归执行失败: {str(e)}")
             raise
     
+    @staticmethod
+    def _finalize_program(ops: np.ndarray, args: np.ndarray, consts: np.ndarray,
+                          X_train: np.ndarray, y_train: np.ndarray,
+                          linear_scaling: bool) -> tuple:
+        """
+        得到最终模型程序：线性缩放时按训练集闭式求解 a、b，并入模型 f * b + a
+
+        Returns:
+            (ops, args, consts, LaTeX 常数命名表或 None)
+        """
+        if not linear_scaling:
+            return ops, args, consts, None
+        f_train = evaluate_program(ops, args, consts, np.ascontiguousarray(X_train.T))
+        a, b = linear_scaling_coefficients(f_train[None, :], y_train)
+        ops, args, consts = append_linear_scaling(ops, args, consts, float(a[0]), float(b[0]))
+        return ops, args, consts, {len(ops) - 4: 'b', len(ops) - 2: 'a'}
+    
+    def _pareto_front_entries(self, run: Dict[str, Any], X: np.ndarray, y: np.ndarray,
+                              n_train: int, feature_names: List[str], linear_scaling: bool,
+                              pareto_objectives: List[str], run_id: str) -> List[Dict[str, Any]]:
+        """由最终种群提取 Pareto 前沿（按复杂度升序），每个成员整理为轻量条目"""
+        population, errors = run['population'], run['errors']
+        members = pareto_front(objective_matrix(population, errors, pareto_objectives))
+        XT = np.ascontiguousarray(X.T)
+        entries = []
+        predictions = []
+        for index, member in enumerate(members):
+            ops, args, consts = population.program(int(member))
+            ops, args, consts, constant_names = self._finalize_program(
+                ops, args, consts, X[:n_train], y[:n_train], linear_scaling)
+            predictions.append(evaluate_program(ops, args, consts, XT))
+            expression_latex, constants = program_to_latex(ops, args, consts, feature_names,
+                                                           constant_names)
+            entries.append({
+                'entry_id': f"{run_id}_p{index}",
+                'run_id': run_id,
+                'front_index': index,
+                'expression': program_to_infix(ops, args, consts, feature_names),
+                'expression_latex': expression_latex,
+                'constants': constants,
+                'training_error': float(errors[member]),
+                'model_length': int(len(ops)),
+                'model_depth': program_depth(ops),
+            })
+        # 整个前沿的预测矩阵一次评分
+        if entries:
+            for entry, metrics in zip(entries, compute_detailed_metrics(y, np.vstack(predictions), n_train)):
+                entry['detailed_metrics'] = metrics
+        return entries
+    
+    def save_pareto_front(self, result: Dict[str, Any], model_id: Optional[str] = None):
+        """
+        将 Pareto 前沿的每个成员保存为 models/pareto 下的轻量条目
+
+        条目只包含表达式、复杂度与指标，通过 run_id（及 model_id）引用所属运行，
+        可直接用 predict(entry_id, X) 预测
+        """
+        entries = result.get('pareto_front')
+        if not entries:
+            return
+        try:
+            self.pareto_dir.mkdir(parents=True, exist_ok=True)
+            for entry in entries:
+                record = dict(entry, model_id=model_id,
+                              target_variable=result.get('target_variable'),
+                              feature_columns=result.get('feature_columns'),
+                              timestamp=result.get('timestamp', time.time()))
+                with open(self.pareto_dir / f"{entry['entry_id']}.json", 'w', encoding='utf-8') as f:
+                    json.dump(record, f, ensure_ascii=False, indent=2)
+                self.pareto_entries[entry['entry_id']] = record
+            logger.info(f"Pareto 前沿已保存: {len(entries)} 个条目（运行 {entries[0]['run_id']}）")
+        except Exception as e:
+            logger.error(f"Pareto 前沿保存失败: {str(e)}")
+            raise
+    
+    def get_pareto_front(self, run_id: str) -> List[Dict[str, Any]]:
+        """获取某次运行已保存的 Pareto 前沿条目（按前沿顺序）"""
+        entries = [entry for entry in self.pareto_entries.values() if entry.get('run_id') == run_id]
+        return sorted(entries, key=lambda entry: entry['front_index'])
+    
+    def _checkpoint_callback(self, run_meta: Dict[str, Any], X: np.ndarray, y: np.ndarray):
+        """构造每 checkpoint_interval 代（及最后一代）写入一次检查点的进化回调"""
+        checkpoint_path = self.checkpoint_dir / f"{run_meta['run_id']}.npz"
+        checkpoint_interval = run_meta['checkpoint_interval']
+        start_time = time.time()
+        
+        def callback(engine: GPEngine, generation: int):
+            if engine.generation % checkpoint_interval == 0 or engine.generation == engine.generations:
+                self._write_checkpoint(checkpoint_path, engine, X, y, run_meta,
+                                       engine.elapsed_before + time.time() - start_time)
+        return callback
+    
+    @staticmethod
+    def _write_checkpoint(path: Path, engine: GPEngine, X: np.ndarray, y: np.ndarray,
+                          run_meta: Dict[str, Any], elapsed: float):
+        """写入当前进化状态的检查点"""
+        state = engine.state()
+        arrays = {key: state[key] for key in ('ops', 'args', 'consts', 'lengths', 'errors', 'exact')}
+        arrays.update(X=X, y=y)
+        meta = dict(run_meta, generation=state['generation'], rng_state=state['rng_state'],
+                    history=state['history'], racing=state['racing'], elapsed=elapsed)
+        save_checkpoint(path, arrays, meta)
+        logger.debug(f"检查点已写入: {path.name}（第 {state['generation']} 代）")
+    
+    @staticmethod
+    def _train_size(n_samples: int, train_ratio: float) -> int:
+        """按训练集占比计算训练行数（至少保留一行训练数据）"""
+        n_train = int(round(n_samples * float(train_ratio) / 100.0))
+        return min(max(n_train, 1), n_samples)
+    
+    @staticmethod
+    def _aggregate_feature_importance(totals: np.ndarray,
+                                      feature_names: List[str]) -> List[Dict[str, Any]]:
+        """整理各特征的影响力之和为按重要性降序的列表"""
+        feature_importance = [
+            {'feature': name, 'importance': float(totals[i])}
+            for i, name in enumerate(feature_names)
+        ]
+        feature_importance.sort(key=lambda x: x['importance'], reverse=True)
+        return feature_importance
+    
     def _save_model(self, result: Dict[str, Any]) -> str:
         """保存模型"""
         try:
@@ -206,8 +571,8 @@ class SymbolicRegression:
             raise
     
     def get_model(self, model_id: str) -> Optional[Dict[str, Any]]:
-        """获取模型"""
-        return self.models.get(model_id)
+        """获取模型（也可以是 Pareto 前沿条目的 entry_id）"""
+        return self.models.get(model_id) or self.pareto_entries.get(model_id)
     
     def get_saved_models(self) -> List[Dict[str, Any]]:
         """获取所有已保存的模型"""
@@ -233,21 +598,37 @@ class SymbolicRegression:
                 except Exception as e:
                     logger.warning(f"加载模型文件失败 {model_file}: {str(e)}")
             
-            logger.info(f"已加载 {len(self.models)} 个模型")
+            for entry_file in self.pareto_dir.glob("*.json"):
+                try:
+                    with open(entry_file, 'r', encoding='utf-8') as f:
+                        entry = json.load(f)
+                    self.pareto_entries[entry.get('entry_id', entry_file.stem)] = entry
+                except Exception as e:
+                    logger.warning(f"加载 Pareto 前沿条目失败 {entry_file}: {str(e)}")
+            
+            logger.info(f"已加载 {len(self.models)} 个模型，{len(self.pareto_entries)} 个 Pareto 前沿条目")
             
         except Exception as e:
             logger.error(f"加载保存的模型失败: {str(e)}")
     
-    def predict(self, model_id: str, X: np.ndarray) -> np.ndarray:
-        """使用模型进行预测"""
+    def predict(self, model_id: str, X: Any) -> np.ndarray:
+        """
+        使用模型进行预测
+        
+        Args:
+            model_id: 模型ID
+            X: DataFrame（按列名取特征）或 (样本 × 特征) 矩阵（列顺序与模型 feature_columns 一致）
+        """
         try:
             model = self.get_model(model_id)
             if not model:
                 raise ValueError(f"模型 {model_id} 不存在")
             
-            # 这里应该实现真正的预测逻辑
-            # 目前返回随机值作为示例
-            return np.random.rand(len(X))
+            # 表达式按 (model_id, 内容哈希) 编译一次并缓存
+            compiled = expression_cache.get(model_id, model)
+            if isinstance(X, pd.DataFrame):
+                return compiled.evaluate_columns({name: X[name].values for name in X.columns})
+            return compiled.evaluate(X)
             
         except Exception as e:
             logger.error(f"预测失败: {str(e)}")
@@ -17,7 +17,20 @@ import io
 import zipfile
 from werkzeug.utils import secure_filename
 import shutil
-import re
+import pandas as pd
+
+from algorithms.symbolic_regression import SymbolicRegression
+from algorithms.monte_carlo import MonteCarloAnalysis
+from algorithms.expression_tree import ExpressionTree, EXPR_TREE_ACTIONS, tree_sessions
+from algorithms.expression_compiler import expression_cache, model_feature_names
+from algorithms.metrics import detailed_metrics
+from algorithms.cross_validation import (cross_validate, normalize_split_spec, dataset_hash,
+                                         split_cache)
+from algorithms.hyperparameter_sweep import (expand_space, run_sweep, DEFAULT_SWEEP_SAMPLES,
+                                             DEFAULT_SWEEP_ETA)
+from algorithms.permutation_importance import (permutation_importance, DEFAULT_PERMUTATION_REPEATS,
+                                               DEFAULT_CONFIDENCE)
+from utils.config import get_config_value
 
 # 创建蓝图
 symbolic_regression_bp = Blueprint('symbolic_regression', __name__)
@@ -38,1453 +51,6 @@ os.makedirs(CSV_DATA_DIR, exist_ok=True)
 os.makedirs(MODELS_DIR, exist_ok=True)
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
-# 符号表达式树操作的模拟指标序列（不要从文件读取，直接内嵌）
-# 下标1..15分别对应第1~15次树结构变更后的指标；下标0表示基线，不覆盖。
-MOCK_INDICATORS_SEQUENCE = [None] + [
-    {
-        "average_relative_error_test": 2.74596305113801,
-        "average_relative_error_training": 2.3574806852981,
-        "mean_absolute_error_test": 0.020585454497077455,
-        "mean_absolute_error_training": 0.018182586660249123,
-        "mean_squared_error_test": 0.00073464638025446673,
-        "mean_squared_error_training": 0.00053687909383770235,
-        "normalized_mean_squared_error_test": 0.14358163045309327,
-        "normalized_mean_squared_error_training": 0.12666355569075083,
-        "pearson_r_test": 0.86776941659869888,
-        "pearson_r_training": 0.87333644430924906,
-        "root_mean_squared_error_test": 0.02710436090843071,
-        "root_mean_squared_error_training": 0.0231706515626493,
-        "model_depth": 9,
-        "model_length": 30
-    },
-    {
-        "average_relative_error_test": 2.74596305113801,
-        "average_relative_error_training": 2.3574806852981,
-        "mean_absolute_error_test": 0.020585454497077448,
-        "mean_absolute_error_training": 0.018182586660249123,
-        "mean_squared_error_test": 0.00073464638025446673,
-        "mean_squared_error_training": 0.00053687909383770235,
-        "normalized_mean_squared_error_test": 0.14358163045309327,
-        "normalized_mean_squared_error_training": 0.12666355569075086,
-        "pearson_r_test": 0.86776941659869888,
-        "pearson_r_training": 0.87333644430924928,
-        "root_mean_squared_error_test": 0.02710436090843071,
-        "root_mean_squared_error_training": 0.0231706515626493,
-        "model_depth": 9,
-        "model_length": 30
-    },
-    {
-        "average_relative_error_test": 2.74596305113801,
-        "average_relative_error_training": 2.3574806852981,
-        "mean_absolute_error_test": 0.020585454497077455,
-        "mean_absolute_error_training": 0.018182586660249123,
-        "mean_squared_error_test": 0.0007346463802544676,
-        "mean_squared_error_training": 0.00053687909383770245,
-        "normalized_mean_squared_error_test": 0.14358163045309344,
-        "normalized_mean_squared_error_training": 0.12666355569075086,
-        "pearson_r_test": 0.86776941659869844,
-        "pearson_r_training": 0.87333644430924906,
-        "root_mean_squared_error_test": 0.027104360908430724,
-        "root_mean_squared_error_training": 0.0231706515626493,
-        "model_depth": 9,
-        "model_length": 30
-    },
-    {
-        "average_relative_error_test": 2.74596305113801,
-        "average_relative_error_training": 2.3574806852981,
-        "mean_absolute_error_test": 0.020585454497077455,
-        "mean_absolute_error_training": 0.018182586660249123,
-        "mean_squared_error_test": 0.00073464638025446673,
-        "mean_squared_error_training": 0.00053687909383770235,
-        "normalized_mean_squared_error_test": 0.14358163045309327,
-        "normalized_mean_squared_error_training": 0.12666355569075083,
-        "pearson_r_test": 0.86776941659869888,
-        "pearson_r_training": 0.87333644430924906,
-        "root_mean_squared_error_test": 0.02710436090843071,
-        "root_mean_squared_error_training": 0.0231706515626493,
-        "model_depth": 9,
-        "model_length": 30
-    },
-    {
-        "average_relative_error_test": 2.84597275187996,
-        "average_relative_error_training": 2.48696808718705,
-        "mean_absolute_error_test": 0.021330165641595289,
-        "mean_absolute_error_training": 0.019181112565881491,
-        "mean_squared_error_test": 0.00078426119873988346,
-        "mean_squared_error_training": 0.00058318510503991,
-        "normalized_mean_squared_error_test": 0.15327850873935517,
-        "normalized_mean_squared_error_training": 0.13758833204365606,
-        "pearson_r_test": 0.8668991495312971,
-        "pearson_r_training": 0.86241166795634416,
-        "root_mean_squared_error_test": 0.028004663874788491,
-        "root_mean_squared_error_training": 0.024149225764813039,
-        "model_depth": 11,
-        "model_length": 33
-    },
-    {
-        "average_relative_error_test": 2.84597275187996,
-        "average_relative_error_training": 2.48696808718705,
-        "mean_absolute_error_test": 0.0213301656415953,
-        "mean_absolute_error_training": 0.019181112565881477,
-        "mean_squared_error_test": 0.00078426119873988389,
-        "mean_squared_error_training": 0.00058318510503990956,
-        "normalized_mean_squared_error_test": 0.15327850873935531,
-        "normalized_mean_squared_error_training": 0.13758833204365603,
-        "pearson_r_test": 0.86689914953129676,
-        "pearson_r_training": 0.86241166795634516,
-        "root_mean_squared_error_test": 0.028004663874788498,
-        "root_mean_squared_error_training": 0.024149225764813032,
-        "model_depth": 9,
-        "model_length": 29
-    },
-    {
-        "average_relative_error_test": 2.82362275136901,
-        "average_relative_error_training": 2.48051448622132,
-        "mean_absolute_error_test": 0.021248478681024353,
-        "mean_absolute_error_training": 0.019199989104899291,
-        "mean_squared_error_test": 0.000756269177768846,
-        "mean_squared_error_training": 0.00059333589584469092,
-        "normalized_mean_squared_error_test": 0.14780765892817582,
-        "normalized_mean_squared_error_training": 0.1399831640852911,
-        "pearson_r_test": 0.87072209571472137,
-        "pearson_r_training": 0.86001683591470957,
-        "root_mean_squared_error_test": 0.027500348684495732,
-        "root_mean_squared_error_training": 0.024358487141953027,
-        "model_depth": 11,
-        "model_length": 32
-    },
-    {
-        "average_relative_error_test": 2.82362275136901,
-        "average_relative_error_training": 2.48051448622132,
-        "mean_absolute_error_test": 0.021248478681024374,
-        "mean_absolute_error_training": 0.019199989104899284,
-        "mean_squared_error_test": 0.00075626917776884647,
-        "mean_squared_error_training": 0.00059333589584469081,
-        "normalized_mean_squared_error_test": 0.14780765892817591,
-        "normalized_mean_squared_error_training": 0.13998316408529107,
-        "pearson_r_test": 0.87072209571472114,
-        "pearson_r_training": 0.86001683591470945,
-        "root_mean_squared_error_test": 0.027500348684495739,
-        "root_mean_squared_error_training": 0.024358487141953024,
-        "model_depth": 9,
-        "model_length": 28
-    },
-    {
-        "average_relative_error_test": 2.82362275136901,
-        "average_relative_error_training": 2.48051448622132,
-        "mean_absolute_error_test": 0.021248478681024374,
-        "mean_absolute_error_training": 0.019199989104899281,
-        "mean_squared_error_test": 0.00075626917776884647,
-        "mean_squared_error_training": 0.00059333589584469059,
-        "normalized_mean_squared_error_test": 0.14780765892817591,
-        "normalized_mean_squared_error_training": 0.13998316408529105,
-        "pearson_r_test": 0.87072209571472114,
-        "pearson_r_training": 0.86001683591470979,
-        "root_mean_squared_error_test": 0.027500348684495739,
-        "root_mean_squared_error_training": 0.02435848714195302,
-        "model_depth": 9,
-        "model_length": 28
-    },
-    {
-        "average_relative_error_test": 2.82362275136901,
-        "average_relative_error_training": 2.48051448622132,
-        "mean_absolute_error_test": 0.021248478681024374,
-        "mean_absolute_error_training": 0.019199989104899281,
-        "mean_squared_error_test": 0.00075626917776884647,
-        "mean_squared_error_training": 0.00059333589584469059,
-        "normalized_mean_squared_error_test": 0.14780765892817591,
-        "normalized_mean_squared_error_training": 0.13998316408529107,
-        "pearson_r_test": 0.87072209571472114,
-        "pearson_r_training": 0.86001683591470945,
-        "root_mean_squared_error_test": 0.027500348684495739,
-        "root_mean_squared_error_training": 0.02435848714195302,
-        "model_depth": 9,
-        "model_length": 28
-    },
-    {
-        "average_relative_error_test": 2.82362275136901,
-        "average_relative_error_training": 2.48051448622132,
-        "mean_absolute_error_test": 0.021248478681024374,
-        "mean_absolute_error_training": 0.019199989104899284,
-        "mean_squared_error_test": 0.00075626917776884647,
-        "mean_squared_error_training": 0.00059333589584469081,
-        "normalized_mean_squared_error_test": 0.14780765892817591,
-        "normalized_mean_squared_error_training": 0.13998316408529107,
-        "pearson_r_test": 0.87072209571472114,
-        "pearson_r_training": 0.86001683591470945,
-        "root_mean_squared_error_test": 0.027500348684495739,
-        "root_mean_squared_error_training": 0.024358487141953024,
-        "model_depth": 9,
-        "model_length": 28
-    },
-    {
-        "average_relative_error_test": 2.82362275136901,
-        "average_relative_error_training": 2.48051448622132,
-        "mean_absolute_error_test": 0.021248478681024374,
-        "mean_absolute_error_training": 0.019199989104899281,
-        "mean_squared_error_test": 0.00075626917776884647,
-        "mean_squared_error_training": 0.00059333589584469059,
-        "normalized_mean_squared_error_test": 0.14780765892817591,
-        "normalized_mean_squared_error_training": 0.13998316408529105,
-        "pearson_r_test": 0.87072209571472114,
-        "pearson_r_training": 0.86001683591470979,
-        "root_mean_squared_error_test": 0.027500348684495739,
-        "root_mean_squared_error_training": 0.02435848714195302,
-        "model_depth": 9,
-        "model_length": 28
-    },
-    {
-        "average_relative_error_test": 2.82362275136901,
-        "average_relative_error_training": 2.48051448622132,
-        "mean_absolute_error_test": 0.021248478681024374,
-        "mean_absolute_error_training": 0.019199989104899281,
-        "mean_squared_error_test": 0.00075626917776884647,
-        "mean_squared_error_training": 0.00059333589584469059,
-        "normalized_mean_squared_error_test": 0.14780765892817591,
-        "normalized_mean_squared_error_training": 0.13998316408529107,
-        "pearson_r_test": 0.87072209571472114,
-        "pearson_r_training": 0.86001683591470945,
-        "root_mean_squared_error_test": 0.027500348684495739,
-        "root_mean_squared_error_training": 0.02435848714195302,
-        "model_depth": 9,
-        "model_length": 28
-    },
-    {
-        "average_relative_error_test": 2.82362275136901,
-        "average_relative_error_training": 2.48051448622132,
-        "mean_absolute_error_test": 0.021248478681024374,
-        "mean_absolute_error_training": 0.019199989104899284,
-        "mean_squared_error_test": 0.00075626917776884647,
-        "mean_squared_error_training": 0.00059333589584469081,
-        "normalized_mean_squared_error_test": 0.14780765892817591,
-        "normalized_mean_squared_error_training": 0.13998316408529107,
-        "pearson_r_test": 0.87072209571472114,
-        "pearson_r_training": 0.86001683591470945,
-        "root_mean_squared_error_test": 0.027500348684495739,
-        "root_mean_squared_error_training": 0.024358487141953024,
-        "model_depth": 9,
-        "model_length": 28
-    },
-    {
-        "average_relative_error_test": 2.82362275136901,
-        "average_relative_error_training": 2.48051448622132,
-        "mean_absolute_error_test": 0.021248478681024374,
-        "mean_absolute_error_training": 0.019199989104899284,
-        "mean_squared_error_test": 0.00075626917776884647,
-        "mean_squared_error_training": 0.00059333589584469081,
-        "normalized_mean_squared_error_test": 0.14780765892817591,
-        "normalized_mean_squared_error_training": 0.13998316408529107,
-        "pearson_r_test": 0.87072209571472114,
-        "pearson_r_training": 0.86001683591470945,
-        "root_mean_squared_error_test": 0.027500348684495739,
-        "root_mean_squared_error_training": 0.024358487141953024,
-        "model_depth": 9,
-        "model_length": 28
-    }
-]
-
-# 符号回归分析的初始特征权重（基线数据）
-MOCK_WEIGHTS_BASELINE = [
-    {'feature': 'VR', 'importance': 0.40331375862937024},
-    {'feature': 'HYP', 'importance': 0.30740076820527074},
-    {'feature': 'UA', 'importance': 0.23746410777792382},
-    {'feature': 'CA', 'importance': 0.22610791660542262},
-    {'feature': 'MA', 'importance': 0.15483347260005331},
-    {'feature': 'QA', 'importance': 0.026878474944676545},
-    {'feature': 'OA', 'importance': 0.013918586597244875},
-    {'feature': 'MDA', 'importance': 0},
-    {'feature': 'QUE', 'importance': 0},
-    {'feature': 'CRA', 'importance': 0},
-    {'feature': 'EPI', 'importance': 0},
-    {'feature': 'PC1', 'importance': 0},
-    {'feature': 'PB2', 'importance': 0}
-]
-
-# 基线SVG符号表达式树的初始影响力数据（对应docs/tree.json）
-BASELINE_IMPACT_TREE = {
-    "Addition": {
-        "Multiplication": {
-            "Addition": {
-                "Subtraction": {
-                    "Division": {
-                        "Multiplication": {
-                            "Addition": {
-                                "1.9105 * HYP": 0.0157069022188682,
-                                "Subtraction": {
-                                    "Addition": {
-                                        "Addition": {
-                                            "0.6015 * QA": 0.011758459632117,
-                                            "0.4274 * HYP": 0.00120390671170711
-                                        },
-                                        "1.2977 * CA": 0.113928459255378
-                                    },
-                                    "-10.458": 0
-                                }
-                            },
-                            "Addition": {
-                                "-1.9323": 0,
-                                "Multiplication": {
-                                    "-0.0781 * MA": 0.108972688038807,
-                                    "Addition": {
-                                        "Addition": {
-                                            "Addition": {
-                                                "-1.9323": 0,
-                                                "1.4812 * OA": 0.00688842480665608
-                                            },
-                                            "0.5974 * UA": 0.0111402882791509
-                                        },
-                                        "0.6078 * UA": 0.0120783966067667
-                                    }
-                                }
-                            }
-                        },
-                        "2.9628 * VR": 0.279624923755846
-                    },
-                    "Division": {
-                        "2.6756": 0,
-                        "0.4083 * HYP": 0.0763517896756712
-                    }
-                },
-                "Division": {
-                    "1.2192 * VR": 0.0208902884673905,
-                    "Subtraction": {
-                        "5.4189": 0,
-                        "1.9105 * HYP": 0.21010236004585
-                    }
-                }
-            },
-            "0.0054": 0
-        },
-        "0.9305": 0
-    }
-}
-
-# 符号表达式树操作的模拟树结构序列（不要从文件读取，直接内嵌）
-# 下标1..15分别对应第1~15次树结构变更后的树结构；下标0表示基线，不覆盖。
-MOCK_IMPACT_TREES_SEQUENCE = [None] + [
-    # 第1次操作后的树结构 - 原始impact-1.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "1": 0,
-                "-28.494 * HYP": 0.076351789675616
-            },
-            "Addition": {
-                "Division": {
-                    "0.00653 * VR": 0.0208902884673897,
-                    "Addition": {
-                        "-1.9105 * HYP": 0.210102360045851,
-                        "5.4189": 0
-                    }
-                },
-                "Addition": {
-                    "Division": {
-                        "Multiplication": {
-                            "Addition": {
-                                "0.6015 * QA": 0.0117584596321174,
-                                "2.3379 * HYP": 0.0228735360067907,
-                                "1.2977 * CA": 0.113928459255378,
-                                "10.458": 0
-                            },
-                            "Addition": {
-                                "Multiplication": {
-                                    "MA": 0.108972688038807,
-                                    "Addition": {
-                                        "1.2053 * UA": 0.108144059957083,
-                                        "1.4812 * OA": 0.00688842480665586,
-                                        "-1.9323": 0
-                                    },
-                                    "0.078141": 0
-                                }
-                            },
-                            "0.0053559": 0
-                        },
-                        "2.9628 * VR": 0.279624923755845
-                    },
-                    "0.93054": 0
-                }
-            }
-        }
-    },
-    # 第2次操作后的树结构 - 原始impact-2.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "Multiplication": {
-                    "Addition": {
-                        "1.2977 * CA": 0.113928459255378,
-                        "0.6015 * QA": 0.0117584596321172,
-                        "2.3379 * HYP": 0.0228735360067907,
-                        "10.458": 0
-                    },
-                    "Addition": {
-                        "Multiplication": {
-                            "MA": 0.108972688038807,
-                            "Addition": {
-                                "1.2053 * UA": 0.108144059957083,
-                                "1.4812 * OA": 0.00688842480665564,
-                                "-1.9323": 0
-                            },
-                            "-0.078141": 0
-                        },
-                        "-1.9323": 0
-                    },
-                    "0.0053559": 0
-                },
-                "2.9628 * VR": 0.279624923755845
-            },
-            "Addition": {
-                "Division": {
-                    "1": 0,
-                    "-28.494 * HYP": 0.0763517896756718
-                },
-                "Addition": {
-                    "Division": {
-                        "0.00653 * VR": 0.0208902884673899,
-                        "Addition": {
-                            "-1.9105 * HYP": 0.210102360045851,
-                            "5.4189": 0
-                        }
-                    },
-                    "0.93054": 0
-                }
-            }
-        }
-    },
-    # 第3次操作后的树结构 - 原始impact-3.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "0.00653 * VR": 0.0208902884673897,
-                "Addition": {
-                    "-1.9105 * HYP": 0.210102360045851,
-                    "5.4189": 0
-                }
-            },
-            "Addition": {
-                "Division": {
-                    "Multiplication": {
-                        "Addition": {
-                            "2.3379 * HYP": 0.0228735360067904,
-                            "1.2977 * CA": 0.113928459255379,
-                            "0.6015 * QA": 0.0117584596321172,
-                            "10.458": 0
-                        },
-                        "Addition": {
-                            "Multiplication": {
-                                "MA": 0.108972688038807,
-                                "Addition": {
-                                    "1.2053 * UA": 0.108144059957083,
-                                    "1.4812 * OA": 0.00688842480665564,
-                                    "-1.9323": 0
-                                },
-                                "-0.078141": 0
-                            },
-                            "-1.9323": 0
-                        },
-                        "0.0053559": 0
-                    },
-                    "2.9628 * VR": 0.279624923755845
-                },
-                "Addition": {
-                    "Division": {
-                        "1": 0,
-                        "-28.494 * HYP": 0.076351789675672
-                    },
-                    "0.93054": 0
-                }
-            }
-        }
-    },
-    # 第4次操作后的树结构 - 原始impact-4.json，转换为纯嵌套字典格式（避免重复键）
-    {
-        "Addition": {
-            "Division": {
-                "1": 0,
-                "-28.494 * HYP": 0.0763517896756716
-            },
-            "Addition": {
-                "Division": {
-                    "0.00653 * VR": 0.0208902884673897,
-                    "Addition": {
-                        "-1.9105 * HYP": 0.210102360045851,
-                        "5.4189": 0
-                    }
-                },
-                "Addition": {
-                    "Division": {
-                        "Multiplication": {
-                            "Addition": {
-                                "0.6015 * QA": 0.0117584596321174,
-                                "2.3379 * HYP": 0.0228735360067907,
-                                "1.2977 * CA": 0.113928459255378,
-                                "10.458": 0
-                            },
-                            "Addition": {
-                                "Multiplication": {
-                                    "MA": 0.108972688038807,
-                                    "Addition": {
-                                        "1.2053 * UA": 0.108144059957083,
-                                        "1.4812 * OA": 0.00688842480665586,
-                                        "-1.9323": 0
-                                    },
-                                    "-0.078141": 0
-                                },
-                                "-1.9323": 0
-                            },
-                            "0.0053559": 0
-                        },
-                        "2.9628 * VR": 0.279624923755845
-                    },
-                    "0.93054": 0
-                }
-            }
-        }
-    },
-    # 第5次操作后的树结构 - 原始impact-5.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Multiplication": {
-                "Addition": {
-                    "Division": {
-                        "1": 0,
-                        "-28.494 * HYP": 0.0733317696147618
-                    },
-                    "Addition": {
-                        "Division": {
-                            "0.00653 * VR": 0.0208950935373927,
-                            "Addition": {
-                                "-1.9105 * HYP": 0.247577708475269,
-                                "5.4189": 0
-                            }
-                        },
-                        "Addition": {
-                            "Division": {
-                                "Multiplication": {
-                                    "Addition": {
-                                        "0.6015 * QA": 0.00534718638286213,
-                                        "2.3379 * HYP": 0.0283254630009195,
-                                        "1.2977 * CA": 0.121817221428969,
-                                        "10.458": 0
-                                    },
-                                    "Addition": {
-                                        "Multiplication": {
-                                            "MA": 0.0812579052747987,
-                                            "Addition": {
-                                                "1.2053 * UA": 0.137119380648784,
-                                                "-1.9323": 0
-                                            },
-                                            "-0.078141": 0
-                                        },
-                                        "-1.9323": 0
-                                    },
-                                    "0.0053559": 0
-                                },
-                                "2.9628 * VR": 0.275874028734677
-                            },
-                            "0.93054": 0
-                        }
-                    }
-                },
-                "1.1499": 0
-            },
-            "-0.14436": 0
-        }
-    },
-    # 第6次操作后的树结构 - 原始impact-6.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "0.0075089 * VR": 0.0208950935373935,
-                "Addition": {
-                    "-1.9105 * HYP": 0.24757770847527,
-                    "5.4189": 0
-                }
-            },
-            "Addition": {
-                "Division": {
-                    "Multiplication": {
-                        "Addition": {
-                            "2.3379 * HYP": 0.0283254630009203,
-                            "1.2977 * CA": 0.121817221428969,
-                            "0.6015 * QA": 0.0053471863828628,
-                            "10.458": 0
-                        },
-                        "Addition": {
-                            "Multiplication": {
-                                "MA": 0.0812579052747997,
-                                "Addition": {
-                                    "1.2053 * UA": 0.137119380648785,
-                                    "-1.9323": 0
-                                },
-                                "-0.078141": 0
-                            },
-                            "-1.9323": 0
-                        },
-                        "0.0061587": 0
-                    },
-                    "2.9628 * VR": 0.275874028734678
-                },
-                "Addition": {
-                    "Division": {
-                        "1": 0,
-                        "-24.78 * HYP": 0.0733317696147628
-                    },
-                    "0.92566": 0
-                }
-            }
-        }
-    },
-    # 第7次操作后的树结构 - 原始impact-7.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Multiplication": {
-                "Addition": {
-                    "Division": {
-                        "0.0075089 * VR": 0.0196564510771616,
-                        "Addition": {
-                            "-1.9105 * HYP": 0.255861250843903,
-                            "5.4189": 0
-                        }
-                    },
-                    "Addition": {
-                        "Division": {
-                            "Multiplication": {
-                                "Addition": {
-                                    "2.3379 * HYP": 0.0245600888604456,
-                                    "1.2977 * CA": 0.134997651842973,
-                                    "10.458": 0
-                                },
-                                "Addition": {
-                                    "Multiplication": {
-                                        "MA": 0.0915664689038374,
-                                        "Addition": {
-                                            "1.2053 * UA": 0.139791872958965,
-                                            "-1.9323": 0
-                                        },
-                                        "-0.078141": 0
-                                    },
-                                    "-1.9323": 0
-                                },
-                                "0.0061587": 0
-                            },
-                            "2.9628 * VR": 0.264262090594079
-                        },
-                        "Addition": {
-                            "Division": {
-                                "1": 0,
-                                "-24.78 * HYP": 0.0996617689752506
-                            },
-                            "0.92566": 0
-                        }
-                    }
-                },
-                "1.0627": 0
-            },
-            "-0.059992": 0
-        }
-    },
-    # 第8次操作后的树结构 - 原始impact-8.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "Multiplication": {
-                    "Addition": {
-                        "2.3379 * HYP": 0.0245600888604455,
-                        "1.2977 * CA": 0.134997651842973,
-                        "10.458": 0
-                    },
-                    "Addition": {
-                        "Multiplication": {
-                            "MA": 0.0915664689038371,
-                            "Addition": {
-                                "1.2053 * UA": 0.139791872958965,
-                                "-1.9323": 0
-                            },
-                            "-0.078141": 0
-                        },
-                        "-1.9323": 0
-                    },
-                    "0.0065447": 0
-                },
-                "2.9628 * VR": 0.264262090594078
-            },
-            "Addition": {
-                "Division": {
-                    "1": 0,
-                    "-23.318 * HYP": 0.0996617689752501
-                },
-                "Addition": {
-                    "Division": {
-                        "0.0079795 * VR": 0.0196564510771611,
-                        "Addition": {
-                            "-1.9105 * HYP": 0.255861250843903,
-                            "5.4189": 0
-                        }
-                    },
-                    "0.92369": 0
-                }
-            }
-        }
-    },
-    # 第9次操作后的树结构 - 原始impact-9.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "0.0079795 * VR": 0.0196564510771614,
-                "Addition": {
-                    "-1.9105 * HYP": 0.255861250843903,
-                    "5.4189": 0
-                }
-            },
-            "Addition": {
-                "Division": {
-                    "Multiplication": {
-                        "Addition": {
-                            "2.3379 * HYP": 0.0245600888604458,
-                            "1.2977 * CA": 0.134997651842973,
-                            "10.458": 0
-                        },
-                        "Addition": {
-                            "Multiplication": {
-                                "MA": 0.091566468903837,
-                                "Addition": {
-                                    "1.2053 * UA": 0.139791872958965,
-                                    "-1.9323": 0
-                                },
-                                "-0.078141": 0
-                            },
-                            "-1.9323": 0
-                        },
-                        "0.0065447": 0
-                    },
-                    "2.9628 * VR": 0.264262090594078
-                },
-                "Addition": {
-                    "Division": {
-                        "1": 0,
-                        "-23.318 * HYP": 0.0996617689752507
-                    },
-                    "0.92369": 0
-                }
-            }
-        }
-    },
-    # 第10次操作后的树结构 - 原始impact-10.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "1": 0,
-                "-23.318 * HYP": 0.0996617689752504
-            },
-            "Addition": {
-                "Division": {
-                    "0.0079795 * VR": 0.0196564510771611,
-                    "Addition": {
-                        "-1.9105 * HYP": 0.255861250843903,
-                        "5.4189": 0
-                    }
-                },
-                "Addition": {
-                    "Division": {
-                        "Multiplication": {
-                            "Addition": {
-                                "2.3379 * HYP": 0.0245600888604455,
-                                "1.2977 * CA": 0.134997651842973,
-                                "10.458": 0
-                            },
-                            "Addition": {
-                                "Multiplication": {
-                                    "MA": 0.0915664689038371,
-                                    "Addition": {
-                                        "1.2053 * UA": 0.139791872958965,
-                                        "-1.9323": 0
-                                    },
-                                    "-0.078141": 0
-                                },
-                                "-1.9323": 0
-                            },
-                            "0.0065447": 0
-                        },
-                        "2.9628 * VR": 0.264262090594078
-                    },
-                    "0.92369": 0
-                }
-            }
-        }
-    },
-    # 第11次操作后的树结构 - 原始impact-11.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "Multiplication": {
-                    "Addition": {
-                        "2.3379 * HYP": 0.0245600888604455,
-                        "1.2977 * CA": 0.134997651842973,
-                        "10.458": 0
-                    },
-                    "Addition": {
-                        "Multiplication": {
-                            "MA": 0.0915664689038371,
-                            "Addition": {
-                                "1.2053 * UA": 0.139791872958965,
-                                "-1.9323": 0
-                            },
-                            "-0.078141": 0
-                        },
-                        "-1.9323": 0
-                    },
-                    "0.0065447": 0
-                },
-                "2.9628 * VR": 0.264262090594078
-            },
-            "Addition": {
-                "Division": {
-                    "1": 0,
-                    "-23.318 * HYP": 0.0996617689752501
-                },
-                "Addition": {
-                    "Division": {
-                        "0.0079795 * VR": 0.0196564510771611,
-                        "Addition": {
-                            "-1.9105 * HYP": 0.255861250843903,
-                            "5.4189": 0
-                        }
-                    },
-                    "0.92369": 0
-                }
-            }
-        }
-    },
-    # 第12次操作后的树结构 - 原始impact-12.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "0.0079795 * VR": 0.0196564510771614,
-                "Addition": {
-                    "-1.9105 * HYP": 0.255861250843903,
-                    "5.4189": 0
-                }
-            },
-            "Addition": {
-                "Division": {
-                    "Multiplication": {
-                        "Addition": {
-                            "2.3379 * HYP": 0.0245600888604458,
-                            "1.2977 * CA": 0.134997651842973,
-                            "10.458": 0
-                        },
-                        "Addition": {
-                            "Multiplication": {
-                                "MA": 0.091566468903837,
-                                "Addition": {
-                                    "1.2053 * UA": 0.139791872958965,
-                                    "-1.9323": 0
-                                },
-                                "-0.078141": 0
-                            },
-                            "-1.9323": 0
-                        },
-                        "0.0065447": 0
-                    },
-                    "2.9628 * VR": 0.264262090594078
-                },
-                "Addition": {
-                    "Division": {
-                        "1": 0,
-                        "-23.318 * HYP": 0.0996617689752507
-                    },
-                    "0.92369": 0
-                }
-            }
-        }
-    },
-    # 第13次操作后的树结构 - 原始impact-13.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "1": 0,
-                "-23.318 * HYP": 0.0996617689752504
-            },
-            "Addition": {
-                "Division": {
-                    "0.0079795 * VR": 0.0196564510771611,
-                    "Addition": {
-                        "-1.9105 * HYP": 0.255861250843903,
-                        "5.4189": 0
-                    }
-                },
-                "Addition": {
-                    "Division": {
-                        "Multiplication": {
-                            "Addition": {
-                                "2.3379 * HYP": 0.0245600888604455,
-                                "1.2977 * CA": 0.134997651842973,
-                                "10.458": 0
-                            },
-                            "Addition": {
-                                "Multiplication": {
-                                    "MA": 0.0915664689038371,
-                                    "Addition": {
-                                        "1.2053 * UA": 0.139791872958965,
-                                        "-1.9323": 0
-                                    },
-                                    "-0.078141": 0
-                                },
-                                "-1.9323": 0
-                            },
-                            "0.0065447": 0
-                        },
-                        "2.9628 * VR": 0.264262090594078
-                    },
-                    "0.92369": 0
-                }
-            }
-        }
-    },
-    # 第14次操作后的树结构 - 原始impact-14.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "Multiplication": {
-                    "Addition": {
-                        "2.3379 * HYP": 0.0245600888604455,
-                        "1.2977 * CA": 0.134997651842973,
-                        "10.458": 0
-                    },
-                    "Addition": {
-                        "Multiplication": {
-                            "MA": 0.0915664689038371,
-                            "Addition": {
-                                "1.2053 * UA": 0.139791872958965,
-                                "-1.9323": 0
-                            },
-                            "-0.078141": 0
-                        },
-                        "-1.9323": 0
-                    },
-                    "0.0065447": 0
-                },
-                "2.9628 * VR": 0.264262090594078
-            },
-            "Addition": {
-                "Division": {
-                    "1": 0,
-                    "-23.318 * HYP": 0.0996617689752501
-                },
-                "Addition": {
-                    "Division": {
-                        "0.0079795 * VR": 0.0196564510771611,
-                        "Addition": {
-                            "-1.9105 * HYP": 0.255861250843903,
-                            "5.4189": 0
-                        }
-                    },
-                    "0.92369": 0
-                }
-            }
-        }
-    },
-    # 第15次操作后的树结构 - 原始impact-15.json，转换为纯嵌套字典格式
-    {
-        "Addition": {
-            "Division": {
-                "0.0079795 * VR": 0.0196564510771614,
-                "Addition": {
-                    "-1.9105 * HYP": 0.255861250843903,
-                    "5.4189": 0
-                }
-            },
-            "Addition": {
-                "Division": {
-                    "Multiplication": {
-                        "Addition": {
-                            "2.3379 * HYP": 0.0245600888604458,
-                            "1.2977 * CA": 0.134997651842973,
-                            "10.458": 0
-                        },
-                        "Addition": {
-                            "Multiplication": {
-                                "MA": 0.091566468903837,
-                                "Addition": {
-                                    "1.2053 * UA": 0.139791872958965,
-                                    "-1.9323": 0
-                                },
-                                "-0.078141": 0
-                            },
-                            "-1.9323": 0
-                        },
-                        "0.0065447": 0
-                    },
-                    "2.9628 * VR": 0.264262090594078
-                },
-                "Addition": {
-                    "Division": {
-                        "1": 0,
-                        "-23.318 * HYP": 0.0996617689752507
-                    },
-                    "0.92369": 0
-                }
-            }
-        }
-    }
-]
-
-# 基于 impact_tree 生成中缀表达式（仅用于模拟）
-_OP_SYMBOL = {
-    "Addition": "+",
-    "Subtraction": "-",
-    "Multiplication": "*",
-    "Division": "/",
-}
-
-_VAR_RE = re.compile(r"^\s*([+-]?[0-9]*\.?[0-9]+)\s*\*\s*([A-Za-z_][A-Za-z0-9_]*)\s*$")
-
-
-def _term_to_expr(key: str) -> str:
-    try:
-        m = _VAR_RE.match(str(key))
-        if m:
-            coef, var = m.groups()
-            return f"({coef} * {var})"
-        float(key)
-        return str(key)
-    except Exception:
-        return str(key)
-
-
-def _build_expression_from_tree(node) -> str:
-    """
-    将 impact_tree 的嵌套字典结构转换为数学表达式字符串
-    
-    格式与 docs/tree.json 完全一致:
-    {"Addition": {"Division": {...}, "Addition": {...}, "0.93054": 0}}
-    """
-    if not isinstance(node, dict) or not node:
-        return "0"
-    
-    # 如果只有一个键
-    if len(node) == 1:
-        key = next(iter(node.keys()))
-        value = node[key]
-        
-        if key in _OP_SYMBOL:
-            # 这是一个操作符节点，value 包含子节点
-            if not isinstance(value, dict):
-                return "0"
-            
-            # 递归处理每个子节点
-            parts = []
-            for child_key, child_value in value.items():
-                if child_key in _OP_SYMBOL:
-                    # 子节点也是操作符，递归处理
-                    parts.append(_build_expression_from_tree({child_key: child_value}))
-                else:
-                    # 子节点是叶子节点（常数或变量）
-                    parts.append(_term_to_expr(child_key))
-            
-            if not parts:
-                return "0"
-            
-            # 根据操作符类型组合表达式
-            if key == "Addition":
-                return f"({(' + ').join(parts)})"
-            elif key == "Subtraction":
-                if len(parts) == 1:
-                    return f"(-{parts[0]})"
-                return f"({parts[0]} - {(' - ').join(parts[1:])})"
-            elif key == "Multiplication":
-                return f"({(' * ').join(parts)})"
-            elif key == "Division":
-                if len(parts) >= 2:
-                    # 除法：第一个是分子，其余的依次作为分母
-                    result = parts[0]
-                    for denom in parts[1:]:
-                        result = f"({result} / {denom})"
-                    return result
-                else:
-                    return f"({parts[0]})" if parts else "0"
-        else:
-            # 这是一个叶子节点
-            return _term_to_expr(key)
-    
-    # 如果有多个键，选择第一个键处理
-    first_key = next(iter(node.keys()))
-    return _build_expression_from_tree({first_key: node[first_key]})
-
-# 符号表达式树操作的模拟特征权重序列（不要从文件读取，直接内嵌）
-# 下标1..15分别对应第1~15次树结构变更后的特征权重；下标0表示基线，不覆盖。
-MOCK_WEIGHTS_SEQUENCE = [None] + [
-    [
-        {'feature': 'VR', 'importance': 0.40331375862937024},
-        {'feature': 'HYP', 'importance': 0.30740076820527074},
-        {'feature': 'UA', 'importance': 0.23746410777792382},
-        {'feature': 'CA', 'importance': 0.22610791660542262},
-        {'feature': 'MA', 'importance': 0.15483347260005331},
-        {'feature': 'QA', 'importance': 0.026878474944676545},
-        {'feature': 'OA', 'importance': 0.013918586597244875},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0}
-    ],
-    [
-        {'feature': 'VR', 'importance': 0.40331375862937047},
-        {'feature': 'HYP', 'importance': 0.30740076820527074},
-        {'feature': 'UA', 'importance': 0.23746410777792459},
-        {'feature': 'CA', 'importance': 0.22610791660542306},
-        {'feature': 'MA', 'importance': 0.15483347260005353},
-        {'feature': 'QA', 'importance': 0.026878474944676323},
-        {'feature': 'OA', 'importance': 0.013918586597245208},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0}
-    ],
-    [
-        {'feature': 'VR', 'importance': 0.40331375862937041},
-        {'feature': 'HYP', 'importance': 0.30740076820527051},
-        {'feature': 'UA', 'importance': 0.23746410777792437},
-        {'feature': 'CA', 'importance': 0.22610791660542284},
-        {'feature': 'MA', 'importance': 0.15483347260005331},
-        {'feature': 'QA', 'importance': 0.026878474944676323},
-        {'feature': 'OA', 'importance': 0.013918586597244986},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0}
-    ],
-    [
-        {'feature': 'VR', 'importance': 0.40331375862937041},
-        {'feature': 'HYP', 'importance': 0.30740076820527051},
-        {'feature': 'UA', 'importance': 0.23746410777792437},
-        {'feature': 'CA', 'importance': 0.22610791660542284},
-        {'feature': 'MA', 'importance': 0.15483347260005331},
-        {'feature': 'QA', 'importance': 0.026878474944676323},
-        {'feature': 'OA', 'importance': 0.013918586597244986},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'QA', 'importance': 0.026878474944676323},
-        {'feature': 'OA', 'importance': 0.013918586597244986},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'QA', 'importance': 0.026878474944676323},
-        {'feature': 'OA', 'importance': 0.013918586597244986},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'QA', 'importance': 0.026878474944676323},
-        {'feature': 'OA', 'importance': 0.013918586597244986},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'OA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0},
-        {'feature': 'QA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'OA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0},
-        {'feature': 'QA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'OA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0},
-        {'feature': 'QA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'OA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0},
-        {'feature': 'QA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'OA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0},
-        {'feature': 'QA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'OA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0},
-        {'feature': 'QA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'OA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0},
-        {'feature': 'QA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'OA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0},
-        {'feature': 'QA', 'importance': 0}
-    ],
-    [
-        {'feature': 'HYP', 'importance': 0.36678996351202248},
-        {'feature': 'VR', 'importance': 0.3610819114205992},
-        {'feature': 'UA', 'importance': 0.28351747274386141},
-        {'feature': 'CA', 'importance': 0.22066636862784783},
-        {'feature': 'MA', 'importance': 0.12704990635004476},
-        {'feature': 'MDA', 'importance': 0},
-        {'feature': 'QUE', 'importance': 0},
-        {'feature': 'CRA', 'importance': 0},
-        {'feature': 'OA', 'importance': 0},
-        {'feature': 'EPI', 'importance': 0},
-        {'feature': 'PC1', 'importance': 0},
-        {'feature': 'PB2', 'importance': 0},
-        {'feature': 'VG', 'importance': 0},
-        {'feature': 'RUT', 'importance': 0},
-        {'feature': 'GUA', 'importance': 0},
-        {'feature': 'AST', 'importance': 0},
-        {'feature': 'PIS', 'importance': 0},
-        {'feature': 'CCGA', 'importance': 0},
-        {'feature': 'CGA', 'importance': 0},
-        {'feature': 'NCGA', 'importance': 0},
-        {'feature': 'QA', 'importance': 0}
-    ]
-]
-
 def load_data_models():
     """加载所有数据模型"""
     models = []
@@ -1978,6 +544,75 @@ def get_data_model_file(model_id, file_type):
             'message': str(e)
         }), 500
 
+def _read_model_csv(model):
+    """读取数据模型关联的 CSV 数据"""
+    csv_name = (model.get('data_files') or {}).get('csv_data')
+    csv_path = os.path.join(CSV_DATA_DIR, csv_name) if csv_name else None
+    if not csv_path or not os.path.exists(csv_path):
+        raise ValueError('数据模型的CSV数据文件不存在，无法重新计算指标')
+    return pd.read_csv(csv_path)
+
+
+def _load_model_dataset(model, reg_content):
+    """读取数据模型的 CSV，按训练时的列与训练集占比返回 (X, y, 训练行数)"""
+    feature_columns = reg_content.get('feature_columns') or model.get('feature_columns') or []
+    target_column = reg_content.get('target_column') or model.get('target_column')
+    df = _read_model_csv(model)
+    missing = [col for col in list(feature_columns) + [target_column] if col not in df.columns]
+    if missing:
+        raise ValueError(f'CSV数据中缺少列: {missing}')
+    X = np.nan_to_num(df[feature_columns].to_numpy(dtype=np.float64), nan=0.0)
+    y = np.nan_to_num(df[target_column].to_numpy(dtype=np.float64), nan=0.0)
+    train_ratio = (reg_content.get('analysis_params') or model.get('analysis_params') or {}).get('train_ratio', 80)
+    return X, y, SymbolicRegression._train_size(len(y), train_ratio)
+
+
+def _apply_expr_tree_action(model, reg_content, action, node_path=None):
+    """
+    对回归模型执行一次表达式树编辑，写回表达式、指标、特征重要性与 impact_tree
+
+    编辑中的树（含各节点输出与历史版本）按数据模型ID缓存在进程内，连续编辑只重算被修改的路径；
+    历史版本以中缀表达式持久化在 expr_tree_history 中，进程重启后仍可撤销。
+    调用方须持有 tree_sessions.lock(model_id)（缓存的树由 apply 原地修改）
+    """
+    model_id = model.get('id')
+    expression = reg_content.get('expression_text') or ''
+    history = reg_content.get('expr_tree_history') or []
+    tree = tree_sessions.get(model_id, expression, len(history))
+    if tree is None:
+        X, y, n_train = _load_model_dataset(model, reg_content)
+        if not reg_content.get('feature_columns'):
+            reg_content['feature_columns'] = model.get('feature_columns') or []
+        tree = ExpressionTree.from_model(reg_content, X, y, n_train, history)
+    if not tree.apply(action, node_path):
+        return
+    summary = tree.summary()
+    target = reg_content.get('target_column') or reg_content.get('target_variable')
+    expression_latex = _wrap_latex(summary['expression_latex'], target)
+    reg_content.update({
+        'expression_text': summary['expression'],
+        'expression': expression_latex,
+        'expression_latex': expression_latex,
+        'constants': summary['constants'],
+        'detailed_metrics': summary['detailed_metrics'],
+        'feature_importance': summary['feature_importance'],
+        'impact_tree': summary['impact_tree'],
+        'model_complexity': summary['detailed_metrics']['model_length'],
+        'expr_tree_history': tree.history_expressions(),
+    })
+    tree_sessions.put(model_id, summary['expression'], tree)
+    metadata = model.setdefault('metadata', {})
+    metadata['pearson_r_test'] = summary['detailed_metrics']['pearson_r_test']
+    metadata['pearson_r_training'] = summary['detailed_metrics']['pearson_r_training']
+    metadata['model_complexity'] = summary['detailed_metrics']['model_length']
+    metadata['expr_tree_op_index'] = len(tree.history)
+    model.setdefault('symbolic_regression', {}).update({
+        'expression_latex': expression_latex,
+        'feature_importance': summary['feature_importance'],
+        'impact_tree': summary['impact_tree'],
+    })
+
+
 @data_models_bp.route('/models/<model_id>/files/<file_type>', methods=['PUT'])
 def update_data_model_file(model_id, file_type):
     """更新数据模型文件内容"""
@@ -2004,109 +639,55 @@ def update_data_model_file(model_id, file_type):
             if reg_filename:
                 reg_filepath = os.path.join(MODELS_DIR, reg_filename)
                 if os.path.exists(reg_filepath):
-                    # 读取现有内容
-                    with open(reg_filepath, 'r', encoding='utf-8') as f:
-                        reg_content = json.load(f)
+                    # 同一模型的读取 → 编辑 → 写回串行执行，并发请求不会同时修改缓存的表达式树
+                    with tree_sessions.lock(model.get('id')):
+                        # 读取现有内容
+                        with open(reg_filepath, 'r', encoding='utf-8') as f:
+                            reg_content = json.load(f)
                     
-                    # 更新字段
-                    if 'expression_latex' in data:
-                        reg_content['expression_latex'] = data['expression_latex']
-                    if 'expression' in data:
-                        reg_content['expression'] = data['expression']
-                    if 'constants' in data and isinstance(data['constants'], dict):
-                        reg_content['constants'] = data['constants']
-                    if 'feature_importance' in data and isinstance(data['feature_importance'], list):
-                        reg_content['feature_importance'] = data['feature_importance']
-                    if 'impact_tree' in data:
-                        reg_content['impact_tree'] = data['impact_tree']
-                    # 表达式树操作驱动的指标轮换/撤销
-                    action = (data or {}).get('expr_tree_action')
-                    # 初始化基线指标、特征权重和树结构
-                    if 'baseline_detailed_metrics' not in reg_content:
-                        reg_content['baseline_detailed_metrics'] = reg_content.get('detailed_metrics') or {}
-                    if 'baseline_feature_importance' not in reg_content:
-                        reg_content['baseline_feature_importance'] = reg_content.get('feature_importance') or []
-                    if 'baseline_impact_tree' not in reg_content:
-                        # 确保基线impact_tree总是使用正确的初始树结构数据
-                        reg_content['baseline_impact_tree'] = BASELINE_IMPACT_TREE
-                    op_index = int(model.get('metadata', {}).get('expr_tree_op_index', 0) or 0)
-                    new_index = op_index
-                    if action in ('delete', 'simplify', 'optimize'):
-                        new_index = op_index + 1
-                        # 超过15次：指标固定为第15次的值，但索引持续增长，确保无限撤销回滚可用
-                        idx = new_index if new_index <= 15 else 15
-                        if idx > 0:
-                            seq_metrics = MOCK_INDICATORS_SEQUENCE[idx]
-                            seq_weights = MOCK_WEIGHTS_SEQUENCE[idx]
-                            seq_tree = MOCK_IMPACT_TREES_SEQUENCE[idx]
-                            if isinstance(seq_metrics, dict):
-                                reg_content['detailed_metrics'] = seq_metrics
-                                model.setdefault('metadata', {})['pearson_r_test'] = seq_metrics.get('pearson_r_test')
-                                model['metadata']['pearson_r_training'] = seq_metrics.get('pearson_r_training')
-                            if isinstance(seq_weights, list):
-                                reg_content['feature_importance'] = seq_weights
-                            if isinstance(seq_tree, dict):
-                                reg_content['impact_tree'] = seq_tree
-                                # 同步表达式（用于前端以表达式为源生成 AST），并清空旧的 LaTeX 以避免覆盖
-                                try:
-                                    reg_content['expression'] = _build_expression_from_tree(seq_tree)
-                                    reg_content['expression_latex'] = ''
-                                except Exception:
-                                    reg_content['expression_latex'] = ''
-                        model.setdefault('metadata', {})['expr_tree_op_index'] = new_index
-                    elif action == 'undo':
-                        new_index = max(0, op_index - 1)
-                        if new_index == 0:
-                            base = reg_content.get('baseline_detailed_metrics') or {}
-                            base_weights = reg_content.get('baseline_feature_importance') or []
-                            base_tree = reg_content.get('baseline_impact_tree') or {}
-                            if base:
-                                reg_content['detailed_metrics'] = base
-                                model.setdefault('metadata', {})['pearson_r_test'] = base.get('pearson_r_test')
-                                model['metadata']['pearson_r_training'] = base.get('pearson_r_training')
-                            if base_weights:
-                                reg_content['feature_importance'] = base_weights
-                            if base_tree:
-                                reg_content['impact_tree'] = base_tree
+                        action = (data or {}).get('expr_tree_action')
+                        if 'baseline_detailed_metrics' not in reg_content:
+                            reg_content['baseline_detailed_metrics'] = reg_content.get('detailed_metrics') or {}
+                        if 'baseline_feature_importance' not in reg_content:
+                            reg_content['baseline_feature_importance'] = reg_content.get('feature_importance') or []
+                        if action in EXPR_TREE_ACTIONS:
+                            # 表达式树操作：在已保存的表达式上执行真实编辑（忽略前端提交的表达式与指标），
+                            # 并基于模型 CSV 重算指标、特征重要性与节点影响力
+                            try:
+                                _apply_expr_tree_action(model, reg_content, action, data.get('node_path'))
+                            except ValueError as e:
+                                return jsonify({'success': False, 'error': str(e)}), 400
                         else:
-                            # 对超过 15 的索引进行截断（>=15 视同第15次的指标），支持无限撤销
-                            idx = new_index if new_index <= 15 else 15
-                            seq_metrics = MOCK_INDICATORS_SEQUENCE[idx]
-                            seq_weights = MOCK_WEIGHTS_SEQUENCE[idx]
-                            seq_tree = MOCK_IMPACT_TREES_SEQUENCE[idx]
-                            if isinstance(seq_metrics, dict):
-                                reg_content['detailed_metrics'] = seq_metrics
-                                model.setdefault('metadata', {})['pearson_r_test'] = seq_metrics.get('pearson_r_test')
-                                model['metadata']['pearson_r_training'] = seq_metrics.get('pearson_r_training')
-                            if isinstance(seq_weights, list):
-                                reg_content['feature_importance'] = seq_weights
-                            if isinstance(seq_tree, dict):
-                                reg_content['impact_tree'] = seq_tree
-                                try:
-                                    reg_content['expression'] = _build_expression_from_tree(seq_tree)
-                                    reg_content['expression_latex'] = ''
-                                except Exception:
-                                    reg_content['expression_latex'] = ''
-                        model.setdefault('metadata', {})['expr_tree_op_index'] = new_index
-                    else:
-                        # 允许直接设置详细指标（不建议在表达式树操作路径外使用）
-                        if 'detailed_metrics' in data and isinstance(data['detailed_metrics'], dict):
-                            reg_content['detailed_metrics'] = data['detailed_metrics']
-                        if 'feature_importance' in data and isinstance(data['feature_importance'], list):
-                            reg_content['feature_importance'] = data['feature_importance']
-                        if 'impact_tree' in data and isinstance(data['impact_tree'], dict):
-                            reg_content['impact_tree'] = data['impact_tree']
-                    if 'updated_at' in data:
-                        reg_content['updated_at'] = data['updated_at']
+                            # 更新字段
+                            if 'expression_latex' in data:
+                                reg_content['expression_latex'] = data['expression_latex']
+                            if 'expression' in data:
+                                reg_content['expression'] = data['expression']
+                            if 'constants' in data and isinstance(data['constants'], dict):
+                                reg_content['constants'] = data['constants']
+                            if 'feature_importance' in data and isinstance(data['feature_importance'], list):
+                                reg_content['feature_importance'] = data['feature_importance']
+                            if 'impact_tree' in data:
+                                reg_content['impact_tree'] = data['impact_tree']
+                            # 允许直接设置详细指标（不建议在表达式树操作路径外使用）
+                            if 'detailed_metrics' in data and isinstance(data['detailed_metrics'], dict):
+                                reg_content['detailed_metrics'] = data['detailed_metrics']
+                        if 'updated_at' in data:
+                            reg_content['updated_at'] = data['updated_at']
                     
-                    # 写回文件
-                    with open(reg_filepath, 'w', encoding='utf-8') as f:
-                        json.dump(reg_content, f, ensure_ascii=False, indent=2)
-                    # 若有更新元数据（pearson_r_* / expr_tree_op_index），同步保存主模型文件
-                    save_data_model(model)
+                        # 写回文件
+                        with open(reg_filepath, 'w', encoding='utf-8') as f:
+                            json.dump(reg_content, f, ensure_ascii=False, indent=2)
+                        # 若有更新元数据（pearson_r_* / expr_tree_op_index），同步保存主模型文件
+                        save_data_model(model)
                     
                     logger.info(f"回归模型文件已更新: {reg_filename}")
-                    return jsonify({'success': True, 'message': '回归模型文件更新成功'})
+                    response = {'success': True, 'message': '回归模型文件更新成功'}
+                    if action in EXPR_TREE_ACTIONS:
+                        # 返回编辑后的中缀表达式与 impact_tree，前端据此重建 AST，保证后续 node_path 与后端一致
+                        response['expression_text'] = reg_content.get('expression_text') or ''
+                        response['impact_tree'] = reg_content.get('impact_tree')
+                    return jsonify(response)
                 else:
                     return jsonify({
                         'success': False,
@@ -2399,6 +980,80 @@ def analyze():
         set_seed_randomly = data.get('set_seed_randomly', False)
         seed_value = int(data.get('seed', 42))
         data_source = data.get('data_source', '数据源')
+        # 适应度评估工作进程数：<= 0 表示使用配置允许的全部核心
+        max_workers = get_config_value('algorithm.max_workers', 1)
+        workers = int(data.get('workers', 1))
+        workers = max_workers if workers <= 0 else min(workers, max_workers)
+        # 岛屿模型参数：islands > 1 时各岛在独立进程中进化 population_size 个个体
+        islands = max(1, int(data.get('islands', 1)))
+        migration_interval = max(1, int(data.get('migration_interval', 10)))
+        migration_size = max(0, int(data.get('migration_size', 5)))
+        # 子树输出缓存（仅单进程评估时生效）
+        subtree_cache = bool(data.get('subtree_cache', False))
+        cache_max_bytes = get_config_value('algorithm.subtree_cache_max_mb', 256) * 1024 * 1024
+        # 常数优化：每代对最优的 top_k 个个体执行 LM
+        constant_optimization_top_k = max(0, int(data.get('constant_optimization_top_k', 10)))
+        constant_optimization_iterations = max(0, int(data.get('constant_optimization_iterations', 10)))
+        # 线性缩放：适应度按最优仿射变换 a + b·f 计算，a、b 写入 constants
+        linear_scaling = bool(data.get('linear_scaling', False))
+        # 语义去重（共享评估）与基于去重的多样性替换
+        semantic_dedup = bool(data.get('semantic_dedup', False))
+        semantic_diversity = bool(data.get('semantic_diversity', False))
+        # 检查点：每隔 checkpoint_interval 代写入 models/checkpoints，可通过 /resume 续跑
+        checkpoint_interval = max(0, int(data.get('checkpoint_interval', 0)))
+        # 多目标模式：返回误差与复杂度（length / depth）的整个 Pareto 前沿
+        multi_objective = bool(data.get('multi_objective', False))
+        pareto_objectives = data.get('pareto_objectives') or ['length']
+        # 大数据集：小批量轮转抽样 + 连续减半，只对有希望的个体做全量评估
+        racing = bool(data.get('racing', False))
+        racing_min_rows = data.get('racing_min_rows')
+        racing_min_rows = max(1, int(racing_min_rows)) if racing_min_rows else None
+        racing_eta = data.get('racing_eta')
+        racing_eta = max(2, int(racing_eta)) if racing_eta else None
+        # 评估精度：float32 时搜索阶段单精度评估，最终名人堂以 float64 重新评分
+        precision = str(data.get('precision', 'float64'))
+        if precision not in ('float64', 'float32'):
+            return jsonify({
+                'error': '参数错误',
+                'message': f'不支持的评估精度: {precision}'
+            }), 400
+        
+        # 交叉验证模式：按划分参数在独立进程中并行训练各折，返回各折结果与汇总指标（不创建数据模型）
+        cv_spec = data.get('cross_validation')
+        if cv_spec:
+            cv_spec = cv_spec if isinstance(cv_spec, dict) else {'method': 'kfold'}
+            X, y = _get_regression_engine()._prepare_data({'data': input_data}, target_column, feature_columns)
+            engine_params = {
+                'population_size': population_size,
+                'generations': generations,
+                'max_tree_depth': max_tree_depth,
+                'max_tree_length': max_tree_length,
+                'grammar': symbolic_expression_grammar,
+                'subtree_cache': subtree_cache,
+                'cache_max_bytes': cache_max_bytes,
+                'constant_optimization_top_k': constant_optimization_top_k,
+                'constant_optimization_iterations': constant_optimization_iterations,
+                'linear_scaling': linear_scaling,
+                'semantic_dedup': semantic_dedup,
+                'semantic_diversity': semantic_diversity,
+                'multi_objective': multi_objective,
+                'pareto_objectives': pareto_objectives,
+                'racing': racing,
+                'racing_min_rows': racing_min_rows,
+                'racing_eta': racing_eta,
+                'precision': precision,
+            }
+            try:
+                cv_result = cross_validate(X, y, feature_columns, cv_spec, engine_params,
+                                           seed=seed_value, workers=workers)
+            except ValueError as e:
+                return jsonify({'error': '参数错误', 'message': str(e)}), 400
+            cv_result.update(target_column=target_column, feature_columns=feature_columns, seed=seed_value)
+            logger.info(f"交叉验证完成: {cv_result['n_folds']} 折，耗时 {cv_result['elapsed']}s")
+            return jsonify({
+                'success': True,
+                'result': {'cross_validation': cv_result}
+            })
         
         logger.info(f"开始符号回归分析，目标变量: {target_column}")
         logger.info(f"特征变量: {feature_columns}")
@@ -2406,194 +1061,65 @@ def analyze():
         logger.info(f"输入数据类型: {type(input_data)}")
         logger.info(f"输入数据内容: {input_data}")
         
-        # 模拟处理时间
-        time.sleep(2)
-        
-        # 根据随机种子参数设置随机数生成
+        # 种子只传给本次运行的随机数流树（utils.rng），不修改进程级全局随机状态，
+        # 多个请求在 threaded 模式下并发执行时互不干扰
         if not set_seed_randomly:
             # 固定模式：使用用户提供或默认的固定种子
-            random.seed(seed_value)
-            np.random.seed(seed_value)
             logger.info(f"使用固定随机种子: {seed_value}")
         else:
             # 随机模式：前端会下发随机生成的seed，这里也记录并使用该seed
-            random.seed(seed_value)
-            np.random.seed(seed_value)
             logger.info(f"使用随机种子（每次随机生成）: {seed_value}")
         
-        # 生成模拟结果（改为固定的复杂表达式，便于前端验证树形展示）
-        model_id = int(time.time())
-        expression = (
-            "(((((1.9105 * HYP + ((((0.6015 * QA + 0.42745 * HYP) + 1.2977 * CA) - (-10.458))))"
-            " * (-1.9323 + -0.078141 * MA * (((-1.9323 + 1.4812 * OA) + 0.59744 * UA) + 0.60783 * UA)))"
-            " / (2.9628 * VR) - 2.6756 / (0.40832 * HYP)) + (1.2192 * VR) / (5.4189 - 1.9105 * HYP))"
-            " * 0.0053559 + 0.93054)"
+        # 执行遗传规划符号回归（seed 由前端在两种模式下都会下发，直接用于引擎）
+        regression = _get_regression_engine().analyze(
+            {'data': input_data}, target_column, feature_columns,
+            population_size=population_size, generations=generations,
+            set_seed_randomly=False, max_tree_depth=max_tree_depth,
+            max_tree_length=max_tree_length,
+            symbolic_expression_grammar=symbolic_expression_grammar,
+            train_ratio=train_ratio, seed=seed_value, workers=workers, islands=islands,
+            migration_interval=migration_interval, migration_size=migration_size,
+            subtree_cache=subtree_cache, cache_max_bytes=cache_max_bytes,
+            constant_optimization_top_k=constant_optimization_top_k,
+            constant_optimization_iterations=constant_optimization_iterations,
+            linear_scaling=linear_scaling, semantic_dedup=semantic_dedup,
+            semantic_diversity=semantic_diversity, checkpoint_interval=checkpoint_interval,
+            multi_objective=multi_objective, pareto_objectives=pareto_objectives,
+            racing=racing, racing_min_rows=racing_min_rows, racing_eta=racing_eta,
+            precision=precision, save=False
         )
-
-        # 对应的 LaTeX 公式（不包含 $ 包裹，直接插入 MathJax 块环境）
-        # 使用正确的 MathJax 格式，包含 \cfrac 和 \text{} 等
-        latex_expression = (
-            r"\begin{align*} \nonumber HDL & =  \left(  \left(  \left(  \cfrac{  \left( c_{0}  \cdot\text{HYP} +  \left(  \left(  \left( c_{1}  \cdot\text{QA} + c_{2}  \cdot\text{HYP} \right)  + c_{3}  \cdot\text{CA} \right)  - c_{4} \right)  \right)  \cdot  \left( c_{5} + c_{6}  \cdot\text{MA} \cdot  \left(  \left(  \left( c_{7} + c_{8}  \cdot\text{OA} \right)  + c_{9}  \cdot\text{UA} \right)  + c_{10}  \cdot\text{UA} \right)  \right) }{c_{11}  \cdot\text{VR} }  -  \cfrac{ c_{12}}{c_{13}  \cdot\text{HYP} }  \right)  +  \cfrac{ c_{14}  \cdot\text{VR}}{ \left( c_{15} - c_{16}  \cdot\text{HYP} \right)  }  \right)  \cdot c_{17} + c_{18} \right) \end{align*}"
-        )
-        
-        # 生成特征影响力：使用基线特征权重数据
-        feature_importance = MOCK_WEIGHTS_BASELINE.copy()
-        
-        # 生成节点影响力数据（写死到代码中，对应树结构）
-        # 注意：从上到下对应树分叉从左到右，同名节点不是同一个，要根据位置分配重要性
-        # 使用逐步构建的方法，避免语法错误
-        impact_tree = {}
-        
-        # 第一步：创建根节点
-        impact_tree["Addition"] = {}
-        
-        # 第二步：添加第二层
-        impact_tree["Addition"]["Multiplication"] = {}
-        
-        # 第三步：添加第三层
-        impact_tree["Addition"]["Multiplication"]["Addition"] = {}
-        
-        # 第四步：添加第四层
-        impact_tree["Addition"]["Multiplication"]["Addition"]["Subtraction"] = {}
-        
-        # 第五步：添加第五层
-        impact_tree["Addition"]["Multiplication"]["Addition"]["Subtraction"]["Division"] = {}
-        
-        # 第六步：添加第六层 - 这是缺失的关键层
-        impact_tree["Addition"]["Multiplication"]["Addition"]["Subtraction"]["Division"]["Multiplication"] = {}
-        
-        # 第七步：添加左侧子树
-        impact_tree["Addition"]["Multiplication"]["Addition"]["Subtraction"]["Division"]["Multiplication"]["Addition"] = {
-            "1.9105 * HYP": 0.0157069022188682,
-            "Subtraction": {
-                "Addition": {
-                    "Addition": {
-                        "0.6015 * QA": 0.011758459632117,
-                        "0.4274 * HYP": 0.00120390671170711
-                    },
-                    "1.2977 * CA": 0.113928459255378
-                },
-                "-10.458": 0
-            }
-        }
-        
-        # 第八步：添加右侧子树
-        impact_tree["Addition"]["Multiplication"]["Addition"]["Subtraction"]["Division"]["Multiplication"]["Addition"]["Addition"] = {
-            "-1.9323": 0,
-            "Multiplication": {
-                "-0.0781 * MA": 0.108972688038807,
-                "Addition": {
-                    "Addition": {
-                        "Addition": {
-                            "-1.9323": 0,
-                            "1.4812 * OA": 0.00688842480665608
-                        },
-                        "0.5974 * UA": 0.0111402882791509
-                    },
-                    "0.6078 * UA": 0.0120783966067667
-                }
-            }
-        }
-        
-        # 第九步：添加VR节点
-        impact_tree["Addition"]["Multiplication"]["Addition"]["Subtraction"]["Division"]["2.9628 * VR"] = 0.279624923755846
-        
-        # 第十步：添加其他Division节点
-        impact_tree["Addition"]["Multiplication"]["Addition"]["Subtraction"]["Division"]["Division"] = {
-            "2.6756": 0,
-            "0.4083 * HYP": 0.0763517896756712
-        }
-        
-        # 第十一步：添加其他Division节点
-        impact_tree["Addition"]["Multiplication"]["Addition"]["Division"] = {
-            "1.2192 * VR": 0.0208902884673905,
-            "Subtraction": {
-                "5.4189": 0,
-                "1.9105 * HYP": 0.21010236004585
-            }
-        }
-        
-        # 最后：添加常数节点
-        impact_tree["Addition"]["Multiplication"]["0.0054"] = 0
-        impact_tree["Addition"]["0.9305"] = 0
-        
-        # 生成预测结果
-        predictions = []
-        for i, row in enumerate(input_data):  # 处理所有数据行
-            # 对于列表格式的数据，我们生成随机值作为预测结果
-            actual = random.uniform(1.5, 3.0)
-            predicted = actual + random.uniform(-0.3, 0.3)
-            predictions.append({
-                "actual": round(actual, 3),
-                "predicted": round(predicted, 3)
-            })
-        
-        # 生成常数 - 固定为给定的 19 个常数
-        # 使用 c{index} 形式的键名，避免前端误解析为 c_0 与 c{0} 的不同含义
-        constants = {
-            'c{0}': 1.9105,
-            'c{1}': 0.6015,
-            'c{2}': 0.42745,
-            'c{3}': 1.2977,
-            'c{4}': -10.458,
-            'c{5}': -1.9323,
-            'c{6}': -0.078141,
-            'c{7}': -1.9323,
-            'c{8}': 1.4812,
-            'c{9}': 0.59744,
-            'c{10}': 0.60783,
-            'c{11}': 2.9628,
-            'c{12}': 2.6756,
-            'c{13}': 0.40832,
-            'c{14}': 1.2192,
-            'c{15}': 5.4189,
-            'c{16}': 1.9105,
-            'c{17}': 0.0053559,
-            'c{18}': 0.93054,
-        }
         
-        # 生成详细的性能指标（使用完整精度数据）
-        detailed_metrics = {
-            "average_relative_error_test": 2.74596305113801,
-            "average_relative_error_training": 2.3574806852981,
-            "mean_absolute_error_test": 0.020585454497077455,
-            "mean_absolute_error_training": 0.018182586660249116,
-            "mean_squared_error_test": 0.00073464638025446652,
-            "mean_squared_error_training": 0.00053687909383770213,
-            "model_depth": 14,
-            "model_length": 39,
-            "normalized_mean_squared_error_test": 0.14358163045309325,
-            "normalized_mean_squared_error_training": 0.12666355569075077,
-            "pearson_r_test": 0.86776941659869866,
-            "pearson_r_training": 0.87333644430924906,
-            "root_mean_squared_error_test": 0.027104360908430703,
-            "root_mean_squared_error_training": 0.023170651562649292
-        }
-        
-        result = {
-            "id": model_id,
-            "expression": expression,
-            "expression_latex": latex_expression,
-            "target_variable": "HDL",
-            "constants": constants,
-            "feature_importance": feature_importance,
-            "impact_tree": impact_tree,
-            "predictions": predictions,
-            "training_time": round(random.uniform(3.0, 8.0), 1),
-            "model_complexity": len(feature_columns[:min(3, len(feature_columns))]),
-            "detailed_metrics": detailed_metrics,
-            "analysis_params": {
-                "population_size": population_size,
-                "generations": generations,
-                "max_tree_depth": max_tree_depth,
-                "max_tree_length": max_tree_length,
-                "symbolic_expression_grammar": symbolic_expression_grammar,
-                "train_ratio": train_ratio,
-                "set_seed_randomly": set_seed_randomly,
-                "seed": seed_value,
-                "seed_mode": "随机" if set_seed_randomly else "固定"
-            }
+        analysis_params = {
+            "population_size": population_size,
+            "generations": generations,
+            "max_tree_depth": max_tree_depth,
+            "max_tree_length": max_tree_length,
+            "symbolic_expression_grammar": symbolic_expression_grammar,
+            "train_ratio": train_ratio,
+            "set_seed_randomly": set_seed_randomly,
+            "seed": seed_value,
+            "seed_mode": "随机" if set_seed_randomly else "固定",
+            "workers": regression['parameters']['workers'],
+            "islands": islands,
+            "migration_interval": migration_interval,
+            "migration_size": migration_size,
+            "subtree_cache": regression['parameters']['subtree_cache'],
+            "constant_optimization_top_k": constant_optimization_top_k,
+            "constant_optimization_iterations": constant_optimization_iterations,
+            "linear_scaling": linear_scaling,
+            "semantic_dedup": semantic_dedup,
+            "semantic_diversity": semantic_diversity,
+            "checkpoint_interval": checkpoint_interval,
+            "multi_objective": multi_objective,
+            "pareto_objectives": pareto_objectives,
+            "racing": racing,
+            "racing_min_rows": racing_min_rows,
+            "racing_eta": racing_eta,
+            "precision": regression['precision']
         }
+        result = _regression_response(regression, target_column, analysis_params)
+        expression = result['expression']
+        latex_expression = result['expression_latex']
         
         # 自动创建数据模型
         try:
@@ -2627,23 +1153,27 @@ def analyze():
             
             # 准备符号回归模型数据（写入 MathJax 公式 expression_latex）
             def _to_latex(expr_text, target):
-                # 这里保存一份与前端一致的 MathJax 公式，使用正确的格式
-                # 包含 \cfrac 和 \text{} 等，确保与API返回格式一致
-                return r"\begin{align*} \nonumber HDL & =  \left(  \left(  \left(  \cfrac{  \left( c_{0}  \cdot\text{HYP} +  \left(  \left(  \left( c_{1}  \cdot\text{QA} + c_{2}  \cdot\text{HYP} \right)  + c_{3}  \cdot\text{CA} \right)  - c_{4} \right)  \right)  \cdot  \left( c_{5} + c_{6}  \cdot\text{MA} \cdot  \left(  \left(  \left( c_{7} + c_{8}  \cdot\text{OA} \right)  + c_{9}  \cdot\text{UA} \right)  + c_{10}  \cdot\text{UA} \right)  \right) }{c_{11}  \cdot\text{VR} }  -  \cfrac{ c_{12}}{c_{13}  \cdot\text{HYP} }  \right)  +  \cfrac{ c_{14}  \cdot\text{VR}}{ \left( c_{15} - c_{16}  \cdot\text{HYP} \right)  }  \right)  \cdot c_{17} + c_{18} \right) \end{align*}"
+                # 与API返回的 expression_latex 保持一致
+                return latex_expression
             regression_model = {
                 'id': model_id,
                 'expression_text': expression,
                 'expression': _to_latex(expression, target_column or 'Y'),
                 'expression_latex': _to_latex(expression, target_column or 'Y'),
                 'target_variable': target_column,
-                'constants': constants,
+                'constants': result['constants'],
                 'feature_importance': result['feature_importance'],
                 'impact_tree': result['impact_tree'],
                 'predictions': result['predictions'],
                 'training_time': result['training_time'],
+                'cache_hit_rate': result['cache_hit_rate'],
+                'cache_bytes': result['cache_bytes'],
+                'racing_stats': result['racing_stats'],
                 'model_complexity': result['model_complexity'],
                 'detailed_metrics': result['detailed_metrics'],
                 'baseline_detailed_metrics': result['detailed_metrics'],
+                'run_id': result['run_id'],
+                'pareto_front': result['pareto_front'],
                 'target_column': target_column,
                 'feature_columns': feature_columns,
                 'analysis_params': {
@@ -2655,7 +1185,21 @@ def analyze():
                     'train_ratio': train_ratio,
                     'set_seed_randomly': set_seed_randomly,
                     'seed': seed_value,
-                    'seed_mode': '随机' if set_seed_randomly else '固定'
+                    'seed_mode': '随机' if set_seed_randomly else '固定',
+                    'workers': regression['parameters']['workers'],
+                    'islands': islands,
+                    'migration_interval': migration_interval,
+                    'migration_size': migration_size,
+                    'subtree_cache': regression['parameters']['subtree_cache'],
+                    'constant_optimization_top_k': constant_optimization_top_k,
+                    'constant_optimization_iterations': constant_optimization_iterations,
+                    'linear_scaling': linear_scaling,
+                    'semantic_dedup': semantic_dedup,
+                    'semantic_diversity': semantic_diversity,
+                    'multi_objective': multi_objective,
+                    'pareto_objectives': pareto_objectives,
+                    'racing': racing,
+                    'precision': regression['precision']
                 },
                 'created_at': time.time()
             }
@@ -2697,7 +1241,21 @@ def analyze():
                     'train_ratio': train_ratio,
                     'set_seed_randomly': set_seed_randomly,
                     'seed': seed_value,
-                    'seed_mode': '随机' if set_seed_randomly else '固定'
+                    'seed_mode': '随机' if set_seed_randomly else '固定',
+                    'workers': regression['parameters']['workers'],
+                    'islands': islands,
+                    'migration_interval': migration_interval,
+                    'migration_size': migration_size,
+                    'subtree_cache': regression['parameters']['subtree_cache'],
+                    'constant_optimization_top_k': constant_optimization_top_k,
+                    'constant_optimization_iterations': constant_optimization_iterations,
+                    'linear_scaling': linear_scaling,
+                    'semantic_dedup': semantic_dedup,
+                    'semantic_diversity': semantic_diversity,
+                    'multi_objective': multi_objective,
+                    'pareto_objectives': pareto_objectives,
+                    'racing': racing,
+                    'precision': regression['precision']
                 },
                 'data_files': {
                     'csv_data': f"{model_id}_data.csv",
@@ -2731,6 +1289,10 @@ def analyze():
         except Exception as e:
             logger.error(f"创建数据模型失败: {e}")
         
+        # Pareto 前沿成员各自保存为引用本次运行（及数据模型）的轻量条目
+        if multi_objective:
+            _get_regression_engine().save_pareto_front(regression, result.get('data_model_id'))
+        
         logger.info("符号回归分析完成")
         return jsonify({
             'success': True,
@@ -2746,6 +1308,82 @@ def analyze():
             'details': traceback.format_exc()
         }), 500
 
+_regression_engine = None
+
+
+def _get_regression_engine():
+    """惰性创建符号回归引擎（避免导入路由模块时扫描模型目录）"""
+    global _regression_engine
+    if _regression_engine is None:
+        _regression_engine = SymbolicRegression()
+    return _regression_engine
+
+
+_monte_carlo_engine = None
+
+
+def _get_monte_carlo_engine():
+    """惰性创建蒙特卡洛分析引擎（与路由共用同一个符号回归引擎）"""
+    global _monte_carlo_engine
+    if _monte_carlo_engine is None:
+        _monte_carlo_engine = MonteCarloAnalysis(_get_regression_engine())
+    return _monte_carlo_engine
+
+
+def _monte_carlo_ranges(req_ranges, features):
+    """前端的成分范围 {成分: {min, max}} 转为 {成分: [min, max]}；未指定上界时取 min + 1，未指定的成分为 [0, 1]"""
+    ranges = {}
+    for name in features:
+        vr = req_ranges.get(name) or {}
+        vmin = float(vr['min']) if vr.get('min') is not None else 0.0
+        vmax = float(vr['max']) if vr.get('max') is not None else vmin + 1.0
+        if vmax < vmin:
+            raise ValueError(f'成分 {name} 的范围上界小于下界')
+        ranges[name] = [vmin, vmax]
+    return ranges
+
+
+def _wrap_latex(expression_latex, target_column):
+    """将表达式 LaTeX 包装为前端使用的 MathJax align 环境"""
+    target = target_column or 'Y'
+    return rf"\begin{{align*}} \nonumber {target} & = {expression_latex} \end{{align*}}"
+
+def _regression_response(regression, target_column, analysis_params):
+    """将 SymbolicRegression 的结果整理为 /analyze、/resume 返回给前端的结构"""
+    detailed_metrics = regression['detailed_metrics']
+    cache_stats = regression['cache_stats'] or {}
+    return {
+        "id": int(time.time()),
+        "run_id": regression.get('run_id'),
+        "expression": regression['expression'],
+        # 对应的 LaTeX 公式（不包含 $ 包裹，直接插入 MathJax 块环境）
+        "expression_latex": _wrap_latex(regression['expression_latex'], target_column),
+        "target_variable": target_column,
+        "constants": regression['constants'],
+        "feature_importance": regression['feature_importance'],
+        "impact_tree": regression['impact_tree'],
+        "predictions": [
+            {"actual": actual, "predicted": predicted}
+            for actual, predicted in zip(regression['predictions']['actual'],
+                                         regression['predictions']['predicted'])
+        ],
+        "training_time": regression['training_time'],
+        "cache_hit_rate": cache_stats.get('hit_rate'),
+        "cache_bytes": cache_stats.get('bytes'),
+        # 每代后代中语义重复的比例（未启用语义去重时为空列表）
+        "duplicate_ratios": [record['duplicate_ratio'] for record in regression['history']
+                             if 'duplicate_ratio' in record],
+        # 连续减半评估的行评估次数与相对全量评估节省的比例（未启用时为 None）
+        "racing_stats": regression.get('racing_stats'),
+        # 适应度评估实际使用的精度
+        "precision": regression.get('precision', 'float64'),
+        "model_complexity": detailed_metrics['model_length'],
+        "detailed_metrics": detailed_metrics,
+        # 多目标模式下的整个 Pareto 前沿（按复杂度升序；单目标时为 None）
+        "pareto_front": regression.get('pareto_front'),
+        "analysis_params": analysis_params
+    }
+
 def _generate_model_name(target_column, feature_columns, data_source=None, analysis_type="符号回归", model_id=None):
     """生成有区分度的模型名称"""
     try:
@@ -2864,6 +1502,75 @@ def _generate_monte_carlo_report(result, target_efficacy, iterations):
         logger.error(f"生成蒙特卡洛报告失败: {e}")
         return f"报告生成失败: {str(e)}"
 
+@symbolic_regression_bp.route('/resume', methods=['POST'])
+def resume_regression():
+    """从检查点续跑符号回归（可追加代数），固定种子下结果与不中断运行逐位一致"""
+    try:
+        data = request.get_json() or {}
+        run_id = data.get('run_id')
+        if not run_id:
+            return jsonify({
+                'error': '参数缺失',
+                'message': '缺少必要参数: run_id'
+            }), 400
+        extra_generations = max(0, int(data.get('extra_generations', 0)))
+        max_workers = get_config_value('algorithm.max_workers', 1)
+        workers = int(data.get('workers', 1))
+        workers = max_workers if workers <= 0 else min(workers, max_workers)
+        
+        logger.info(f"续跑符号回归: {run_id}，追加 {extra_generations} 代")
+        regression = _get_regression_engine().resume(run_id, extra_generations=extra_generations,
+                                                     workers=workers, save=False)
+        analysis_params = dict(regression['parameters'],
+                               resumed_from_generation=regression['resumed_from_generation'])
+        result = _regression_response(regression, regression['target_variable'], analysis_params)
+        _get_regression_engine().save_pareto_front(regression)
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+        
+    except FileNotFoundError as e:
+        return jsonify({
+            'error': '检查点不存在',
+            'message': str(e)
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'error': '参数错误',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"符号回归续跑失败: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'error': '续跑失败',
+            'message': str(e)
+        }), 500
+
+@symbolic_regression_bp.route('/pareto/<run_id>', methods=['GET'])
+def get_pareto_front(run_id):
+    """获取多目标运行已保存的 Pareto 前沿条目"""
+    try:
+        entries = _get_regression_engine().get_pareto_front(run_id)
+        if not entries:
+            return jsonify({
+                'error': 'Pareto 前沿不存在',
+                'message': f'运行 {run_id} 没有已保存的 Pareto 前沿'
+            }), 404
+        return jsonify({
+            'success': True,
+            'run_id': run_id,
+            'pareto_front': entries
+        })
+        
+    except Exception as e:
+        logger.error(f"获取 Pareto 前沿失败: {str(e)}")
+        return jsonify({
+            'error': '获取 Pareto 前沿失败',
+            'message': str(e)
+        }), 500
+
 @symbolic_regression_bp.route('/models', methods=['GET'])
 def get_models():
     """获取已保存的模型列表 - 模拟数据"""
@@ -2923,10 +1630,171 @@ def get_model(model_id):
             'message': str(e)
         }), 500
 
+def _resolve_regression_model(model_id):
+    """
+    按ID查找已保存的回归模型
+
+    model_id 可为数据模型ID（返回其回归模型文件内容），也可为符号回归引擎保存的模型或 Pareto 前沿条目ID
+
+    Returns:
+        (模型, 数据模型, 回归模型文件内容, 回归模型文件路径)；后三项仅数据模型有
+    """
+    filepath = os.path.join(DATA_MODELS_DIR, f"{model_id}.json")
+    if os.path.exists(filepath):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data_model = json.load(f)
+        reg_filename = (data_model.get('data_files') or {}).get('regression_model')
+        reg_filepath = os.path.join(MODELS_DIR, reg_filename) if reg_filename else None
+        if not reg_filepath or not os.path.exists(reg_filepath):
+            raise LookupError(f'模型 {model_id} 的回归模型文件不存在')
+        with open(reg_filepath, 'r', encoding='utf-8') as f:
+            reg_content = json.load(f)
+        if not reg_content.get('feature_columns'):
+            reg_content['feature_columns'] = data_model.get('feature_columns') or []
+        return reg_content, data_model, reg_content, reg_filepath
+    model = _get_regression_engine().get_model(model_id)
+    if not model:
+        raise LookupError(f'模型 {model_id} 不存在')
+    return model, None, None, None
+
+@symbolic_regression_bp.route('/models/compare', methods=['POST'])
+def compare_models():
+    """
+    多个已保存回归模型在同一数据上的指标对比
+
+    各模型的预测堆叠为 (模型 × 样本) 矩阵，由 metrics.detailed_metrics 一次评分。
+    未提供 data 时使用列表中第一个数据模型的 CSV 数据；target_column 与 train_ratio 默认取第一个模型的设置
+    """
+    try:
+        start_time = time.time()
+        data = request.get_json(silent=True) or {}
+        model_ids = data.get('model_ids') or []
+        if not isinstance(model_ids, list) or not model_ids:
+            return jsonify({'error': '参数错误', 'message': 'model_ids 必须是非空列表'}), 400
+        
+        resolved = [(model_id, *_resolve_regression_model(model_id)) for model_id in model_ids]
+        first = resolved[0][1]
+        target_column = data.get('target_column') or first.get('target_column')
+        if isinstance(data.get('data'), list):
+            df = pd.DataFrame(data['data'])
+        else:
+            data_model = next((item[2] for item in resolved if item[2] is not None), None)
+            if data_model is None:
+                return jsonify({'error': '参数错误', 'message': '所选模型均没有关联数据，请在请求中提供 data 与 target_column'}), 400
+            df = _read_model_csv(data_model)
+        if target_column not in df.columns:
+            return jsonify({'error': '参数错误', 'message': f'数据中缺少目标列: {target_column}'}), 400
+        y = np.nan_to_num(df[target_column].to_numpy(dtype=np.float64), nan=0.0)
+        train_ratio = data.get('train_ratio') or (first.get('analysis_params') or {}).get('train_ratio', 80)
+        n_train = SymbolicRegression._train_size(len(y), train_ratio)
+        
+        predictions = []
+        for model_id, model, *_ in resolved:
+            features = model_feature_names(model)
+            missing = [col for col in features if col not in df.columns]
+            if missing:
+                return jsonify({'error': '参数错误', 'message': f'模型 {model_id} 所需的列在数据中缺失: {missing}'}), 400
+            X = np.nan_to_num(df[features].to_numpy(dtype=np.float64), nan=0.0)
+            predictions.append(expression_cache.get(model_id, model).evaluate(X))
+        metrics = detailed_metrics(y, np.vstack(predictions), n_train)
+        
+        models = [{
+            'model_id': model_id,
+            'name': (data_model or model).get('name'),
+            'expression': model.get('expression_text') or model.get('expression'),
+            'detailed_metrics': model_metrics,
+        } for (model_id, model, data_model, *_), model_metrics in zip(resolved, metrics)]
+        logger.info(f"模型对比完成: {len(models)} 个模型，{len(y)} 个样本")
+        return jsonify({
+            'success': True,
+            'target_column': target_column,
+            'n_samples': int(len(y)),
+            'n_train': int(n_train),
+            'models': models,
+            'elapsed': round(time.time() - start_time, 4)
+        })
+        
+    except LookupError as e:
+        return jsonify({'error': '模型不存在', 'message': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': '参数错误', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"模型对比失败: {str(e)}")
+        return jsonify({
+            'error': '模型对比失败',
+            'message': str(e)
+        }), 500
+
+@symbolic_regression_bp.route('/models/<model_id>/permutation-importance', methods=['POST'])
+def model_permutation_importance(model_id):
+    """
+    已保存回归模型的置换特征重要性（含置信区间）
+
+    model_id 可为数据模型ID（默认使用其CSV数据，结果同时写入回归模型文件），
+    也可为符号回归引擎保存的模型或 Pareto 前沿条目ID（需在请求中提供 data 与 target_column）
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        n_repeats = int(data.get('n_repeats', DEFAULT_PERMUTATION_REPEATS))
+        workers = int(data.get('workers', 1))
+        confidence = float(data.get('confidence', DEFAULT_CONFIDENCE))
+        seed = data.get('seed')
+        seed = int(seed) if seed not in (None, '') else None
+        split = data.get('split', 'all')
+        if split not in ('all', 'training', 'test'):
+            return jsonify({'error': '参数错误', 'message': f'不支持的数据划分: {split}'}), 400
+        
+        model, data_model, reg_content, reg_filepath = _resolve_regression_model(model_id)
+        
+        features = model_feature_names(model)
+        if isinstance(data.get('data'), list):
+            target_column = data.get('target_column') or model.get('target_column')
+            df = pd.DataFrame(data['data'])
+            missing = [col for col in features + [target_column] if col not in df.columns]
+            if missing:
+                return jsonify({'error': '参数错误', 'message': f'数据中缺少列: {missing}'}), 400
+            X = np.nan_to_num(df[features].to_numpy(dtype=np.float64), nan=0.0)
+            y = np.nan_to_num(df[target_column].to_numpy(dtype=np.float64), nan=0.0)
+            n_train = SymbolicRegression._train_size(len(y), (model.get('analysis_params') or {}).get('train_ratio', 80))
+        elif data_model is not None:
+            X, y, n_train = _load_model_dataset(data_model, reg_content)
+        else:
+            return jsonify({'error': '参数错误', 'message': '该模型没有关联数据，请在请求中提供 data 与 target_column'}), 400
+        rows = {'all': slice(None), 'training': slice(None, n_train), 'test': slice(n_train, None)}[split]
+        X, y = X[rows], y[rows]
+        if len(y) == 0:
+            return jsonify({'error': '参数错误', 'message': f'数据划分 {split} 中没有样本'}), 400
+        
+        compiled = expression_cache.get(model_id, model)
+        result = permutation_importance(compiled, X, y, n_repeats=n_repeats, seed=seed,
+                                        workers=workers, confidence=confidence)
+        result['split'] = split
+        if reg_content is not None:
+            reg_content['permutation_importance'] = result
+            with open(reg_filepath, 'w', encoding='utf-8') as f:
+                json.dump(reg_content, f, ensure_ascii=False, indent=2)
+        logger.info(f"模型 {model_id} 置换重要性计算完成（{n_repeats} 次重复，耗时 {result['elapsed']}s）")
+        return jsonify({
+            'success': True,
+            'model_id': model_id,
+            'result': result
+        })
+        
+    except LookupError as e:
+        return jsonify({'error': '模型不存在', 'message': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': '参数错误', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"置换重要性计算失败: {str(e)}")
+        return jsonify({
+            'error': '置换重要性计算失败',
+            'message': str(e)
+        }), 500
+
 # 蒙特卡洛采样分析路由
 @monte_carlo_bp.route('/analyze', methods=['POST'])
 def monte_carlo_analyze():
-    """蒙特卡洛采样配比分析 - 模拟数据"""
+    """蒙特卡洛采样配比分析：按成分范围均匀采样，以数据模型的回归表达式批量预测药效"""
     try:
         data = request.get_json()
         
@@ -2941,113 +1809,122 @@ def monte_carlo_analyze():
         
         # 获取参数
         model_id = data['model_id']
-        target_efficacy = data['target_efficacy']
-        iterations = data['iterations']
-        tolerance = data.get('tolerance', 0.1)
-        component_ranges = data.get('component_ranges', {})
+        target_efficacy = float(data['target_efficacy'])
+        iterations = int(data['iterations'])
+        tolerance = float(data.get('tolerance', 0.1))
+        req_ranges = data.get('component_ranges', {}) or {}
+        seed = data.get('seed')
+        seed = int(seed) if seed not in (None, '') else None
+        precision = str(data.get('precision', 'float64'))
+        streaming = data.get('streaming')
+        streaming = None if streaming in (None, '') else bool(streaming)
+        sampler = str(data.get('sampler') or 'uniform').lower()
+        max_workers = get_config_value('algorithm.max_workers', 1)
+        workers = int(data.get('workers', 1))
+        workers = max_workers if workers <= 0 else min(workers, max_workers)
+        max_iterations = get_config_value('algorithm.max_monte_carlo_iterations', 100000)
+        # 流式模式内存与采样次数无关，使用单独的上限；未指定模式时超过整批上限自动改用流式
+        if streaming is None and iterations > max_iterations and sampler != 'adaptive':
+            streaming = True
+        if streaming:
+            max_iterations = get_config_value('algorithm.max_streaming_monte_carlo_iterations', 1000000000)
+        if not 0 < iterations <= max_iterations:
+            return jsonify({
+                'error': '参数错误',
+                'message': f'采样次数必须在 1 到 {max_iterations} 之间'
+            }), 400
+        if not model_id:
+            logger.warning("未指定数据模型ID")
+            return jsonify({
+                'success': False,
+                'error': '缺少数据模型ID',
+                'message': '进行蒙特卡洛采样时必须指定一个现有的数据模型'
+            }), 400
         
         logger.info(f"开始蒙特卡洛采样分析，模型ID: {model_id}")
         logger.info(f"目标药效: {target_efficacy}, 采样次数: {iterations}")
         
-        # 模拟处理时间
-        time.sleep(3)
-        
-        # 生成模拟结果
-        analysis_id = f"mc_{int(time.time())}"
-        valid_samples = int(iterations * random.uniform(0.1, 0.2))
-        
-        # 读取模型信息以获取目标名与特征
-        target_name = "药效"
-        features = ["QA", "NCGA", "CGA", "CCGA", "CA"]
-        # 如果指定了数据模型，加载其特征
         try:
-            filename = f"{model_id}.json"
-            filepath = os.path.join(DATA_MODELS_DIR, filename)
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    existing_model = json.load(f)
-                target_name = existing_model.get('target_column', target_name)
-                features = existing_model.get('feature_columns', features) or features
-        except Exception as _e:
-            pass
-
-        # 生成Top10最优样本（仅模拟）
-        req_ranges = data.get('component_ranges', {}) or {}
-        def sample_value(var):
-            vr = req_ranges.get(var) or {}
-            vmin = float(vr.get('min', 0) if vr.get('min') is not None else 0)
-            vmax = vr.get('max', None)
-            if vmax is None:
-                # 无穷大用一个较大的上界模拟
-                vmax = vmin + 1.0
-            return round(random.uniform(vmin, vmax), 2)
-
-        top10 = []
-        for i in range(10):
-            comps = []
-            for var in features[:min(8, len(features))]:
-                comps.append({"name": var, "value": sample_value(var)})
-            # 让前几条更接近目标
-            eff = round(target_efficacy + random.uniform(-0.1, 0.1) - i*0.02, 3)
-            top10.append({"rank": i+1, "efficacy": eff, "components": comps})
+            model, existing_model, _, _ = _resolve_regression_model(model_id)
+        except LookupError:
+            existing_model = None
+        if existing_model is None:
+            logger.warning(f"指定的数据模型不存在: {model_id}")
+            return jsonify({
+                'success': False,
+                'error': '指定的数据模型不存在',
+                'message': f'模型ID {model_id} 不存在'
+            }), 404
+        target_name = existing_model.get('target_column') or '药效'
+        features = model_feature_names(model)
+        if not model.get('feature_importance'):
+            model = dict(model, feature_importance=[{'feature': name, 'importance': 0.0} for name in features])
+        
+        mc_result = _get_monte_carlo_engine().analyze(
+            model_id, target_efficacy, iterations, tolerance,
+            _monte_carlo_ranges(req_ranges, features), seed=seed, precision=precision,
+            model=model, save=False, streaming=streaming, workers=workers, sampler=sampler,
+            max_iterations=max_iterations
+        )
         
+        # 预测药效最接近目标值的样本
+        top10 = [
+            {
+                "rank": rank,
+                "efficacy": round(item['predicted_efficacy'], 4),
+                "components": [{"name": name, "value": round(value, 4)}
+                               for name, value in list(item['sample'].items())[:8]]
+            }
+            for rank, item in enumerate(mc_result['sample_data']['top_samples'], start=1)
+        ]
+        distribution = mc_result['distribution_data']
         result = {
-            "analysis_id": analysis_id,
-            "iterations": iterations,
+            "analysis_id": mc_result['analysis_id'],
+            "iterations": mc_result['iterations'],
+            "requested_iterations": iterations,
+            "sampler": mc_result['sampler'],
             "target_efficacy": target_efficacy,
             "tolerance": tolerance,
-            "valid_samples": valid_samples,
-            "success_rate": round(valid_samples / iterations, 3),
-            "analysis_time": round(random.uniform(5.0, 12.0), 1),
+            "seed": mc_result['seed'],
+            "precision": mc_result['precision'],
+            "streaming": mc_result['streaming'],
+            "workers": mc_result['workers'],
+            "valid_samples": mc_result['valid_samples_count'],
+            "valid_rate": mc_result['valid_rate'],
+            "success_rate": round(mc_result['valid_rate'], 3),
+            "analysis_time": mc_result['elapsed'],
             "top10": top10,
+            "component_statistics": mc_result['component_statistics'],
+            "distribution": {
+                "histogram": distribution.get('histogram'),
+                "statistics": distribution.get('statistics'),
+                "nonfinite_count": distribution.get('nonfinite_count', 0)
+            },
             "component_ranges": req_ranges,
             "target_name": target_name
         }
+        if 'importance_sampling' in mc_result:
+            result['importance_sampling'] = mc_result['importance_sampling']
         
-        # 自动创建或更新数据模型
+        # 更新数据模型
         try:
-            # 检查是否已有对应的数据模型
-            model_id = data.get('model_id')
-            if model_id:
-                # 尝试更新现有模型
-                filename = f"{model_id}.json"
-                filepath = os.path.join(DATA_MODELS_DIR, filename)
-                
-                if os.path.exists(filepath):
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        existing_model = json.load(f)
-                    
-                    # 保存蒙特卡洛分析结果为 JSON 文件
-                    results_filename = f"{model_id}_monte_carlo.json"
-                    results_filepath = os.path.join(RESULTS_DIR, results_filename)
-                    with open(results_filepath, 'w', encoding='utf-8') as f:
-                        json.dump(result, f, ensure_ascii=False, indent=2)
-                    
-                    # 更新模型元数据
-                    existing_model['updated_at'] = time.time()
-                    existing_model['metadata']['has_monte_carlo_results'] = True
-                    # 更新数据文件映射
-                    existing_model.setdefault('data_files', {})['monte_carlo_results'] = results_filename
-                    
-                    if save_data_model(existing_model):
-                        logger.info(f"数据模型更新成功: {model_id}")
-                        result['data_model_id'] = model_id
-                    else:
-                        logger.warning("数据模型更新失败")
-                else:
-                    logger.warning(f"指定的数据模型不存在: {model_id}")
-                    return jsonify({
-                        'success': False,
-                        'error': '指定的数据模型不存在',
-                        'message': f'模型ID {model_id} 不存在'
-                    }), 404
+            # 保存蒙特卡洛分析结果为 JSON 文件
+            results_filename = f"{model_id}_monte_carlo.json"
+            results_filepath = os.path.join(RESULTS_DIR, results_filename)
+            with open(results_filepath, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            
+            # 更新模型元数据
+            existing_model['updated_at'] = time.time()
+            existing_model.setdefault('metadata', {})['has_monte_carlo_results'] = True
+            # 更新数据文件映射
+            existing_model.setdefault('data_files', {})['monte_carlo_results'] = results_filename
+            
+            if save_data_model(existing_model):
+                logger.info(f"数据模型更新成功: {model_id}")
+                result['data_model_id'] = model_id
             else:
-                logger.warning("未指定数据模型ID")
-                return jsonify({
-                    'success': False,
-                    'error': '缺少数据模型ID',
-                    'message': '进行蒙特卡洛采样时必须指定一个现有的数据模型'
-                }), 400
+                logger.warning("数据模型更新失败")
                     
         except Exception as e:
             logger.error(f"更新数据模型失败: {e}")
@@ -3058,6 +1935,8 @@ def monte_carlo_analyze():
             'result': result
         })
         
+    except ValueError as e:
+        return jsonify({'error': '参数错误', 'message': str(e)}), 400
     except Exception as e:
         logger.error(f"蒙特卡洛采样分析失败: {str(e)}")
         logger.error(traceback.format_exc())
@@ -3317,19 +2196,133 @@ def preview_data():
 
 @symbolic_regression_bp.route('/split-plan', methods=['POST'])
 def split_plan():
-    """返回训练/测试划分方案（空壳模拟）"""
+    """
+    生成训练/测试划分方案（留出、k 折、重复 k 折、按目标分层 k 折），返回各折的行下标
+
+    提供 data（及分层划分所需的 target_column）时按上传的数据集划分，折下标按 (数据集哈希, 划分参数) 缓存；
+    未提供 data 时按 n_rows 行（默认 100）划分
+    """
     try:
         data = request.get_json() or {}
-        train_ratio = int(data.get('train_ratio', 80))
-        test_ratio = 100 - train_ratio
-        # 简单回传占比与示例行数（模拟）
-        plan = {
-            'train_ratio': train_ratio,
-            'test_ratio': test_ratio,
-            'train_rows': int(0.01 * train_ratio * 100),
-            'test_rows': int(0.01 * test_ratio * 100)
-        }
+        spec = normalize_split_spec(data)
+        target_column = data.get('target_column')
+        if isinstance(data.get('data'), list):
+            df = pd.DataFrame(data['data'])
+            if target_column and target_column in df.columns:
+                y = np.nan_to_num(df[target_column].to_numpy(dtype=np.float64), nan=0.0)
+            elif spec['method'] == 'stratified_kfold':
+                return jsonify({'success': False, 'error': '参数错误', 'message': '分层划分需要提供数据中存在的 target_column'}), 400
+            else:
+                y = np.zeros(len(df))
+            data_hash = dataset_hash(pd.util.hash_pandas_object(df, index=False).to_numpy(), y)
+        else:
+            if spec['method'] == 'stratified_kfold':
+                return jsonify({'success': False, 'error': '参数错误', 'message': '分层划分需要提供 data 与 target_column'}), 400
+            y = np.zeros(int(data.get('n_rows', 100)))
+            data_hash = dataset_hash(y)
+        folds, cached = split_cache.get(y, spec, data_hash)
+        
+        include_indices = bool(data.get('include_indices', True))
+        fold_plans = []
+        for fold in folds:
+            item = {
+                'repeat': fold['repeat'],
+                'fold': fold['fold'],
+                'train_rows': int(len(fold['train'])),
+                'test_rows': int(len(fold['test'])),
+            }
+            if include_indices:
+                item['train_indices'] = fold['train'].tolist()
+                item['test_indices'] = fold['test'].tolist()
+            fold_plans.append(item)
+        # 兼容旧字段：第一折的训练/测试占比与行数
+        n_rows = len(y)
+        plan = dict(spec, **{
+            'n_rows': n_rows,
+            'n_folds': len(folds),
+            'train_ratio': round(100.0 * fold_plans[0]['train_rows'] / n_rows, 2),
+            'test_ratio': round(100.0 * fold_plans[0]['test_rows'] / n_rows, 2),
+            'train_rows': fold_plans[0]['train_rows'],
+            'test_rows': fold_plans[0]['test_rows'],
+            'folds': fold_plans,
+            'dataset_hash': data_hash,
+            'cached': cached,
+        })
         return jsonify({'success': True, 'plan': plan})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': '参数错误', 'message': str(e)}), 400
     except Exception as e:
         logger.error(f"生成划分方案失败: {e}")
-        return jsonify({'success': False, 'error': '生成划分方案失败', 'message': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': '生成划分方案失败', 'message': str(e)}), 500
+
+@symbolic_regression_bp.route('/sweep', methods=['POST'])
+def hyperparameter_sweep():
+    """
+    符号回归超参数搜索：在网格或随机空间上调度全部配置（共享同一进程池与数据集），返回排行榜
+
+    space 的键可为 population_size、generations、max_tree_depth、symbolic_expression_grammar、seed；
+    successive_halving 为真时按轮提前停止较差的配置
+    """
+    try:
+        data = request.get_json() or {}
+        required_fields = ['data', 'target_column', 'feature_columns', 'space']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({
+                    'error': '参数缺失',
+                    'message': f'缺少必要参数: {field}'
+                }), 400
+        if not isinstance(data['space'], dict) or not data['space']:
+            return jsonify({'error': '参数错误', 'message': 'space 必须为非空对象'}), 400
+        
+        target_column = data['target_column']
+        feature_columns = data['feature_columns']
+        seed = data.get('seed')
+        seed = int(seed) if seed not in (None, '') else None
+        configs = expand_space(data['space'], str(data.get('mode', 'grid')),
+                               int(data.get('n_samples', DEFAULT_SWEEP_SAMPLES)), seed)
+        max_workers = get_config_value('algorithm.max_workers', 1)
+        workers = int(data.get('workers', 1))
+        workers = max_workers if workers <= 0 else min(workers, max_workers)
+        precision = str(data.get('precision', 'float64'))
+        if precision not in ('float64', 'float32'):
+            return jsonify({'error': '参数错误', 'message': f'不支持的评估精度: {precision}'}), 400
+        # 各配置共用的引擎参数（space 中的参数覆盖这些默认值）
+        engine_params = {
+            'population_size': int(data.get('population_size', 100)),
+            'generations': int(data.get('generations', 50)),
+            'max_tree_depth': int(data.get('max_tree_depth', 35)),
+            'max_tree_length': int(data.get('max_tree_length', 35)),
+            'grammar': data.get('symbolic_expression_grammar', ['addition', 'subtraction', 'multiplication', 'division']),
+            'subtree_cache': bool(data.get('subtree_cache', False)),
+            'cache_max_bytes': get_config_value('algorithm.subtree_cache_max_mb', 256) * 1024 * 1024,
+            'constant_optimization_top_k': max(0, int(data.get('constant_optimization_top_k', 10))),
+            'constant_optimization_iterations': max(0, int(data.get('constant_optimization_iterations', 10))),
+            'linear_scaling': bool(data.get('linear_scaling', False)),
+            'semantic_dedup': bool(data.get('semantic_dedup', False)),
+            'precision': precision,
+        }
+        
+        engine = _get_regression_engine()
+        X, y = engine._prepare_data({'data': data['data']}, target_column, feature_columns)
+        n_train = SymbolicRegression._train_size(len(y), data.get('train_ratio', 80))
+        result = run_sweep(X, y, feature_columns, n_train, configs, engine_params, workers=workers,
+                           successive_halving=bool(data.get('successive_halving', False)),
+                           eta=int(data.get('eta', DEFAULT_SWEEP_ETA)), seed=seed)
+        result.update(target_column=target_column, feature_columns=feature_columns,
+                      n_samples=int(len(y)), n_train=int(n_train))
+        logger.info(f"超参数搜索完成: {result['n_configurations']} 个配置，"
+                    f"最优得分 {result['best']['score']}，耗时 {result['elapsed']}s")
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': '参数错误', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"超参数搜索失败: {str(e)}")
+        return jsonify({
+            'error': '超参数搜索失败',
+            'message': str(e)
+        }), 500
@@ -7,6 +7,7 @@
 
 import os
 import sys
+import multiprocessing
 from pathlib import Path
 
 # 添加项目根目录到Python路径
@@ -52,4 +53,6 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # PyInstaller 打包后的 Windows 程序需要此调用才能启动并行评估子进程
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
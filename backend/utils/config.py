@@ -28,7 +28,10 @@ def load_config():
         'algorithm': {
             'max_population_size': int(os.getenv('MAX_POPULATION_SIZE', 1000)),
             'max_generations': int(os.getenv('MAX_GENERATIONS', 100)),
-            'max_monte_carlo_iterations': int(os.getenv('MAX_MONTE_CARLO_ITERATIONS', 100000))
+            'max_monte_carlo_iterations': int(os.getenv('MAX_MONTE_CARLO_ITERATIONS', 100000)),
+            'max_streaming_monte_carlo_iterations': int(os.getenv('MAX_STREAMING_MONTE_CARLO_ITERATIONS', 1000000000)),
+            'max_workers': int(os.getenv('MAX_WORKERS', os.cpu_count() or 1)),
+            'subtree_cache_max_mb': int(os.getenv('SUBTREE_CACHE_MAX_MB', 256))
         },
         
         # 文件上传配置
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+随机数流管理
+
+每次运行由一个根 SeedSequence 派生出互相独立的随机数流（SeedSequence.spawn），
+例如岛屿模型的各岛、蒙特卡洛采样的各数据块各自持有一个 Generator。
+不读写 np.random / random 模块的全局状态，多个分析可在同一进程的不同线程中并发执行；
+随机数流只与种子和派生路径有关，与工作进程数、线程调度无关。
+"""
+
+import numpy as np
+from typing import List, Union
+
+SeedLike = Union[None, int, np.random.SeedSequence]
+
+
+def seed_sequence(seed: SeedLike = None) -> np.random.SeedSequence:
+    """
+    根 SeedSequence；seed 为 None 时取操作系统熵（其 entropy 可记录下来复现本次运行）
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+def generator(seed: SeedLike = None) -> np.random.Generator:
+    """由种子或 SeedSequence 创建独立的 Generator"""
+    return np.random.default_rng(seed_sequence(seed))
+
+
+def spawn_sequences(seed: SeedLike, n: int) -> List[np.random.SeedSequence]:
+    """派生 n 个子 SeedSequence（同一种子下第 i 个子流固定不变）"""
+    return seed_sequence(seed).spawn(int(n))
+
+
+def spawn_generators(seed: SeedLike, n: int) -> List[np.random.Generator]:
+    """派生 n 个互相独立的 Generator"""
+    return [np.random.default_rng(child) for child in spawn_sequences(seed, n)]
+
+
+def child_generator(seed: SeedLike, index: int) -> np.random.Generator:
+    """
+    第 index 个子流的 Generator，不必派生前面的子流
+
+    与 spawn_generators(seed, n)[index] 相同，用于按块编号独立地在任意进程中重建随机数流
+    """
+    root = seed_sequence(seed)
+    child = np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (int(index),),
+                                   pool_size=root.pool_size)
+    return np.random.default_rng(child)
+
+
+def fresh_seed() -> int:
+    """从操作系统熵取一个新种子（随机种子模式下记录它即可复现本次运行）"""
+    return int(np.random.SeedSequence().entropy)
@@ -29,6 +29,19 @@
     return code >= 48 && code <= 57; // 0-9
   }
 
+  // 跳过科学记数法的指数部分（e/E 后跟可选符号与数字），不构成指数时原样返回
+  function skipExponent(src, j) {
+    if (j < src.length && (src[j] === 'e' || src[j] === 'E')) {
+      let k = j + 1;
+      if (k < src.length && (src[k] === '+' || src[k] === '-')) k += 1;
+      if (k < src.length && isDigit(src[k])) {
+        while (k < src.length && isDigit(src[k])) k += 1;
+        return k;
+      }
+    }
+    return j;
+  }
+
   function isIdentStart(ch) {
     const code = ch.charCodeAt(0);
     return (code >= 65 && code <= 90) || // A-Z
@@ -88,6 +101,7 @@
             if (c === '.' && !hasDot) { hasDot = true; j += 1; continue; }
             break;
           }
+          j = skipExponent(src, j);
           const numText = src.slice(i, j); // 包含负号
           tokens.push({ type: 'number', value: parseFloat(numText) });
           i = j;
@@ -95,7 +109,7 @@
         }
       }
 
-      // 数字（含小数）
+      // 数字（含小数与指数）
       if (isDigit(ch) || (ch === '.' && i + 1 < length && isDigit(src[i + 1]))) {
         let j = i;
         let hasDot = (ch === '.');
@@ -111,6 +125,7 @@
             break;
           }
         }
+        j = skipExponent(src, j);
         const numText = src.slice(i, j);
         tokens.push({ type: 'number', value: parseFloat(numText) });
         i = j;
@@ -468,9 +483,22 @@
     return result.changed ? result.node : root;
   }
 
+  // 节点在树中的路径（从根开始的子节点下标序列，0 为左、1 为右），供后端定位被编辑的节点
+  function nodePath(root, targetId) {
+    if (!root) return null;
+    if (root.id === targetId) return [];
+    const children = root.children || [];
+    for (let i = 0; i < children.length; i++) {
+      const sub = nodePath(children[i], targetId);
+      if (sub) return [i, ...sub];
+    }
+    return null;
+  }
+
   ExprTree.cloneAst = cloneNode;
   ExprTree.simplifyAst = simplifyAst;
   ExprTree.deleteNodeById = deleteNodeById;
+  ExprTree.nodePath = nodePath;
 
   // =============================
   // AST → 表达式字符串（用于调试和右上公式刷新）
@@ -658,13 +686,45 @@
   // 影响力计算与颜色映射（V3：直接读取tree.json并注入到树结构）
   // =============================
   // 将tree.json的影响力数据直接注入到AST树结构中
+  // impact 子树中全部叶子影响力之和（常数叶子为 0）
+  function totalImpact(impactNode) {
+    if (!impactNode || typeof impactNode !== 'object') return 0;
+    if (Array.isArray(impactNode.children)) {
+      return impactNode.children.reduce((sum, child) => sum + totalImpact(child), 0);
+    }
+    return Number(impactNode.impact || 0);
+  }
+
+  // 按位置注入：AST 运算符节点与 impact 运算符节点逐个子节点对应；
+  // 系数下沉后 AST 的带系数变量对应 impact 中的 Multiplication(常数, 变量)，取其子树影响力之和
+  function injectPositional(node, impactNode) {
+    if (!node) return;
+    if (node.kind === 'operator') {
+      const kids = (impactNode && Array.isArray(impactNode.children)) ? impactNode.children : [];
+      let totalWeight = 0;
+      (node.children || []).forEach((child, i) => {
+        injectPositional(child, kids[i]);
+        totalWeight += child.weight || 0;
+      });
+      node.weight = totalWeight;
+      return;
+    }
+    node.weight = totalImpact(impactNode);
+  }
+
   function injectImpactData(root, impactTree) {
     if (!root || !impactTree) return root;
     
     console.log('🔍 开始注入影响力数据到树结构');
     console.log('🔍 影响力数据结构:', impactTree);
     console.log('🔍 影响力数据结构键:', Object.keys(impactTree));
-    
+
+    // 新格式：{op, children: [左, 右]} / {label, impact}，子节点按位置与 AST 对齐
+    if (Array.isArray(impactTree.children) || Object.prototype.hasOwnProperty.call(impactTree, 'label')) {
+      injectPositional(root, impactTree);
+      return root;
+    }
+
     // 运算符映射：AST op → tree.json 键
     const opMapping = {
       add: 'Addition',
@@ -649,7 +649,7 @@ function wireToolbarActions(container, getSvg) {
         const sel = svg && svg.querySelector('[data-selected="true"]');
         return sel ? sel.getAttribute('data-node-id') : null;
     };
-    const rerender = async (ast, action = 'apply') => {
+    const rerender = async (ast, action = 'apply', nodePath = null) => {
         const canvas = document.getElementById('expression-tree-canvas');
         const inner = canvas.querySelector('.expr-tree-inner') || canvas;
         inner.innerHTML = '';
@@ -769,7 +769,8 @@ function wireToolbarActions(container, getSvg) {
                         feature_importance: ExprTree.computeFeatureImportance(ast),
                         impact_tree: window.TREE_IMPACT_DATA,
                         updated_at: Date.now(),
-                        expr_tree_action: action
+                        expr_tree_action: action,
+                        node_path: nodePath
                     })
                 });
                 
@@ -777,6 +778,22 @@ function wireToolbarActions(container, getSvg) {
                     throw new Error(`回归模型文件更新失败: ${regModelResp.status}`);
                 }
                 
+                // 以后端编辑后的表达式为准重建AST：后端化简会折叠常数并合并系数，
+                // 前端本地结果可能与之不同，不同步会使后续操作的 node_path 指向错误节点
+                const regResult = await regModelResp.json().catch(() => ({}));
+                let serverAst = null;
+                if (regResult && typeof regResult.expression_text === 'string' && regResult.expression_text) {
+                    try {
+                        serverAst = ExprTree.normalizeAst(ExprTree.parseExpressionToAst(regResult.expression_text));
+                        window.currentExpressionAst = serverAst;
+                        if (regResult.impact_tree && typeof regResult.impact_tree === 'object') {
+                            window.TREE_IMPACT_DATA = regResult.impact_tree;
+                        }
+                    } catch (parseError) {
+                        console.warn('⚠️ 解析后端表达式失败，继续使用本地AST:', parseError);
+                    }
+                }
+                
                 // 3. 读取最新摘要以刷新左侧性能与详细指标，并获取新的树结构数据
                 try {
                     const updated = await fetchExpressionTreeSummary({ model_id: modelId });
@@ -788,18 +805,8 @@ function wireToolbarActions(container, getSvg) {
                             console.log('🔄 检测到新的树结构数据，正在更新前端...');
                             window.TREE_IMPACT_DATA = updated.impact_tree;
                             
-                            // 🚨 关键修复：检查是否有新的表达式，如果有则重新解析AST
-                            let newAst = ast; // 默认使用当前AST
-                            if (updated.expression && updated.expression !== ExprTree.astToExpression(ast)) {
-                                console.log('🔄 检测到新的表达式，重新解析AST...');
-                                console.log('📝 旧表达式:', ExprTree.astToExpression(ast));
-                                console.log('📝 新表达式:', updated.expression);
-                                
-                                // 使用新表达式重新解析AST
-                                newAst = ExprTree.normalizeAst(ExprTree.parseExpressionToAst(updated.expression));
-                                window.currentExpressionAst = newAst; // 更新全局AST
-                                console.log('✅ AST已根据新表达式重新解析');
-                            }
+                            // 使用后端返回的 expression_text 重建的AST（摘要中的 expression 为 LaTeX，不能用于解析）
+                            const newAst = serverAst || ast;
                             
                             // 重新渲染SVG树以应用新的树结构和AST
                             const canvas = document.getElementById('expression-tree-canvas');
@@ -937,12 +944,13 @@ function wireToolbarActions(container, getSvg) {
             showNotification('请先选择要删除的节点', 'warning');
             return;
         }
+        const nodePath = ExprTree.nodePath(window.currentExpressionAst, id);
         window.__exprTreeUndo__.push(ExprTree.cloneAst(window.currentExpressionAst));
         const next = ExprTree.deleteNodeById(window.currentExpressionAst, id);
         window.currentExpressionAst = ExprTree.simplifyAst(next);
         showNotification('正在删除节点/子树...', 'info');
         if (typeof window.__updateExprOpCounter__ === 'function') window.__updateExprOpCounter__(+1);
-        rerender(window.currentExpressionAst, 'delete');
+        rerender(window.currentExpressionAst, 'delete', nodePath);
     };
     if (btnUndo) btnUndo.onclick = () => {
         if (!window.__exprTreeUndo__ || window.__exprTreeUndo__.length === 0) {